@@ -0,0 +1,98 @@
+import itertools
+import random
+import sys
+import time
+
+from blueberry.budget import Budget, BudgetExceeded, Limits, rss_mb
+from blueberry.parser import render_pdf_bytes
+
+from .synthetic import generate_report
+
+# Per-document budgets: a stress and fuzz corpus of pathological reports (deep
+# nesting, huge inline blobs, tag floods, unbreakable text, thousands of cards,
+# truncated and shuffled markup), each rendered in this one process under tight
+# limits. Every document must end as a full PDF, a partial PDF or a clean rejection
+# within its time budget plus slack, and a normal report must still render afterwards.
+#
+#   python -m benchmarks.bench_budget [max_seconds] [fuzz_cases]
+
+# Parsing (tens of microseconds per tag with bs4) and the final write happen outside
+# the checkpoints; the input and node limits are what bound them, so they are set
+# with the time budget in mind and a little slack is allowed on top.
+SLACK_SECONDS = 1.0
+
+def card(i, body=''):
+    return (f'<div class="setup-card"><span class="ticker">T{i}</span><span class="company-name">Co {i}</span>'
+            f'<div class="technical-details"><p>Entry: {i}.50</p><p>{body}Detail {i}.</p></div></div>')
+
+def page(body):
+    return f'<html><body><div class="date">Stress</div>{body}</body></html>'
+
+def corpus(seed=7):
+    yield 'deep nesting', page('<div>' * 20_000 + card(1) + '</div>' * 20_000)
+    yield 'unclosed nesting', page('<div><span><p>' * 5_000 + card(1))
+    yield 'inline blob', page(card(1, f'<img src="data:image/png;base64,{"QUJD" * 600_000}">'))
+    yield 'unbreakable text', page(card(1, 'X' * 200_000))
+    yield 'long paragraph', page(card(1, ' '.join(['word'] * 150_000)))
+    yield 'tag flood', page(card(1, '<span></span>' * 90_000))
+    yield 'too many tags', page('<b></b>' * 300_000)
+    yield 'oversized input', page(card(1, 'x' * (5 * 1024 * 1024)))
+    yield 'many cards', generate_report(cards=2_000, watchlist=200, seed=seed)
+    yield 'many notes', page(''.join(f'<li>Note {i} ' + 'text ' * 30 + '</li>' for i in range(20_000)))
+    yield 'wide table', page(card(1, '<table><tr>' + '<td>cell</td>' * 40_000 + '</tr></table>'))
+    yield 'binary noise', ''.join(map(chr, random.Random(seed).choices(range(1, 0x2FF), k=2_000_000)))
+
+# Fuzz cases: a real synthetic report cut, spliced, duplicated and sprinkled with
+# stray markup at random, growing to at most a few times its original size.
+def fuzz_cases(n, seed=11):
+    rng = random.Random(seed)
+    base = generate_report(cards=200, watchlist=40, seed=seed)
+    junk = ['<div>', '</div>', '<p>', '<table><tr><td>', '<<', '&#', '<!--', '<script>', '"', "'", '\x00']
+    for k in range(n):
+        html = base
+        for _ in range(rng.randint(1, 40)):
+            i, j = sorted(rng.randrange(len(html)) for _ in range(2))
+            op = rng.random()
+            if op < 0.3: html = html[:i] + html[j:]
+            elif op < 0.6 and len(html) < 4 * len(base): html = html[:j] + html[i:j] * rng.randint(1, 8) + html[j:]
+            else: html = html[:i] + rng.choice(junk) * rng.randint(1, 2_000) + html[i:]
+        yield f'fuzz {k}', html
+
+def run(html, limits):
+    budget = Budget(limits)
+    start = time.perf_counter()
+    try:
+        data = render_pdf_bytes(html, budget=budget)
+        outcome, detail = ('partial' if budget.exceeded else 'ok'), budget.exceeded or f"{len(data) / 1024:.0f} KB"
+    except BudgetExceeded as e:
+        outcome, detail = 'rejected', str(e)
+    except Exception as e:
+        outcome, detail = 'error', f"{type(e).__name__}: {e}"
+    return time.perf_counter() - start, outcome, detail
+
+def main(argv=None):
+    args = argv or sys.argv[1:]
+    seconds = float(args[0]) if args else 5.0
+    n_fuzz = int(args[1]) if len(args) > 1 else 30
+    limits = Limits(max_input_mb=4, max_nodes=50_000, max_seconds=seconds, max_memory_mb=512)
+    allowed = seconds + SLACK_SECONDS
+    print(f"limits: {limits.max_input_mb:g} MB in, {limits.max_nodes} tags, {seconds:g}s, "
+          f"{limits.max_memory_mb:g} MB; allowed wall time {allowed:g}s per document")
+    print(f"{'case':<18} {'KB in':>8} {'seconds':>8} {'RSS MB':>7} {'outcome':<9} detail")
+
+    over, outcomes = [], {}
+    for name, html in itertools.chain(corpus(), fuzz_cases(n_fuzz)):
+        elapsed, outcome, detail = run(html, limits)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        if elapsed > allowed: over.append(name)
+        print(f"{name:<18} {len(html) / 1024:>8.0f} {elapsed:>8.2f} {rss_mb():>7.0f} {outcome:<9} {detail[:60]}")
+
+    # The process has to be just as usable after the corpus as before it.
+    elapsed, outcome, _ = run(generate_report(cards=40), limits)
+    print(f"\nafter corpus: normal report {outcome} in {elapsed * 1000:.0f} ms")
+    print("outcomes: " + ", ".join(f"{k} {v}" for k, v in sorted(outcomes.items())))
+    if over: print(f"over the allowed time: {', '.join(over)}")
+    return 1 if over or outcome != 'ok' else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
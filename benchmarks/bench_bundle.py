@@ -0,0 +1,74 @@
+import io
+import sys
+import time
+
+from blueberry.bundle import render_bundle
+from blueberry.layout import LayoutCache
+from blueberry.parser import extract_report
+from blueberry.render import render_report
+
+from .synthetic import generate_report
+
+# Weekly/monthly volumes: render every daily report to its own PDF and merge them with
+# pypdf (what the external tools do), against render_bundle drawing all of them into
+# one PDF in a single pass. Reports are parsed once up front; both sides start from
+# the same Report objects with a cold layout cache and no card fragments. Set BLUEBERRY_FONT_DIR to compare
+# with an embedded Unicode font, where the duplicated resources weigh most. pypdf is a
+# benchmark-only dependency (requirements-dev.txt); without it only the bundle side runs.
+#
+#   python -m benchmarks.bench_bundle [reports ...]
+
+def daily_reports(n, cards=40):
+    reports = []
+    for day in range(n):
+        report = extract_report(generate_report(cards=cards, watchlist=cards // 5, seed=day))
+        report.subtitle = f"Day {day + 1}"
+        reports.append(report)
+    return reports
+
+def separate_then_merge(reports):
+    import pypdf
+    start = time.perf_counter()
+    cache = LayoutCache()
+    files = [bytes(render_report(r, layout_cache=cache, fragments=False).output()) for r in reports]
+    rendered = time.perf_counter()
+    writer = pypdf.PdfWriter()
+    for data in files:
+        writer.append(pypdf.PdfReader(io.BytesIO(data)), outline_item=None)
+    out = io.BytesIO()
+    writer.write(out)
+    return rendered - start, time.perf_counter() - rendered, sum(map(len, files)), len(out.getvalue())
+
+# Without the ticker index for a like-for-like comparison; the index is timed apart.
+def bundled(reports, index=False):
+    start = time.perf_counter()
+    data = bytes(render_bundle(reports, layout_cache=LayoutCache(), index=index, fragments=False).output())
+    return time.perf_counter() - start, len(data)
+
+def main(argv=None):
+    sizes = [int(a) for a in (argv or sys.argv[1:])] or [5, 20, 60]
+    try:
+        import pypdf  # noqa: F401
+        merge = True
+    except ImportError:
+        print("pypdf is not installed; skipping the separate-then-merge side.", file=sys.stderr)
+        merge = False
+    print(f"{'reports':>8} {'render ms':>10} {'merge ms':>9} {'separate KB':>12} {'merged KB':>10} "
+          f"{'bundle ms':>10} {'bundle KB':>10} {'speed-up':>9} {'+index ms':>10}")
+    for n in sizes:
+        reports = daily_reports(n)
+        if merge: render_s, merge_s, separate_size, merged_size = separate_then_merge(reports)
+        bundle_s, bundle_size = bundled(reports)
+        index_s, _ = bundled(reports, index=True)
+        if merge:
+            separate = (f"{render_s * 1000:>10.0f} {merge_s * 1000:>9.0f} {separate_size / 1024:>12.0f} "
+                        f"{merged_size / 1024:>10.0f}")
+            speedup = f"{(render_s + merge_s) / bundle_s:>8.1f}x"
+        else:
+            separate, speedup = f"{'-':>10} {'-':>9} {'-':>12} {'-':>10}", f"{'-':>9}"
+        print(f"{n:>8} {separate} {bundle_s * 1000:>10.0f} {bundle_size / 1024:>10.0f} "
+              f"{speedup} {(index_s - bundle_s) * 1000:>10.0f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
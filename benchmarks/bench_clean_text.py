@@ -0,0 +1,77 @@
+import re
+import sys
+import time
+
+from blueberry import text as text_mod
+from blueberry.parser import extract_report
+
+from .synthetic import generate_report
+
+# clean_text throughput: the original chained replace + regex version against the
+# translate-based one (cold memo, warm memo) and the batch API, over every string a
+# report hands to the renderer. Also checks that all variants agree.
+
+def legacy_clean_text(text):
+    if not text: return ""
+    replacements = {
+        '‘': "'", '’': "'", '“': '"', '”': '"',
+        '–': '-', '—': '-', '…': '...', '\n': ' ', '\t': ' ', '\r': '',
+        ' ': ' '
+    }
+    for k, v in replacements.items():
+        text = text.replace(k, v)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text.encode('latin-1', 'ignore').decode('latin-1')
+
+def report_strings(report):
+    out = [report.subtitle]
+    if report.alert: out += [report.alert.title, report.alert.text]
+    for m in report.index or []: out += [m.label, m.value]
+    out += [b.text for b in report.assessment or []]
+    for c in list(report.cards) + list(report.watchlist or []):
+        out += [c.ticker, c.name] + list(c.details)
+        for k, v in c.params.items(): out += [k, v]
+        out += [getattr(c, 'rationale', ''), getattr(c, 'confidence', '')]
+    out += list(report.notes)
+    if report.disclaimer: out += [report.disclaimer.title, report.disclaimer.text]
+    return out
+
+def timed(fn, strings, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(strings)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main(argv=None):
+    sizes = [int(a) for a in (argv or sys.argv[1:])] or [40, 400]
+    print(f"{'cards':>6} {'strings':>8} {'variant':<12} {'ms':>8} {'Mstr/s':>8} {'MB/s':>8}")
+    for n in sizes:
+        strings = report_strings(extract_report(generate_report(cards=n, watchlist=max(n // 10, 4))))
+        strings = [s + ' — “x”' if i % 3 == 0 else s for i, s in enumerate(strings)]
+        mb = sum(len(s) for s in strings) / 1e6
+
+        expected = [legacy_clean_text(s) for s in strings]
+        assert [text_mod.clean_text(s) for s in strings] == expected
+        assert text_mod.clean_texts(strings) == expected
+
+        def cold(ss):
+            text_mod._clean_memo.cache_clear()
+            for s in ss: text_mod.clean_text(s)
+
+        variants = [
+            ('legacy', lambda ss: [legacy_clean_text(s) for s in ss]),
+            ('cold memo', cold),
+            ('warm memo', lambda ss: [text_mod.clean_text(s) for s in ss]),
+            ('batch', text_mod.clean_texts),
+        ]
+        for name, fn in variants:
+            t = timed(fn, strings, 5)
+            print(f"{n:>6} {len(strings):>8} {name:<12} {t * 1000:>8.2f} "
+                  f"{len(strings) / t / 1e6:>8.2f} {mb / t:>8.1f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import math
+import random
+import re
+import sys
+import time
+
+import pandas as pd
+
+from blueberry.export import NUMBER_PATTERN, RAW_COLUMNS, trades_frame
+
+# Trade export: parsing entry/target/stop strings one cell at a time in Python (then
+# building a frame from the results) versus column-wise over the whole dataset with
+# trades_frame, on synthetic rows shaped like the parameters reports carry. The
+# columnar side also parses dates and stated R:R. Both must agree before anything is
+# timed.
+#
+# Below a few thousand rows the columnar side is slower here: it builds the whole
+# export frame (24 columns, dates, categories) while the per-row side builds 5 numeric
+# columns, and that fixed ~10-20 ms of frame assembly is most of a small run. It is paid
+# once per export, not per report, and short columns are already parsed in re (see
+# export.SMALL_COLUMN), so the row-by-row path is not kept as a second implementation.
+
+_NUMBER = re.compile(NUMBER_PATTERN)
+NUMERIC = ('entry', 'target', 'stop', 'rr', 'stop_distance_pct')
+
+def synthetic_rows(n, seed=1):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        entry = round(rng.uniform(2, 120), 2)
+        shape = i % 5
+        entry_raw = (f"{entry:.2f}-{entry * 1.03:.2f}" if shape < 2 else
+                     f"{entry:,.2f}" if shape == 2 else f"EGP {entry:.2f}" if shape == 3 else f"{entry} to {entry + 1}")
+        target_raw = f"{rng.randint(5, 25)}%" if i % 7 == 0 else f"{entry * 1.15:.2f}"
+        stop_raw = f"{rng.randint(3, 8)}%" if i % 11 == 0 else f"{entry * 0.93:.2f}"
+        rows.append(('bench', f"{1 + i % 28} October 2026", 'card', f"TK{i % 300:04d}", '', 'buy', 'Setup', '',
+                     entry_raw, target_raw, stop_raw, f"1:{rng.choice((1.5, 2, 2.5, 3))}", None))
+    return rows
+
+def parse_cell(text):
+    m = _NUMBER.search(text.replace(',', '')) if text else None
+    if not m: return math.nan, math.nan, False
+    lo = float(m['lo'])
+    return lo, float(m['hi']) if m['hi'] else lo, bool(m['pct'])
+
+# The per-row version of trades_frame's numeric columns.
+def row_by_row(rows):
+    i_entry, i_target, i_stop = (RAW_COLUMNS.index(c) for c in ('entry_raw', 'target_raw', 'stop_raw'))
+    out = []
+    for row in rows:
+        lo, hi, _ = parse_cell(row[i_entry])
+        entry = (lo + hi) / 2
+        t, _, t_pct = parse_cell(row[i_target])
+        s, _, s_pct = parse_cell(row[i_stop])
+        target = entry * (1 + abs(t) / 100) if t_pct else t
+        stop = entry * (1 - abs(s) / 100) if s_pct else s
+        risk, reward = entry - stop, target - entry
+        out.append((entry, target, stop, reward / risk if risk > 0 else math.nan,
+                    risk / entry * 100 if entry > 0 else math.nan))
+    return pd.DataFrame.from_records(out, columns=NUMERIC)
+
+def columnar(rows):
+    return trades_frame(rows)[list(NUMERIC)]
+
+def best_ms(fn, rows, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+def main(argv=None):
+    sizes = [int(a) for a in (argv or sys.argv[1:])] or [100, 1_000, 10_000, 100_000]
+    check = synthetic_rows(2_000)
+    expected = list(row_by_row(check).itertuples(index=False, name=None))
+    got = list(columnar(check).itertuples(index=False, name=None))
+    assert all(all(math.isclose(a, b, rel_tol=1e-9) or (math.isnan(a) and math.isnan(b)) for a, b in zip(e, g))
+               for e, g in zip(expected, got))
+
+    print(f"{'rows':>8} {'row-by-row ms':>14} {'columnar ms':>12} {'speed-up':>9}")
+    for n in sizes:
+        rows = synthetic_rows(n)
+        slow, fast = best_ms(row_by_row, rows), best_ms(columnar, rows)
+        print(f"{n:>8} {slow:>14.1f} {fast:>12.1f} {slow / fast:>8.1f}x")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+
+from blueberry import fonts as fonts_mod
+from blueberry.layout import LayoutCache
+from blueberry.parser import extract_report
+from blueberry.pdf import PDF
+from blueberry.render import render_report
+
+from .synthetic import generate_report
+
+# Unicode fonts: what registering a TrueType family costs per document with fpdf's own
+# add_font (parse every time) versus the per-process template cache, and what a report
+# with Arabic company names costs to render and weighs against the core-font version.
+#
+#   python -m benchmarks.bench_fonts /path/to/dejavu-fonts   # or set BLUEBERRY_FONT_DIR
+
+NAMES = ['البنك التجاري الدولي', 'طلعت مصطفى القابضة', 'السويدي إليكتريك', 'فوري لتكنولوجيا البنوك']
+
+def register_ms(font_set, cached, repeat=5):
+    times = []
+    for _ in range(repeat):
+        pdf = PDF(dedupe_state=False)
+        start = time.perf_counter()
+        if cached:
+            fonts_mod.register_fonts(pdf, font_set)
+        else:
+            for style, path in font_set.files: pdf.add_font(font_set.family, style, path)
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+def arabic_report(cards):
+    report = extract_report(generate_report(cards=cards, watchlist=max(cards // 10, 4)))
+    for i, card in enumerate(report.cards):
+        card.name = f"{NAMES[i % len(NAMES)]} ({card.ticker})"
+    return report
+
+def render(report, font_set):
+    start = time.perf_counter()
+    pdf = render_report(report, layout_cache=LayoutCache(), fonts=font_set, fragments=False)
+    data = pdf.output()
+    return (time.perf_counter() - start) * 1000, len(data)
+
+def main(argv=None):
+    args = argv or sys.argv[1:]
+    location = args[0] if args else os.environ.get(fonts_mod.FONT_DIR_ENV)
+    font_set = fonts_mod.find_font_set(location)
+    if font_set is None:
+        print(f"No usable font set at {location!r}; pass a directory or .ttf, or set "
+              f"{fonts_mod.FONT_DIR_ENV}.", file=sys.stderr)
+        return 2
+    disk_kb = sum(os.path.getsize(p) for p in {p for _, p in font_set.files}) / 1024
+    print(f"font set {font_set.family}: {len(set(p for _, p in font_set.files))} file(s), {disk_kb:.0f} KB on disk")
+
+    start = time.perf_counter()
+    fonts_mod.register_fonts(PDF(dedupe_state=False), font_set)
+    print(f"first registration (parse + template): {(time.perf_counter() - start) * 1000:.1f} ms")
+    print(f"per document, add_font:      {register_ms(font_set, False):8.1f} ms")
+    print(f"per document, cached:        {register_ms(font_set, True):8.1f} ms")
+
+    print(f"{'cards':>6} {'core ms':>8} {'core KB':>8} {'unicode ms':>11} {'unicode KB':>11}")
+    for n in [int(a) for a in args[1:]] or [10, 100, 500]:
+        report = arabic_report(n)
+        render(report, font_set)
+        core_ms, core_size = render(report, False)
+        uni_ms, uni_size = render(report, font_set)
+        print(f"{n:>6} {core_ms:>8.1f} {core_size / 1024:>8.1f} {uni_ms:>11.1f} {uni_size / 1024:>11.1f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+import dataclasses
+import datetime
+import random
+import sys
+import time
+
+from blueberry.fragments import FragmentCache
+from blueberry.instrument import StageRecorder
+from blueberry.layout import LayoutCache
+from blueberry.parser import extract_report
+from blueberry.render import render_report
+
+from .synthetic import generate_report
+
+# Rendered-card fragment reuse across consecutive dailies. Day 2 is day 1 with a share
+# of the cards revised, one new card up front (so every later card sits somewhere
+# else) and one dropped. Day 2 is rendered fresh, with fragments off, and warm, from a
+# cache that rendered day 1; both share a warm layout cache so only the fragments
+# differ. "saved" is what the replays report (against the recorded draw, recording
+# overhead included), "measured" is fresh minus warm. Both PDFs (creation date pinned)
+# must be byte for byte the same; the exit status is non-zero otherwise.
+#
+#   python -m benchmarks.bench_fragments [cards ...]
+
+FIXED_DATE = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+CHANGED = 0.2
+
+def next_day(report, seed):
+    rng = random.Random(seed)
+    cards = list(report.cards)
+    for i in rng.sample(range(len(cards)), k=int(len(cards) * CHANGED)):
+        cards[i] = dataclasses.replace(cards[i], rationale=(cards[i].rationale or '') + ' Revised after the close.')
+    if cards:
+        cards.insert(0, dataclasses.replace(cards[-1], ticker='NEWCO'))
+        del cards[len(cards) // 2]
+    return dataclasses.replace(report, cards=cards)
+
+def render(report, layout, fragments, recorder=None):
+    start = time.perf_counter()
+    pdf = render_report(report, layout_cache=layout, fragments=fragments, recorder=recorder)
+    pdf.set_creation_date(FIXED_DATE)
+    pdf_bytes = bytes(pdf.output())
+    return pdf_bytes, time.perf_counter() - start
+
+def main(argv=None):
+    sizes = [int(a) for a in (argv or sys.argv[1:])] or [20, 100, 500]
+    print(f"{'cards':>6} {'changed':>8} {'reused':>7} {'ratio':>6} {'fresh ms':>9} {'warm ms':>8} "
+          f"{'saved ms':>9} {'measured':>9} {'same':>5}")
+    same = True
+    for n in sizes:
+        day1 = extract_report(generate_report(cards=n, watchlist=max(n // 10, 4), seed=n))
+        day2 = next_day(day1, n)
+        layout, cache = LayoutCache(), FragmentCache()
+        render(day1, layout, cache)
+        render(day2, layout, False)  # warm the layout cache for day 2's text
+        fresh, t_fresh = render(day2, layout, False)
+        recorder = StageRecorder()
+        warm, t_warm = render(day2, layout, cache, recorder)
+        summary = recorder.fragment_summary()
+        ok = fresh == warm
+        same = same and ok
+        print(f"{n:>6} {CHANGED:>8.0%} {summary['reused']:>7} {summary['reuse_ratio']:>6.0%} "
+              f"{t_fresh * 1000:>9.1f} {t_warm * 1000:>8.1f} {summary['saved_ms']:>9.1f} "
+              f"{(t_fresh - t_warm) * 1000:>9.1f} {'yes' if ok else 'NO':>5}")
+    return 0 if same else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from blueberry.index import DocumentIndex
+from blueberry.parser import ANCHORS
+
+from .synthetic import generate_report
+
+# Lookup-phase benchmark: the whole-tree queries the parser used to issue straight
+# against the soup, versus building a DocumentIndex once and answering them from it.
+# Both paths must return the same elements; rendering is excluded on purpose.
+
+def legacy_lookups(soup):
+    found = [soup.find('div', class_='date'), soup.find(class_='alert-box'),
+             soup.find(string=re.compile("EXTREME CAUTION")),
+             soup.find(string=re.compile(r"(Current Level|Level:)"))]
+    idx_header = soup.find(lambda t: t.name in ['h2', 'h3'] and 'Index' in t.get_text(" ", strip=True))
+    found.append(idx_header.find_next(class_=['index-card', 'card']) if idx_header else None)
+    found.append(soup.find(lambda t: t.name in ['h2', 'h3'] and 'Market Trend' in t.get_text(" ", strip=True)))
+    for card in soup.find_all(class_=['setup-card', 'card']):
+        found.extend([card.find(class_='ticker'), card.find('h3'), card.find(class_='company-name'),
+                      card.find(class_='setup-type'), card.find(class_='rationale'), card.find(class_='confidence')])
+        params = card.find(class_='trade-params')
+        if params:
+            for b in params.find_all(class_='param-box'):
+                found.extend([b.find(class_='param-label'), b.find(class_='param-value')])
+        tech = card.find(class_='technical-details')
+        found.extend(tech.find_all('p') if tech else card.find_all('p'))
+    wl = soup.find(id='tab-watchlist') or soup.find(class_='watchlist') or soup.find(id='watch')
+    if wl:
+        for item in wl.find_all('div'):
+            found.append(item.find(['h3', 'h4', 'strong']))
+            found.append(bool(item.find_all('p')))
+    found.append(soup.find(lambda t: t.name in ['h2', 'h3'] and 'Notes' in t.get_text(" ", strip=True)))
+    found.append(soup.find(class_='disclaimer'))
+    return found
+
+def indexed_lookups(soup):
+    idx = DocumentIndex(soup, ANCHORS)
+    found = [idx.find('div', class_='date'), idx.find(class_='alert-box'),
+             idx.anchors.get('alert'), idx.anchors.get('index')]
+    idx_header = idx.heading('Index')
+    found.append(idx.find_next(idx_header, class_=['index-card', 'card']) if idx_header else None)
+    found.append(idx.heading('Market Trend'))
+    for card in idx.find_all(class_=['setup-card', 'card']):
+        found.extend([idx.find(class_='ticker', within=card), idx.find('h3', within=card),
+                      idx.find(class_='company-name', within=card), idx.find(class_='setup-type', within=card),
+                      idx.find(class_='rationale', within=card), idx.find(class_='confidence', within=card)])
+        params = idx.find(class_='trade-params', within=card)
+        if params:
+            for b in idx.find_all(class_='param-box', within=params):
+                found.extend([idx.find(class_='param-label', within=b), idx.find(class_='param-value', within=b)])
+        tech = idx.find(class_='technical-details', within=card)
+        found.extend(idx.find_all('p', within=tech or card))
+    wl = idx.find_id('tab-watchlist') or idx.find(class_='watchlist') or idx.find_id('watch')
+    if wl:
+        for item in idx.find_all('div', within=wl):
+            found.append(idx.find(['h3', 'h4', 'strong'], within=item))
+            found.append(idx.find('p', within=item) is not None)
+    found.append(idx.heading('Notes'))
+    found.append(idx.find(class_='disclaimer'))
+    return found
+
+def best_of(fn, arg, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main(argv=None):
+    sizes = [int(a) for a in (argv or sys.argv[1:])] or [10, 100, 300, 1000]
+    print(f"{'cards':>6} {'tags':>7} {'legacy ms':>10} {'index ms':>10} {'speed-up':>9}")
+    for n in sizes:
+        soup = BeautifulSoup(generate_report(cards=n, watchlist=max(n // 10, 4)), 'html.parser')
+        repeat = 5 if n <= 300 else 2
+        t_old, old = best_of(legacy_lookups, soup, repeat)
+        t_new, new = best_of(indexed_lookups, soup, repeat)
+        if len(old) != len(new) or any(a is not b for a, b in zip(old, new) if not isinstance(a, bool)):
+            print(f"lookup results differ for {n} cards", file=sys.stderr)
+            return 1
+        tags = len(soup.find_all(True))
+        print(f"{n:>6} {tags:>7} {t_old * 1000:>10.1f} {t_new * 1000:>10.1f} {t_old / t_new:>8.1f}x")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,39 @@
+import sys
+import time
+
+from blueberry.layout import LayoutCache
+from blueberry.parser import extract_report
+from blueberry.render import render_report
+
+from .synthetic import generate_report
+
+# Layout measurement cache: render the same reports with the cache disabled, cold
+# and warm (a second report sharing most text, as consecutive dailies do), and print
+# render time plus line-break / string-width hit rates. Card fragments are off, or the
+# warm renders would replay cards instead of wrapping their text.
+
+def render_with(report, cache):
+    start = time.perf_counter()
+    pdf = render_report(report, layout_cache=cache, fragments=False)
+    pdf.output()
+    return time.perf_counter() - start
+
+def main(argv=None):
+    sizes = [int(a) for a in (argv or sys.argv[1:])] or [10, 100, 500]
+    print(f"{'cards':>6} {'no cache ms':>12} {'cold ms':>9} {'warm ms':>9} {'line hits':>10} {'width hits':>11}")
+    for n in sizes:
+        report = extract_report(generate_report(cards=n, watchlist=max(n // 10, 4)))
+        disabled = LayoutCache(max_lines=0, max_widths=0)
+        t_off = render_with(report, disabled)
+        cache = LayoutCache()
+        t_cold = render_with(report, cache)
+        cold = cache.stats()
+        t_warm = render_with(report, cache)
+        print(f"{n:>6} {t_off * 1000:>12.1f} {t_cold * 1000:>9.1f} {t_warm * 1000:>9.1f} "
+              f"{cold['line_hit_rate']:>9.0%} {cold['width_hit_rate']:>10.0%}  (cold)")
+        warm = cache.stats()
+        print(f"{'':>6} {'':>12} {'':>9} {'':>9} {warm['line_hit_rate']:>9.0%} {warm['width_hit_rate']:>10.0%}  (after warm run)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import sys
+import time
+
+from blueberry.layout import LayoutCache
+from blueberry.parser import extract_report
+from blueberry.render import build_blocks, paginate, render_report
+from blueberry.pagination import scratch_pdf
+
+from .synthetic import generate_report
+
+# Two-pass layout: time spent measuring + paginating versus drawing, how full the
+# pages end up, and what fanning card measurement out to worker processes buys on
+# long documents. Every run uses a fresh layout cache and its own seed, so neither the
+# caller's cache nor the measuring workers' caches have seen its text before.
+
+def page_fill(blocks, top, trigger):
+    used = {}
+    for b in blocks:
+        if b.page is None: continue
+        used[b.page] = used.get(b.page, 0) + b.height
+    usable = trigger - top
+    return sum(min(u, usable) for u in used.values()) / (usable * len(used)) if used else 0.0
+
+def layout_only(report, workers):
+    cache = LayoutCache()
+    pdf = scratch_pdf(cache, fragments=False)
+    start = time.perf_counter()
+    blocks = build_blocks(pdf, report, toc=True, measure_workers=workers)
+    pages = paginate(blocks, pdf.content_top, pdf.page_break_trigger, 1, pdf.content_top)
+    return time.perf_counter() - start, blocks, pages, pdf
+
+def full_render(report, workers):
+    start = time.perf_counter()
+    pdf = render_report(report, layout_cache=LayoutCache(), toc=True, measure_workers=workers, fragments=False)
+    pdf.output()
+    return time.perf_counter() - start
+
+def main(argv=None):
+    args = argv or sys.argv[1:]
+    workers = int(args[0]) if args else 4
+    cases = [('mixed-200', dict(cards=200)), ('mixed-1000', dict(cards=1000, watchlist=100)),
+             ('long-text-200', dict(cards=200, words=120))]
+    # Start the measuring pool once so its start-up is not billed to the first case.
+    layout_only(extract_report(generate_report(cards=80, seed=0)), workers)
+
+    print(f"{'case':<15} {'blocks':>7} {'pages':>6} {'fill':>6} {'layout ms':>10} "
+          f"{'render ms':>10} {f'layout x{workers} ms':>15} {f'render x{workers} ms':>15}")
+    for name, params in cases:
+        reports = [extract_report(generate_report(seed=seed, **params)) for seed in range(1, 5)]
+        t_layout, blocks, pages, pdf = layout_only(reports[0], None)
+        fill = page_fill(blocks, pdf.content_top, pdf.page_break_trigger)
+        t_layout_par = layout_only(reports[1], workers)[0]
+        t_render = full_render(reports[2], None)
+        t_render_par = full_render(reports[3], workers)
+        print(f"{name:<15} {len(blocks):>7} {pages:>6} {fill:>6.0%} {t_layout * 1000:>10.0f} "
+              f"{t_render * 1000:>10.0f} {t_layout_par * 1000:>15.0f} {t_render_par * 1000:>15.0f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+import datetime
+import sys
+import time
+
+from blueberry.engines import available_engines, make_soup
+from blueberry.parser import extract_report
+from blueberry.render import render_report
+
+from .suite import cold_start
+from .synthetic import generate_report
+
+# Parser-engine conformance and speed. Every installed engine must extract the same
+# Report (cards, alert, index metrics, watchlist, ...) and render the same PDF
+# (creation date pinned) for each document. Extra HTML files may be passed on the
+# command line; the exit status is non-zero on any mismatch. Malformed markup is
+# covered by tests/test_engines.py. Each engine's render starts cold (see
+# suite.cold_start) with card fragments off, so run order does not favour either.
+
+FIXED_DATE = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+def render(html_content, engine):
+    report = extract_report(html_content, engine)
+    pdf = render_report(report, fragments=False)
+    pdf.set_creation_date(FIXED_DATE)
+    return report.to_dict(), bytes(pdf.output())
+
+def corpus(paths):
+    docs = [(f"synthetic-{n}", generate_report(cards=n, watchlist=max(n // 10, 4))) for n in (0, 10, 100, 500)]
+    for path in paths:
+        with open(path, 'rb') as f: raw = f.read()
+        try: docs.append((path, raw.decode('utf-8')))
+        except UnicodeDecodeError: docs.append((path, raw.decode('latin-1')))
+    return docs
+
+def main(argv=None):
+    engines = available_engines()
+    print(f"engines: {', '.join(engines)}")
+    print(f"{'document':<28}" + "".join(f"{e + ' parse':>18}{e + ' total':>18}" for e in engines))
+    for engine in engines: make_soup('<p>warm-up</p>', engine)  # imports, not parsing
+    failures = 0
+    for label, html_content in corpus(argv if argv is not None else sys.argv[1:]):
+        row = f"{label[-28:]:<28}"
+        reference = None
+        for engine in engines:
+            cold_start()
+            start = time.perf_counter()
+            make_soup(html_content, engine)
+            parse_s = time.perf_counter() - start
+            start = time.perf_counter()
+            out = render(html_content, engine)
+            total_s = time.perf_counter() - start
+            row += f"{parse_s * 1000:>15.1f} ms{total_s * 1000:>15.1f} ms"
+            if reference is None:
+                reference = out
+                continue
+            for part, a, b in (('extracted report', reference[0], out[0]), ('PDF', reference[1], out[1])):
+                if a != b:
+                    failures += 1
+                    print(f"MISMATCH: {label} {part} differs between {engines[0]} and {engine}", file=sys.stderr)
+        print(row)
+    print("conformance:", "OK" if not failures else f"{failures} mismatch(es)")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import sys
+import time
+
+from blueberry.engines import make_soup
+from blueberry.index import DocumentIndex
+from blueberry.rules import load_rules
+
+from .synthetic import generate_report
+
+# Extraction rules: the original hardcoded keyword scans against the compiled rules,
+# on the keys and card ancestors of real synthetic reports. Parameter-key checks run
+# per "key: value" paragraph; ancestor checks per card (two walks each originally,
+# one memoized walk per container now). Both sides must agree before timing.
+
+PARAM_WORDS = ['entry', 'target', 'stop', 'r:r', 'current', 'action', 'decision', 'gain', 'loss']
+
+def legacy_param_kind(key):
+    if any(k in key for k in PARAM_WORDS): return 'param'
+    if 'setup' in key: return 'setup'
+    return None
+
+def legacy_ancestors(card):
+    is_watch, mode = False, None
+    curr = card.parent
+    for _ in range(4):
+        if not curr: break
+        cid = str(curr.get('id', '')).lower()
+        cclass = str(curr.get('class', '')).lower()
+        if 'watch' in cid or 'watch' in cclass: is_watch = True
+        curr = curr.parent
+    curr = card.parent
+    for _ in range(4):
+        if not curr: break
+        cid = str(curr.get('id', '')).lower()
+        if 'open' in cid or 'pos' in cid: mode = 'open'
+        elif 'reduce' in cid or 'sell' in cid: mode = 'sell'
+        curr = curr.parent
+    return is_watch, mode
+
+def rules_param_kind(rules, key):
+    kinds = rules.param_keys.categories(key)
+    return 'param' if 'param' in kinds else 'setup' if 'setup' in kinds else None
+
+def collect(cards):
+    idx = DocumentIndex(make_soup(generate_report(cards=cards, watchlist=cards // 10, variant='plain')))
+    keys = []
+    for p in idx.find_all('p'):
+        txt = p.get_text(" ", strip=True)
+        if ':' in txt: keys.append(txt.split(':', 1)[0].strip().lower())
+    return keys, idx.find_all(class_=['setup-card', 'card'])
+
+def best_ms(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+def main(argv=None):
+    sizes = [int(a) for a in (argv or sys.argv[1:])] or [200, 2000]
+    rules = load_rules()
+    print(f"{'cards':>6} {'keys':>7} {'keys legacy ms':>15} {'keys rules ms':>14} "
+          f"{'ancestors legacy ms':>20} {'ancestors rules ms':>19}")
+    for n in sizes:
+        keys, cards = collect(n)
+        assert [legacy_param_kind(k) for k in keys] == [rules_param_kind(rules, k) for k in keys]
+        modes = rules.ancestors()
+        assert [legacy_ancestors(c) for c in cards] == [modes.walk(c.parent) for c in cards]
+
+        def rules_keys():
+            rules.param_keys.categories.cache_clear()
+            for k in keys: rules_param_kind(rules, k)
+        def rules_ancestors():
+            modes = rules.ancestors()
+            for c in cards: modes.walk(c.parent)
+        t_keys_old = best_ms(lambda: [legacy_param_kind(k) for k in keys])
+        t_anc_old = best_ms(lambda: [legacy_ancestors(c) for c in cards])
+        print(f"{n:>6} {len(keys):>7} {t_keys_old:>15.2f} {best_ms(rules_keys):>14.2f} "
+              f"{t_anc_old:>20.2f} {best_ms(rules_ancestors):>19.2f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
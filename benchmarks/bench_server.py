@@ -0,0 +1,71 @@
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from blueberry.server import RenderService, make_server, percentile
+
+from .synthetic import generate_report
+
+# Load test for the local render service: starts it in-process on a free port (no
+# cache, so every request renders), drives it with concurrent clients over plain
+# HTTP and prints throughput, client-side latency percentiles, status codes and the
+# service's own /metrics. Push --clients past workers + queue to see 429s.
+
+def post(url, body):
+    start = time.perf_counter()
+    req = urllib.request.Request(url, data=body, method='POST')
+    try:
+        with urllib.request.urlopen(req, timeout=120) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    return status, time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_server')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--queue', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--cards', type=int, default=20)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    args = parser.parse_args(argv)
+
+    service = RenderService(args.workers, args.queue, args.timeout)
+    start = time.perf_counter()
+    service.start()
+    print(f"{args.workers} worker(s) started and warmed in {time.perf_counter() - start:.2f}s")
+    httpd = make_server(service, port=0, quiet=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+
+    bodies = [generate_report(cards=args.cards, seed=i).encode('utf-8') for i in range(args.requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as clients:
+        results = list(clients.map(lambda b: post(base + '/render', b), bodies))
+    wall = time.perf_counter() - start
+
+    statuses = Counter(status for status, _ in results)
+    ok = sorted(t for status, t in results if status == 200)
+    print(f"{len(results)} requests, {args.clients} clients, {wall:.2f}s wall, "
+          f"{len(ok) / wall:.2f} PDFs/s, statuses {dict(sorted(statuses.items()))}")
+    if ok:
+        print("client latency ms: " + " | ".join(
+            f"p{int(q * 100)} {percentile(ok, q) * 1000:.0f}" for q in (0.5, 0.9, 0.99)))
+    with urllib.request.urlopen(base + '/metrics') as resp:
+        print(json.dumps(json.load(resp), indent=2))
+
+    httpd.shutdown()
+    service.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+import time
+
+# Startup cost: how long `import blueberry` takes with lazy exports versus loading
+# the whole renderer, and how long the Streamlit script takes on a cold start
+# versus a rerun (via streamlit's AppTest harness, no server or browser needed).
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_CASES = [
+    ('import blueberry', 'import blueberry'),
+    ('light submodules', 'import blueberry.cache, blueberry.batch, blueberry.instrument'),
+    ('full renderer', 'import blueberry.parser'),
+]
+
+def import_ms(stmt, repeat=5):
+    code = f"import time; t = time.perf_counter(); {stmt}; print((time.perf_counter() - t) * 1000)"
+    runs = [float(subprocess.check_output([sys.executable, '-c', code], cwd=ROOT, text=True))
+            for _ in range(repeat)]
+    return min(runs)
+
+def app_runs(reruns=10):
+    from streamlit.testing.v1 import AppTest
+    start = time.perf_counter()
+    at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=60).run()
+    cold = (time.perf_counter() - start) * 1000
+    times = []
+    for i in range(reruns):
+        box = at.sidebar.checkbox[0]
+        start = time.perf_counter()
+        (box.check() if i % 2 == 0 else box.uncheck()).run()
+        times.append((time.perf_counter() - start) * 1000)
+    return cold, sorted(times)
+
+def main():
+    print("Import time (fresh interpreter, best of 5):")
+    for label, stmt in IMPORT_CASES:
+        print(f"  {label:<18} {import_ms(stmt):8.1f} ms")
+
+    cold, reruns = app_runs()
+    print("\nStreamlit script (AppTest, includes harness overhead):")
+    print(f"  cold start         {cold:8.1f} ms")
+    print(f"  rerun median       {reruns[len(reruns) // 2]:8.1f} ms")
+    print(f"  rerun max          {reruns[-1]:8.1f} ms")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
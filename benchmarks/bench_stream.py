@@ -0,0 +1,63 @@
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from blueberry.budget import Budget, Limits
+from blueberry.parser import decode_html, extract_report
+from blueberry.stream import extract_report_stream
+
+from .synthetic import generate_report
+
+# Whole-document extraction (read, decode, one soup) against the streaming one as the
+# report grows: more and more cards, the same 40-item watchlist. Peak is the
+# tracemalloc high-water mark of the extraction; the Report it returns grows with the
+# cards on both sides, so the working set above it is shown as well, and that is what
+# should stay flat when streaming. Both sides must give the same report. Limits are
+# lifted so the largest sizes are not rejected.
+#
+#   python -m benchmarks.bench_stream [cards ...]
+
+LIMITS = Limits(max_input_mb=1024, max_nodes=10**8, max_seconds=3600, max_memory_mb=10**6)
+
+def whole(path):
+    with open(path, 'rb') as f: data = f.read()
+    return extract_report(decode_html(data), budget=Budget(LIMITS))
+
+def streamed(path):
+    with open(path, 'rb') as f: return extract_report_stream(f, budget=Budget(LIMITS))
+
+def measure(fn, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        report = fn(path)
+        seconds = time.perf_counter() - start
+        gc.collect()  # soups are reference cycles; what survives this is the report
+        kept, peak = tracemalloc.get_traced_memory()
+        return report, seconds, peak, kept
+    finally:
+        tracemalloc.stop()
+
+def main(argv=None):
+    sizes = [int(a) for a in (argv or sys.argv[1:])] or [250, 1000, 4000]
+    print(f"{'cards':>6} {'file MB':>8} {'report MB':>10} {'whole peak':>11} {'stream peak':>12} "
+          f"{'whole +':>8} {'stream +':>9} {'whole s':>8} {'stream s':>9} {'same':>5}")
+    same = True
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, f'report-{n}.html')
+            with open(path, 'w', encoding='utf-8') as f: f.write(generate_report(cards=n, watchlist=40, seed=n))
+            full, full_s, full_peak, kept = measure(whole, path)
+            part, part_s, part_peak, _ = measure(streamed, path)
+            ok = full.to_json() == part.to_json()
+            same = same and ok
+            print(f"{n:>6} {os.path.getsize(path) / 2**20:>8.1f} {kept / 2**20:>10.1f} {full_peak / 2**20:>11.1f} "
+                  f"{part_peak / 2**20:>12.1f} {(full_peak - kept) / 2**20:>8.1f} {(part_peak - kept) / 2**20:>9.1f} "
+                  f"{full_s:>8.2f} {part_s:>9.2f} {'yes' if ok else 'NO':>5}")
+    return 0 if same else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from blueberry.index import DocumentIndex
+from blueberry.parser import extract_watchlist
+from blueberry.text import safe_get_text
+
+from .synthetic import generate_report
+
+# Watchlist extraction scaling with nesting depth and item count: the previous
+# find_all('div') + per-div find / find_all('p') scan against the linear sweeps in
+# parser.find_watchlist_items (DocumentIndex construction included). That both find
+# the same titles is checked in tests/test_watchlist.py.
+
+def legacy_watchlist(soup):
+    container = soup.find(id='tab-watchlist')
+    valid_items, seen_titles = [], set()
+    for item in container.find_all('div', recursive=True):
+        h = item.find(['h3', 'h4', 'strong'])
+        if not h: continue
+        title_text = safe_get_text(h)
+        if not title_text or len(title_text) < 3 or title_text in seen_titles: continue
+        if len(item.find_all('p')) > 0:
+            seen_titles.add(title_text)
+            valid_items.append(item)
+    return [(safe_get_text(item.find(['h3', 'h4', 'strong'])), [safe_get_text(p) for p in item.find_all('p')])
+            for item in valid_items]
+
+def linear_watchlist(soup):
+    return extract_watchlist(DocumentIndex(soup))
+
+def timed(fn, soup, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(soup)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main(argv=None):
+    cases = [(depth, items) for items in (20, 100) for depth in (0, 5, 20, 50)] + [(10, 500)]
+    print(f"{'depth':>6} {'items':>6} {'divs':>7} {'legacy ms':>10} {'linear ms':>10} {'speed-up':>9} {'found':>6}")
+    for depth, items in cases:
+        html_content = generate_report(cards=0, watchlist=items, nesting=depth)
+        soup = BeautifulSoup(html_content, 'html.parser')
+        t_old, _ = timed(legacy_watchlist, soup)
+        t_new, new = timed(linear_watchlist, soup)
+        divs = len(soup.find(id='tab-watchlist').find_all('div'))
+        print(f"{depth:>6} {items:>6} {divs:>7} {t_old * 1000:>10.1f} {t_new * 1000:>10.1f} "
+              f"{t_old / t_new:>8.1f}x {len(new):>6}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
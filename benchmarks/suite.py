@@ -0,0 +1,177 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+
+import fpdf
+
+from blueberry import text as text_mod
+from blueberry.fragments import default_fragment_cache
+from blueberry.instrument import StageRecorder
+from blueberry.layout import default_layout_cache
+from blueberry.parser import render_pdf_bytes
+
+from .synthetic import generate_report
+
+# Benchmark suite: renders synthetic reports across document sizes and markup shapes,
+# reports time and tracemalloc peak per stage, stores baselines as JSON and flags
+# stages that got slower (or hungrier) than the baseline by more than a threshold.
+#
+#   python -m benchmarks.suite                      # run and compare to the baseline
+#   python -m benchmarks.suite --save               # run and store as the baseline
+#   python -m benchmarks.suite --quick --threshold 0.3
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+SIZES = [10, 50, 200, 1000, 2000]
+QUICK_SIZES = [10, 50, 200]
+
+# Absolute floors below which differences are noise, whatever the ratio.
+MIN_MS = 2.0
+MIN_KB = 64.0
+
+def scenarios(sizes):
+    for n in sizes:
+        yield f"mixed-{n}", dict(cards=n, watchlist=max(n // 10, 4))
+    n = sizes[min(2, len(sizes) - 1)]
+    yield f"setup-{n}", dict(cards=n, watchlist=8, variant='setup')
+    yield f"plain-{n}", dict(cards=n, watchlist=8, variant='plain')
+    yield f"long-text-{n}", dict(cards=n, watchlist=8, words=120)
+    yield "nested-watchlist", dict(cards=10, watchlist=200, nesting=12)
+
+# Every run starts cold (empty layout cache, card fragments and clean_text memo) so
+# results do not depend on what ran before in the same process.
+def cold_start():
+    default_layout_cache().clear()
+    fragments = default_fragment_cache()
+    if fragments: fragments.clear()
+    text_mod._clean_memo.cache_clear()
+    gc.collect()
+
+def render_once(html, memory):
+    cold_start()
+    recorder = StageRecorder(memory=memory).start()
+    try:
+        render_pdf_bytes(html, recorder=recorder)
+    finally:
+        recorder.stop()
+    return recorder
+
+def stage_key(r):
+    return f"{r['phase']}.{r['stage']}"
+
+# Timing takes the best of `repeat` runs without tracemalloc (it slows allocation
+# several-fold); memory peaks come from one extra traced run.
+def measure(params, repeat):
+    html = generate_report(**params)
+    best = None
+    for _ in range(repeat):
+        recorder = render_once(html, memory=False)
+        if best is None or recorder.total_ms() < best.total_ms(): best = recorder
+    traced = render_once(html, memory=True)
+    peaks = {stage_key(r): r['peak_kb'] for r in traced.records}
+
+    stages = {}
+    for r in best.records:
+        key = stage_key(r)
+        stages[key] = {'ms': r['ms'], 'peak_kb': peaks.get(key), 'pages': r['pages'], 'counts': r['counts']}
+    return {
+        'params': params,
+        'html_kb': round(len(html.encode('utf-8')) / 1024, 1),
+        'total_ms': round(best.total_ms(), 3),
+        'peak_kb': traced.to_dict()['peak_kb'],
+        'pages': best.to_dict()['pages'],
+        'stages': stages,
+    }
+
+def environment():
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+            'platform': platform.platform(), 'fpdf': fpdf.__version__}
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+def load_baseline(name):
+    path = baseline_path(name)
+    if not os.path.exists(path): return None
+    with open(path) as f: return json.load(f)
+
+def save_baseline(name, results):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    path = baseline_path(name)
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                   'results': results}, f, indent=2)
+    return path
+
+def regressions(current, baseline, threshold):
+    found = []
+    for scenario, res in current.items():
+        base = baseline.get(scenario)
+        if not base: continue
+        rows = [('total', res['total_ms'], base['total_ms'], res['peak_kb'], base['peak_kb'])]
+        for key, st in res['stages'].items():
+            b = base['stages'].get(key)
+            if b: rows.append((key, st['ms'], b['ms'], st['peak_kb'], b['peak_kb']))
+        for key, ms, base_ms, kb, base_kb in rows:
+            if ms - base_ms > MIN_MS and ms > base_ms * (1 + threshold):
+                found.append((scenario, key, 'time', base_ms, ms))
+            if kb is not None and base_kb is not None and kb - base_kb > MIN_KB and kb > base_kb * (1 + threshold):
+                found.append((scenario, key, 'memory', base_kb, kb))
+    return found
+
+def print_result(scenario, res, out=sys.stdout):
+    print(f"\n{scenario}: {res['html_kb']:.0f} KB HTML, {res['pages']} pages, "
+          f"{res['total_ms']:.1f} ms, peak {res['peak_kb'] or 0:.0f} KB", file=out)
+    print(f"  {'stage':<22} {'ms':>9} {'share':>6} {'peak KB':>9} {'pages':>6}  counts", file=out)
+    for key, st in res['stages'].items():
+        share = st['ms'] / res['total_ms'] if res['total_ms'] else 0
+        counts = ", ".join(f"{k}={v}" for k, v in st['counts'].items())
+        print(f"  {key:<22} {st['ms']:>9.2f} {share:>6.0%} {st['peak_kb'] or 0:>9.1f} {st['pages']:>6}  {counts}", file=out)
+    out.flush()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite', description='Render benchmark suite.')
+    parser.add_argument('--quick', action='store_true', help=f'Only sizes {QUICK_SIZES}.')
+    parser.add_argument('--sizes', type=int, nargs='+', help=f'Card counts (default {SIZES}).')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per scenario; the best is kept.')
+    parser.add_argument('--baseline', default='default', help='Baseline name under benchmarks/baselines/.')
+    parser.add_argument('--save', action='store_true', help='Store this run as the baseline.')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='Relative slowdown (or memory growth) that counts as a regression.')
+    parser.add_argument('--json', help='Also write the raw results to this file.')
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    results = {}
+    for scenario, params in scenarios(sizes):
+        results[scenario] = measure(params, max(args.repeat, 1))
+        print_result(scenario, results[scenario])
+
+    if args.json:
+        with open(args.json, 'w') as f: json.dump({'environment': environment(), 'results': results}, f, indent=2)
+    if args.save:
+        print(f"\nBaseline saved to {save_baseline(args.baseline, results)}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"\nNo baseline '{args.baseline}' yet; run with --save to create one.")
+        return 0
+    if baseline.get('environment') != environment():
+        print("\nWarning: baseline was recorded in a different environment:", baseline.get('environment'))
+
+    found = regressions(results, baseline['results'], args.threshold)
+    if not found:
+        print(f"\nNo regressions beyond {args.threshold:.0%} against baseline '{args.baseline}'.")
+        return 0
+    print(f"\n{len(found)} regression(s) beyond {args.threshold:.0%} against baseline '{args.baseline}':")
+    for scenario, key, kind, before, after in found:
+        unit = 'ms' if kind == 'time' else 'KB'
+        print(f"  {scenario:<18} {key:<22} {kind:<6} {before:>9.1f} -> {after:>9.1f} {unit} (+{after / before - 1:.0%})")
+    return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import random
+
+# --- SYNTHETIC EGX30 REPORTS ---
+SETUPS = ["Breakout", "Pullback", "Trend Continuation", "Reduce Exposure", "Distribution"]
+CONFIDENCE = ["HIGH Confidence", "MEDIUM Confidence", "LOW Confidence"]
+FILLER = ("momentum volume breadth support resistance accumulation liquidity foreign "
+          "institutional retail sector banking real-estate telecom rally pullback").split()
+
+# `words` extra filler words are appended to every free-text paragraph so the same
+# card count can be rendered with short or long wrapped text.
+def _filler(rng, words):
+    if not words: return ""
+    return " " + " ".join(rng.choice(FILLER) for _ in range(words))
+
+def _setup_card(i, rng, words=0):
+    entry = 10 + i * 0.1
+    return f'''<div class="setup-card">
+  <div class="card-header"><span class="ticker">TK{i:04d}</span><span class="company-name">Company {i} Holding – “Egypt”</span><span class="setup-type">{rng.choice(SETUPS)}</span></div>
+  <div class="trade-params">
+    <div class="param-box"><div class="param-label">Entry</div><div class="param-value">{entry:.2f}-{entry + 0.5:.2f}</div></div>
+    <div class="param-box"><div class="param-label">Target</div><div class="param-value">{entry + 2:.2f}</div></div>
+    <div class="param-box"><div class="param-label">Stop</div><div class="param-value">{entry - 1:.2f}</div></div>
+    <div class="param-box"><div class="param-label">R:R</div><div class="param-value">1:2.5</div></div>
+  </div>
+  <div class="technical-details"><p>RSI at 55 and rising, MACD crossing up with volume.{_filler(rng, words)}</p><p>Support at {entry - 0.2:.2f} — resistance {entry + 2:.2f}.</p></div>
+  <div class="rationale">Rationale: Strong accumulation over three sessions with improving breadth…{_filler(rng, words)}</div>
+  <div class="confidence">{rng.choice(CONFIDENCE)}</div>
+</div>'''
+
+def _plain_card(i, rng, words=0):
+    return f'''<div class="card"><h3>PL{i:04d} - Plain Co {i}</h3>
+<p>Entry: {20 + i}</p><p>Target: {25 + i}</p><p>Stop: {18 + i}</p><p>Setup: Momentum</p>
+<p>A descriptive paragraph without a key explaining the thesis in a few words{_filler(rng, words)}</p>
+<div class="rationale">Rationale: plain rationale {i}</div><div class="confidence">{rng.choice(CONFIDENCE)}</div></div>'''
+
+def _wrap(html, depth):
+    return '<div class="wrap">' * depth + html + '</div>' * depth
+
+def _watch_item(j):
+    return (f'<div class="wl-item"><div class="wl-head"><h4>WL{j:03d} - Watch Co {j}</h4></div>'
+            f'<div><p>Trigger: above {30 + j}</p><p>A longer explanation of why this name is on the '
+            f'watchlist today, written to run past eighty characters.</p></div></div>')
+
+# variant: 'mixed' (both markups, the default), 'setup' (setup-card / trade-params /
+# param-box only) or 'plain' (card + "key: value" paragraphs only).
+def generate_report(cards=40, watchlist=8, nesting=0, seed=1, variant='mixed', words=0):
+    if variant not in ('mixed', 'setup', 'plain'): raise ValueError(f"Unknown variant {variant!r}")
+    rng = random.Random(seed)
+    setup_card = _plain_card if variant == 'plain' else _setup_card
+    plain_card = _setup_card if variant == 'setup' else _plain_card
+    parts = ['<html><head><title>EGX30</title></head><body>',
+             '<div class="header"><h1>EGX30</h1><p>Daily Report</p></div><div class="date">Sunday, 12 October 2026</div>',
+             '<div class="alert-box"><h3>EXTREME CAUTION</h3><p>Market breadth is deteriorating — volumes are thin.</p></div>',
+             '<h2>EGX30 Index Status</h2><div class="index-card">']
+    for k in range(6):
+        parts.append(f'<div class="metric-row"><span class="metric-label">Metric {k}</span><span class="metric-value">{k * 100}</span></div>')
+    parts.append('</div><div><h2>Market Trend Assessment</h2><div><h3>Trend</h3><p>Uptrend intact.</p><h3>Breadth</h3><p>Narrow.</p></div></div>')
+
+    q = max(cards // 4, 1) if cards else 0
+    parts.append('<div id="open-positions">')
+    parts.extend(setup_card(i, rng, words) for i in range(0, min(q, cards)))
+    parts.append('</div><div id="new-setups">')
+    parts.extend(setup_card(i, rng, words) for i in range(q, min(2 * q, cards)))
+    parts.extend(plain_card(i, rng, words) for i in range(2 * q, min(3 * q, cards)))
+    parts.append('</div><div id="reduce-sell">')
+    parts.extend(setup_card(i, rng, words) for i in range(3 * q, cards))
+    parts.append('</div>')
+
+    # `nesting` wraps the watchlist grid and every item in that many extra divs,
+    # the way LLM-generated markup tends to.
+    items = "".join(_wrap(_watch_item(j), nesting) for j in range(watchlist))
+    parts.append('<div id="tab-watchlist"><h2>Watchlist</h2>' + _wrap(f'<div class="grid">{items}</div>', nesting) + '</div>')
+    parts.append('<div><h2>Technical Notes</h2><div><ul><li>Note one “quoted”</li><li>Note two – dash</li></ul></div></div>')
+    parts.append('<div class="disclaimer"><h3>Disclaimer</h3>This is not investment advice. Past performance…</div>')
+    parts.append('</body></html>')
+    return "\n".join(parts)
@@ -0,0 +1,39 @@
+import importlib
+
+# Public names resolve lazily (PEP 562): importing the package, or a light submodule
+# like .model or .instrument, does not pull in fpdf (~0.6 s, most of it fontTools) or
+# bs4 until something that needs them is actually used.
+_EXPORTS = {
+    "clean_text": ".text", "clean_texts": ".text", "clean_unicode": ".text", "safe_get_text": ".text",
+    "FontSet": ".fonts", "find_font_set": ".fonts", "default_font_set": ".fonts",
+    "PDF": ".pdf",
+    "available_engines": ".engines", "resolve_engine": ".engines", "make_soup": ".engines",
+    "Report": ".model", "Alert": ".model", "IndexMetric": ".model", "AssessmentBlock": ".model",
+    "Card": ".model", "WatchlistItem": ".model", "Disclaimer": ".model",
+    "render_report": ".render",
+    "extract_report": ".parser", "parse_and_generate_pdf": ".parser",
+    "decode_html": ".parser", "render_pdf_bytes": ".parser",
+    "PDFCache": ".cache", "cache_key": ".cache", "default_cache": ".cache",
+    "render_pdf_bytes_cached": ".cache",
+    "StageRecorder": ".instrument", "profiled": ".instrument",
+    "ZipCollector": ".batch", "render_uploads": ".batch",
+    "trade_rows": ".export", "trades_frame": ".export", "parse_numbers": ".export",
+    "Rules": ".rules", "load_rules": ".rules",
+    "Budget": ".budget", "BudgetExceeded": ".budget", "Limits": ".budget",
+    "render_bundle": ".bundle",
+    "extract_report_stream": ".stream", "render_pdf_stream": ".stream",
+    "FragmentCache": ".fragments", "default_fragment_cache": ".fragments",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,135 @@
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from .cache import cache_key
+
+# --- MULTI-FILE RENDERING ---
+# Uploaded reports arrive as (name, bytes) pairs rather than paths, so this is the
+# in-memory counterpart of cli.run_batch: a bounded process pool, results yielded as
+# each file finishes, and failures reported per file instead of aborting the batch.
+MAX_WORKERS = 4
+
+def pdf_name_for(name):
+    return os.path.splitext(os.path.basename(name))[0] + '.pdf'
+
+# Runs inside the pool; never raises so one bad report cannot take down the batch.
+# A PDF cut short by its budget is still ok; 'truncated' says why it is partial.
+def render_upload(name, bytes_data):
+    from .budget import Budget
+    from .stream import render_pdf_upload
+    start = time.perf_counter()
+    try:
+        budget = Budget()
+        pdf_bytes = render_pdf_upload(bytes_data, budget=budget)
+        return {'name': name, 'ok': True, 'error': None, 'cached': False, 'pdf': pdf_bytes,
+                'truncated': budget.exceeded, 'in_bytes': len(bytes_data), 'out_bytes': len(pdf_bytes),
+                'seconds': time.perf_counter() - start}
+    except Exception as e:
+        return failed_upload(name, bytes_data, f"{type(e).__name__}: {e}", time.perf_counter() - start)
+
+def failed_upload(name, bytes_data, error, seconds=0.0):
+    return {'name': name, 'ok': False, 'error': error, 'cached': False, 'pdf': None, 'truncated': None,
+            'in_bytes': len(bytes_data), 'out_bytes': 0, 'seconds': seconds}
+
+def worker_count(n_files, workers=None):
+    return max(1, min(workers or MAX_WORKERS, os.cpu_count() or 1, n_files))
+
+# Yields one result dict per file in completion order. Cache hits are answered
+# in-process before anything is submitted, identical uploads are rendered once, and
+# fresh renders are written back to `cache`.
+def render_uploads(files, workers=None, cache=None, mp_context=None, task=render_upload):
+    pending = {}
+    for name, bytes_data in files:
+        key = cache_key(bytes_data)
+        if key in pending:
+            pending[key][1].append(name)
+            continue
+        pdf_bytes = cache.get(key) if cache else None
+        if pdf_bytes is None:
+            pending[key] = (bytes_data, [name])
+            continue
+        yield {'name': name, 'ok': True, 'error': None, 'cached': True, 'pdf': pdf_bytes, 'truncated': None,
+               'in_bytes': len(bytes_data), 'out_bytes': len(pdf_bytes), 'seconds': 0.0}
+    if not pending: return
+
+    def finish(key, res):
+        if cache and res['ok'] and not res['truncated']: cache.put(key, res['pdf'])
+        for name in pending[key][1]:
+            yield dict(res, name=name)
+
+    workers = worker_count(len(pending), workers)
+    if workers <= 1:
+        for key, (bytes_data, names) in pending.items():
+            yield from finish(key, task(names[0], bytes_data))
+        return
+
+    # As in cli.run_batch: a dead worker breaks the pool and every future still in
+    # it, so those files go round again in a new pool, and a round in which nothing
+    # finished runs its first file alone until the one that kills its worker fails.
+    keys, alone = list(pending), False
+    while keys:
+        batch, rest = (keys[:1], keys[1:]) if alone else (keys, [])
+        broken = []
+        with ProcessPoolExecutor(max_workers=1 if alone else workers, mp_context=mp_context) as pool:
+            futures = {pool.submit(task, pending[key][1][0], pending[key][0]): key for key in batch}
+            for fut in as_completed(futures):
+                key = futures[fut]
+                try:
+                    res = fut.result()
+                except BrokenProcessPool:
+                    broken.append(key)
+                    continue
+                except Exception as e:
+                    res = failed_upload(pending[key][1][0], pending[key][0], f"{type(e).__name__}: {e}")
+                yield from finish(key, res)
+        if alone and broken:
+            yield from finish(broken[0], failed_upload(pending[broken[0]][1][0], pending[broken[0]][0],
+                                                       "BrokenProcessPool: the worker died while on this file"))
+            broken = []
+        alone = len(broken) == len(batch)
+        keys = [key for key in batch if key in broken] + rest
+
+# --- INCREMENTAL ZIP ---
+# Each PDF is compressed into the archive as soon as its render completes and the
+# result drops its reference, so only one finished PDF is held outside the archive at
+# a time. Duplicate upload names get a numeric suffix instead of overwriting.
+class ZipCollector:
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self._zip = zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED)
+        self._names = set()
+        self.files = 0
+        self.errors = []
+        self.partial = []
+
+    def _unique(self, arcname):
+        stem, ext = os.path.splitext(arcname)
+        n = 1
+        while arcname in self._names:
+            n += 1
+            arcname = f"{stem} ({n}){ext}"
+        self._names.add(arcname)
+        return arcname
+
+    def add(self, res):
+        if not res['ok']:
+            self.errors.append(f"{res['name']}: {res['error']}")
+            return None
+        arcname = self._unique(pdf_name_for(res['name']))
+        if res.get('truncated'): self.partial.append(f"{res['name']}: partial PDF, {res['truncated']}")
+        self._zip.writestr(arcname, res['pdf'])
+        res['pdf'] = None
+        res['arcname'] = arcname
+        self.files += 1
+        return arcname
+
+    # Failures and partial PDFs travel inside the archive too, so a downloaded ZIP
+    # explains its gaps.
+    def close(self):
+        if self.errors or self.partial:
+            self._zip.writestr(self._unique('errors.txt'), "\n".join(self.errors + self.partial) + "\n")
+        self._zip.close()
+        return self.fileobj
@@ -0,0 +1,107 @@
+import os
+import time
+from dataclasses import dataclass, fields, replace
+
+# --- PER-DOCUMENT BUDGETS ---
+# LLM-written reports occasionally arrive with tens of thousands of wrapper divs or a
+# multi-megabyte inline blob. Every document gets a Budget: input size and tag count
+# are checked before any real work and reject the document with BudgetExceeded; time
+# and memory are checked cooperatively at stage, card and block boundaries, and when
+# one runs out the document stops where it is and the PDF is finished with what was
+# drawn so far plus a notice saying it is incomplete. The process carries on with the
+# next document either way.
+LIMIT_ENV = {
+    'max_input_mb': 'BLUEBERRY_MAX_INPUT_MB',
+    'max_nodes': 'BLUEBERRY_MAX_NODES',
+    'max_seconds': 'BLUEBERRY_MAX_SECONDS',
+    'max_memory_mb': 'BLUEBERRY_MAX_MEMORY_MB',
+}
+
+@dataclass(frozen=True)
+class Limits:
+    max_input_mb: float = 32.0
+    max_nodes: int = 500_000
+    max_seconds: float = 60.0
+    max_memory_mb: float = 1024.0
+
+    @classmethod
+    def from_env(cls):
+        values = {}
+        for f in fields(cls):
+            raw = os.environ.get(LIMIT_ENV[f.name])
+            if raw: values[f.name] = type(f.default)(float(raw))
+        return cls(**values)
+
+    def with_seconds(self, seconds):
+        return replace(self, max_seconds=min(self.max_seconds, seconds))
+
+class BudgetExceeded(Exception):
+    def __init__(self, limit, message):
+        super().__init__(message)
+        self.limit = limit  # 'input' or 'nodes'
+
+    # Raised in pool workers, so it has to survive pickling back to the caller.
+    def __reduce__(self):
+        return type(self), (self.limit, str(self))
+
+# Extraction stops once this share of the time budget is gone, so there is time left
+# to draw what it found; drawing stops at DRAW_SHARE, leaving the rest for writing out.
+EXTRACT_SHARE = 0.5
+DRAW_SHARE = 0.85
+# Reading the resident set size costs a file read; time is checked every call.
+MEMORY_EVERY = 32
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f: pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # Peak rather than current, but it still grows with a runaway document.
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def utf8_size(text):
+    return len(text) if text.isascii() else len(text.encode('utf-8', 'surrogatepass'))
+
+class Budget:
+    def __init__(self, limits=None):
+        self.limits = limits or Limits.from_env()
+        self.started = time.perf_counter()
+        self.rss_start = rss_mb()
+        self.exceeded = None  # why the document was cut short, once it has been
+        self.out_of_memory = False
+        self._checks = 0
+
+    # The input limit is in bytes of UTF-8, as the streaming reader counts what it reads.
+    # A character is 1 to 4 bytes, so the text is only encoded when its length alone
+    # does not settle it.
+    def check_input(self, html):
+        limit = self.limits.max_input_mb * 1024 * 1024
+        size = utf8_size(html) if len(html) * 4 > limit else 0
+        if size > limit:
+            raise BudgetExceeded('input', f"input is {size / (1024 * 1024):.1f} MB, "
+                                          f"over the {self.limits.max_input_mb:g} MB limit")
+        # Opening tags, counted before parsing so a huge tree is never built; stray
+        # '<' in text can inflate this, hence the margin before the exact count.
+        estimate = html.count('<') - html.count('</')
+        if estimate > self.limits.max_nodes * 2:
+            raise BudgetExceeded('nodes', f"input has about {estimate} tags, over the {self.limits.max_nodes} limit")
+
+    def check_nodes(self, count):
+        if count > self.limits.max_nodes:
+            raise BudgetExceeded('nodes', f"document has {count} tags, over the {self.limits.max_nodes} limit")
+
+    # Cooperative checkpoint: True while the document is within its memory budget and
+    # the given share of its time budget. Running out of memory is final; exceeded
+    # keeps the first limit that was hit.
+    def ok(self, share=DRAW_SHARE):
+        if self.out_of_memory: return False
+        if time.perf_counter() > self.started + self.limits.max_seconds * share:
+            self.exceeded = self.exceeded or f"time limit of {self.limits.max_seconds:g}s reached"
+            return False
+        self._checks += 1
+        if self._checks % MEMORY_EVERY == 0 and rss_mb() - self.rss_start > self.limits.max_memory_mb:
+            self.out_of_memory = True
+            self.exceeded = self.exceeded or f"memory limit of {self.limits.max_memory_mb:g} MB reached"
+            return False
+        return True
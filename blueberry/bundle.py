@@ -0,0 +1,90 @@
+import time
+
+from .fonts import default_font_set
+from .instrument import NULL_RECORDER
+from .pagination import Block, paginate, scratch_pdf
+from .pdf import PDF
+from .render import draw_report, header_block
+from .stream import extract_report_file
+
+# --- BOUND MULTI-REPORT PDF ---
+# Weekly and monthly reviews: many parsed reports drawn into one PDF in a single pass
+# instead of rendered one by one and merged afterwards. Each report starts on a new
+# page with its own date in the page header; fonts (one embedded subset for the whole
+# volume) and the layout cache are shared by every report. The outline has a bookmark
+# per report (its date) with one per section under it, and a ticker index at the end
+# lists every card and watchlist item with the page it starts on.
+INDEX_TITLE = "Ticker Index"
+
+def render_bundle(reports, layout_cache=None, recorder=None, dedupe_state=False, fonts=None, budget=None,
+                  index=True, fragments=None):
+    rec = recorder or NULL_RECORDER
+    if fonts is None: fonts = default_font_set()
+    pdf = PDF(layout_cache=layout_cache, dedupe_state=dedupe_state, fonts=fonts, fragments=fragments)
+    pdf.budget = budget
+    if recorder: recorder.pdf = pdf
+    pdf.set_auto_page_break(auto=True, margin=15)
+
+    entries = []
+    for report in reports:
+        # The page header reads the subtitle, so it changes with the first new page.
+        pdf.subtitle_text = report.subtitle
+        pdf.add_page()
+        pdf.start_section(report.subtitle, level=0)
+        pdf.outline_level = 1
+        for block in draw_report(pdf, report, rec, budget=budget):
+            if block.card: entries.append((block.card, report.subtitle, block.page))
+    if index and entries:
+        with rec.stage('ticker_index'):
+            draw_ticker_index(pdf, entries)
+    return pdf
+
+# (ticker, name, [(subtitle, mode, page), ...]) sorted by ticker; a ticker's name is
+# the first one any report gave it.
+def ticker_index(entries):
+    rows = {}
+    for (item, mode), subtitle, page in entries:
+        ticker = item.ticker.strip().upper()
+        if not ticker: continue
+        row = rows.setdefault(ticker, [item.name.strip(), []])
+        if not row[0]: row[0] = item.name.strip()
+        row[1].append((subtitle, mode, page))
+    return [(ticker, name, refs) for ticker, (name, refs) in sorted(rows.items())]
+
+# Same two passes as a report: measure every row, paginate, then draw.
+def draw_ticker_index(pdf, entries):
+    m = scratch_pdf(pdf.layout, pdf.font_set)
+    pdf.subtitle_text = INDEX_TITLE
+    pdf.outline_level = 0
+    blocks = [header_block(pdf, m, 'ticker_index', INDEX_TITLE, True, pdf.reset_state)]
+    m.set_font('Arial', '', 9)
+    for ticker, name, refs in ticker_index(entries):
+        text = "; ".join(f"{subtitle} ({mode}) p. {page}" for subtitle, mode, page in refs)
+        text = pdf.clean(f"{name} - {text}" if name else text)
+        blocks.append(Block('ticker_index', m.measure_lines(165, 5, text) + [(1, 'gap')],
+                            lambda t=pdf.clean(ticker), x=text: draw_index_row(pdf, t, x)))
+    paginate(blocks, pdf.content_top, pdf.page_break_trigger, pdf.page_no(), pdf.get_y())
+    for block in blocks:
+        if block.break_before: pdf.add_page()
+        block.draw()
+
+def draw_index_row(pdf, ticker, text):
+    pdf.set_x(10)
+    pdf.set_font('Arial', 'B', 9)
+    pdf.cell(25, 5, ticker, 0, 0)
+    pdf.set_font('Arial', '', 9)
+    pdf.text_block(165, 5, text, 'L')
+    pdf.ln(1)
+
+# Runs inside the batch pool like extract_file; the parsed report travels back with
+# the result and the volume is drawn in the parent.
+def read_report_file(src, dst=None):
+    start = time.perf_counter()
+    try:
+        report, in_bytes = extract_report_file(src)
+        return {'src': src, 'dst': dst, 'ok': True, 'error': None, 'cached': False,
+                'truncated': report.truncated or None, 'in_bytes': in_bytes, 'out_bytes': 0,
+                'report': report, 'seconds': time.perf_counter() - start}
+    except Exception as e:
+        return {'src': src, 'dst': dst, 'ok': False, 'error': f"{type(e).__name__}: {e}", 'cached': False,
+                'in_bytes': 0, 'out_bytes': 0, 'report': None, 'seconds': time.perf_counter() - start}
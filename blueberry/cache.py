@@ -0,0 +1,221 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from .engines import resolve_engine
+from .fonts import default_font_set
+from .rules import load_rules
+
+# Bump when a change alters PDF output in a way the source fingerprint below cannot see.
+RENDERER_VERSION = 1
+
+
+_renderer_tag = None
+
+def renderer_tag():
+    global _renderer_tag
+    if _renderer_tag is None:
+        import fpdf
+        h = hashlib.sha256()
+        h.update(f"v{RENDERER_VERSION}|fpdf {getattr(fpdf, '__version__', '?')}|{resolve_engine()}".encode())
+        fonts = default_font_set()
+        h.update(f"|fonts {fonts.fingerprint() if fonts else 'core'}|rules {load_rules().fingerprint}".encode())
+        # Fingerprint the whole package source: any edit to the renderer invalidates old entries.
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in sorted(os.listdir(here)):
+            if not name.endswith('.py'): continue
+            with open(os.path.join(here, name), 'rb') as f: h.update(f.read())
+        _renderer_tag = h.hexdigest()[:16]
+    return _renderer_tag
+
+def cache_hasher():
+    h = hashlib.sha256(renderer_tag().encode())
+    h.update(b'\0')
+    return h
+
+def cache_key(bytes_data):
+    if isinstance(bytes_data, str): bytes_data = bytes_data.encode('utf-8')
+    h = cache_hasher()
+    h.update(bytes_data)
+    return h.hexdigest()
+
+# Same key, read from a binary file in chunks; leaves the file at its end.
+def cache_key_file(fileobj, chunk_bytes=1024 * 1024):
+    h = cache_hasher()
+    for chunk in iter(lambda: fileobj.read(chunk_bytes), b''): h.update(chunk)
+    return h.hexdigest()
+
+# --- 1. TWO-TIER CACHE ---
+class PDFCache:
+    def __init__(self, max_memory_bytes=64 * 1024 * 1024, max_memory_items=256,
+                 disk_dir=None, max_disk_bytes=512 * 1024 * 1024):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_memory_items = max_memory_items
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._mem = OrderedDict()
+        self._mem_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.evictions_memory = 0
+        self.evictions_disk = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    def get(self, key):
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                self.hits_memory += 1
+                return data
+
+        data = self._disk_get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits_disk += 1
+            self._mem_put(key, data)
+            return data
+
+    def put(self, key, data):
+        data = bytes(data)
+        with self._lock:
+            self._mem_put(key, data)
+        self._disk_put(key, data)
+
+    # keep() is asked after rendering whether the result may be stored (a PDF cut
+    # short by its budget is not). Returns (data, whether it came from the cache): the
+    # hit counters are shared by every caller, so they cannot tell one lookup's outcome.
+    def get_or_render(self, bytes_data, render, keep=None):
+        key = cache_key(bytes_data)
+        data = self.get(key)
+        if data is not None: return data, True
+        data = bytes(render())
+        if keep is None or keep(): self.put(key, data)
+        return data, False
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            self._mem_bytes = 0
+        for path, _, _ in self._disk_entries():
+            try: os.remove(path)
+            except OSError: pass
+        self._disk_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                'hits_memory': self.hits_memory,
+                'hits_disk': self.hits_disk,
+                'misses': self.misses,
+                'hit_rate': (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+                'memory_items': len(self._mem),
+                'memory_bytes': self._mem_bytes,
+                'disk_bytes': self._disk_bytes,
+                'evictions_memory': self.evictions_memory,
+                'evictions_disk': self.evictions_disk,
+            }
+
+    # --- memory tier (caller holds the lock) ---
+    def _mem_put(self, key, data):
+        if len(data) > self.max_memory_bytes: return
+        old = self._mem.pop(key, None)
+        if old is not None: self._mem_bytes -= len(old)
+        self._mem[key] = data
+        self._mem_bytes += len(data)
+        while self._mem and (self._mem_bytes > self.max_memory_bytes or len(self._mem) > self.max_memory_items):
+            _, evicted = self._mem.popitem(last=False)
+            self._mem_bytes -= len(evicted)
+            self.evictions_memory += 1
+
+    # --- disk tier ---
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key + '.pdf')
+
+    def _disk_entries(self):
+        if not self.disk_dir: return []
+        entries = []
+        for sub in os.scandir(self.disk_dir):
+            if not sub.is_dir(): continue
+            for entry in os.scandir(sub.path):
+                if not entry.name.endswith('.pdf'): continue
+                try: st = entry.stat()
+                except OSError: continue
+                entries.append((entry.path, st.st_size, st.st_mtime))
+        return entries
+
+    def _disk_get(self, key):
+        if not self.disk_dir: return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f: data = f.read()
+        except OSError:
+            return None
+        # mtime doubles as the LRU clock for eviction
+        try: os.utime(path)
+        except OSError: pass
+        return data
+
+    def _disk_put(self, key, data):
+        if not self.disk_dir or len(data) > self.max_disk_bytes: return
+        path = self._disk_path(key)
+        if os.path.exists(path): return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write-then-rename so concurrent readers (other workers) never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f: f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            try: os.remove(tmp)
+            except OSError: pass
+            return
+        with self._lock:
+            self._disk_bytes += len(data)
+            over = self._disk_bytes > self.max_disk_bytes
+        if over: self._disk_evict()
+
+    def _disk_evict(self):
+        # Rescan rather than trust the running total: other processes may share the directory.
+        entries = sorted(self._disk_entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for path, size, _ in entries:
+            if total <= self.max_disk_bytes: break
+            try: os.remove(path)
+            except OSError: continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self.evictions_disk += evicted
+
+# --- 2. DEFAULT CACHE ---
+_default_cache = None
+
+def default_cache():
+    global _default_cache
+    if _default_cache is None:
+        disk_mb = int(os.environ.get('BLUEBERRY_CACHE_DISK_MB', '512'))
+        _default_cache = PDFCache(disk_dir=os.environ.get('BLUEBERRY_CACHE_DIR') or None,
+                                  max_disk_bytes=disk_mb * 1024 * 1024)
+    return _default_cache
+
+# Returns (pdf_bytes, whether they came from the cache).
+def render_pdf_bytes_cached(bytes_data, cache=None, recorder=None, budget=None):
+    from .budget import Budget
+    from .stream import render_pdf_upload
+    cache = cache or default_cache()
+    budget = budget or Budget()
+    return cache.get_or_render(bytes_data, lambda: render_pdf_upload(bytes_data, recorder=recorder, budget=budget),
+                               keep=lambda: not budget.exceeded)
@@ -0,0 +1,443 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from .budget import LIMIT_ENV, Budget
+from .cache import PDFCache, cache_key, cache_key_file
+from .engines import ENGINES, resolve_engine
+from .fonts import FONT_DIR_ENV, find_font_set
+from .instrument import StageRecorder, enable_stage_log
+from .parser import decode_html, render_pdf_bytes
+from .rules import RULES_ENV, load_rules
+from .stream import STREAM_ENV, extract_report_file, render_pdf_stream, stream_threshold
+
+HTML_SUFFIXES = ('.html', '.htm')
+
+# --- 1. INPUT DISCOVERY ---
+def collect_inputs(patterns):
+    found = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, n) for n in os.listdir(pattern)
+                       if n.lower().endswith(HTML_SUFFIXES)]
+        elif os.path.isfile(pattern):
+            matches = [pattern]
+        else:
+            matches = [m for m in glob.glob(pattern, recursive=True)
+                       if os.path.isfile(m) and m.lower().endswith(HTML_SUFFIXES)]
+        found.extend(sorted(matches))
+
+    seen = set()
+    unique = []
+    for path in found:
+        key = os.path.abspath(path)
+        if key in seen: continue
+        seen.add(key)
+        unique.append(path)
+    return unique
+
+def output_path_for(src, out_dir, suffix='.pdf'):
+    stem = os.path.splitext(os.path.basename(src))[0]
+    target_dir = out_dir if out_dir else os.path.dirname(src)
+    return os.path.join(target_dir, stem + suffix)
+
+# Inputs from different directories can share a file name. Under -o the later ones get
+# a numeric suffix, as duplicate uploads do in a ZIP, instead of overwriting.
+def output_paths(inputs, out_dir, suffix='.pdf'):
+    taken = set()
+    jobs = []
+    for src in inputs:
+        dst = output_path_for(src, out_dir, suffix)
+        stem, ext = os.path.splitext(dst)
+        n = 1
+        while os.path.normcase(os.path.abspath(dst)) in taken:
+            n += 1
+            dst = f"{stem} ({n}){ext}"
+        taken.add(os.path.normcase(os.path.abspath(dst)))
+        jobs.append((src, dst))
+    return jobs
+
+# --- 2. WORKER ---
+_worker_caches = {}
+
+def _cache_for(cache_dir):
+    if not cache_dir: return None
+    if cache_dir not in _worker_caches:
+        _worker_caches[cache_dir] = PDFCache(disk_dir=cache_dir)
+    return _worker_caches[cache_dir]
+
+# Runs inside the pool; never raises so one bad report cannot take down the batch. A
+# report that runs out of budget still writes its partial PDF, with 'truncated' set.
+def convert_file(src, dst, cache_dir=None, stages=False, trace_memory=False):
+    start = time.perf_counter()
+    recorder = StageRecorder(memory=trace_memory, label=src).start() if stages else None
+    try:
+        cache = _cache_for(cache_dir)
+        budget = Budget()
+        with open(src, 'rb') as f:
+            in_bytes = os.fstat(f.fileno()).st_size
+            # Large reports are hashed and parsed in chunks instead of read whole.
+            if in_bytes >= stream_threshold():
+                key = cache_key_file(f) if cache else None
+                render = lambda: render_pdf_stream(f, recorder=recorder, budget=budget)
+            else:
+                bytes_data = f.read()
+                key = cache_key(bytes_data) if cache else None
+                render = lambda: render_pdf_bytes(decode_html(bytes_data), recorder=recorder, budget=budget)
+            pdf_bytes = cache.get(key) if cache else None
+            cached = pdf_bytes is not None
+            if not cached:
+                f.seek(0)
+                pdf_bytes = render()
+                if cache and not budget.exceeded: cache.put(key, pdf_bytes)
+        with open(dst, 'wb') as f: f.write(pdf_bytes)
+        return {'src': src, 'dst': dst, 'ok': True, 'error': None, 'cached': cached,
+                'truncated': budget.exceeded, 'in_bytes': in_bytes, 'out_bytes': len(pdf_bytes),
+                'seconds': time.perf_counter() - start,
+                'stages': recorder.to_dict() if recorder and not cached else None}
+    except Exception as e:
+        return {'src': src, 'dst': dst, 'ok': False, 'error': f"{type(e).__name__}: {e}", 'cached': False,
+                'in_bytes': 0, 'out_bytes': 0, 'seconds': time.perf_counter() - start,
+                'stages': recorder.to_dict() if recorder else None}
+    finally:
+        if recorder: recorder.stop()
+
+# Extraction only: parse into the report model and write it as JSON, no FPDF involved.
+def extract_file(src, dst):
+    start = time.perf_counter()
+    try:
+        report, in_bytes = extract_report_file(src)
+        payload = report.to_json(indent=2).encode('utf-8')
+        with open(dst, 'wb') as f: f.write(payload)
+        return {'src': src, 'dst': dst, 'ok': True, 'error': None, 'cached': False,
+                'truncated': report.truncated or None, 'in_bytes': in_bytes, 'out_bytes': len(payload),
+                'seconds': time.perf_counter() - start}
+    except Exception as e:
+        return {'src': src, 'dst': dst, 'ok': False, 'error': f"{type(e).__name__}: {e}", 'cached': False,
+                'in_bytes': 0, 'out_bytes': 0, 'seconds': time.perf_counter() - start}
+
+def crashed_result(src, dst, error):
+    return {'src': src, 'dst': dst, 'ok': False, 'error': error, 'cached': False, 'in_bytes': 0,
+            'out_bytes': 0, 'rows': [], 'report': None, 'stages': None, 'seconds': 0.0}
+
+def run_batch(jobs, workers, on_result=None, task=convert_file, **task_kwargs):
+    results = []
+    def done(res):
+        results.append(res)
+        if on_result: on_result(res)
+
+    if workers <= 1:
+        for src, dst in jobs:
+            done(task(src, dst, **task_kwargs))
+        return results
+
+    # A worker that dies (segfault, OOM kill) breaks the whole pool and fails every
+    # future still in it, so there is no telling which file did it. The broken ones go
+    # round again in a new pool. A round in which nothing finished runs its first file
+    # alone, so a file that keeps killing its worker ends up failed on its own.
+    pending, alone = list(jobs), False
+    while pending:
+        batch, rest = (pending[:1], pending[1:]) if alone else (pending, [])
+        broken = set()
+        with ProcessPoolExecutor(max_workers=1 if alone else workers) as pool:
+            futures = {pool.submit(task, src, dst, **task_kwargs): (src, dst) for src, dst in batch}
+            for fut in as_completed(futures):
+                try:
+                    done(fut.result())
+                except BrokenProcessPool:
+                    broken.add(fut)
+        if alone and broken:
+            done(crashed_result(*batch[0], "BrokenProcessPool: the worker died while on this file"))
+            broken = set()
+        alone = len(broken) == len(batch)
+        pending = [job for fut, job in futures.items() if fut in broken] + rest
+    return results
+
+# --- 3. REPORTING ---
+def print_result(res, out=sys.stdout):
+    if res['ok']:
+        tag = 'cache' if res['cached'] else 'part' if res.get('truncated') else 'ok'
+        print(f"  {tag:<5} {res['seconds']*1000:8.1f} ms  {res['src']} -> {res['dst']}", file=out)
+    else:
+        print(f"  FAIL  {res['seconds']*1000:8.1f} ms  {res['src']}: {res['error']}", file=out)
+    out.flush()
+
+def print_summary(results, wall_seconds, workers, out=sys.stdout, verb='Converted', out_label='PDF'):
+    ok = [r for r in results if r['ok']]
+    failed = [r for r in results if not r['ok']]
+    in_mb = sum(r['in_bytes'] for r in ok) / 1e6
+    out_mb = sum(r['out_bytes'] for r in ok) / 1e6
+    cpu_seconds = sum(r['seconds'] for r in results)
+
+    print("", file=out)
+    print(f"{verb} {len(ok)}/{len(results)} files in {wall_seconds:.2f}s with {workers} worker(s)", file=out)
+    if results:
+        times = sorted(r['seconds'] for r in results)
+        print(f"  per file: min {times[0]*1000:.1f} ms | median {times[len(times)//2]*1000:.1f} ms"
+              f" | max {times[-1]*1000:.1f} ms | total {cpu_seconds:.2f}s", file=out)
+    if wall_seconds > 0:
+        print(f"  throughput: {len(ok)/wall_seconds:.2f} files/s | {in_mb/wall_seconds:.2f} MB/s HTML in"
+              + (f" | {out_mb:.2f} MB {out_label} out" if out_label else ""), file=out)
+    cached = sum(1 for r in ok if r['cached'])
+    if cached:
+        print(f"  cache: {cached} hit(s), {len(ok) - cached} rendered", file=out)
+    partial = [r for r in ok if r.get('truncated')]
+    if partial:
+        print(f"  {len(partial)} partial (over budget):", file=out)
+        for r in partial:
+            print(f"    {r['src']}: {r['truncated']}", file=out)
+    if failed:
+        print(f"  {len(failed)} failed:", file=out)
+        for r in failed:
+            print(f"    {r['src']}: {r['error']}", file=out)
+
+# Stage records travel back with each result (workers may be other processes) and
+# are logged here, one JSON line per stage.
+def with_stage_log(on_result):
+    def handle(res):
+        if on_result: on_result(res)
+        if res.get('stages'):
+            recorder = StageRecorder(label=res['src'])
+            recorder.records = res['stages']['stages']
+            recorder.log()
+    return handle
+
+# --- 4. ENTRY POINT ---
+def use_font_dir(path):
+    if not path: return True
+    if find_font_set(path) is None:
+        print(f"No usable TrueType font in {path}.", file=sys.stderr)
+        return False
+    # Like the parser choice, workers pick this up from the environment.
+    os.environ[FONT_DIR_ENV] = os.path.abspath(path)
+    return True
+
+def use_rules(path):
+    if not path: return True
+    try:
+        load_rules(path)
+    except (OSError, ValueError) as e:
+        print(f"Cannot use extraction rules {path}: {e}", file=sys.stderr)
+        return False
+    os.environ[RULES_ENV] = os.path.abspath(path)
+    return True
+
+# Like the font directory, workers pick the engine up from the environment. An engine
+# asked for by name, here or in $BLUEBERRY_PARSER, has to be installed.
+def use_parser(name):
+    try:
+        os.environ['BLUEBERRY_PARSER'] = resolve_engine(name)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return False
+    return True
+
+# Per-document limits (budget.py) reach the workers through the environment as well.
+def use_budget(args):
+    for name, env in LIMIT_ENV.items():
+        value = getattr(args, name, None)
+        if value is None: continue
+        if value <= 0:
+            print(f"--{name.replace('_', '-')} must be positive.", file=sys.stderr)
+            return False
+        os.environ[env] = str(value)
+    if getattr(args, 'stream_mb', None) is not None: os.environ[STREAM_ENV] = str(args.stream_mb)
+    return True
+
+def prepare_batch(args, suffix):
+    if not use_rules(args.rules) or not use_budget(args) or not use_parser(args.parser): return None, 0
+    inputs = collect_inputs(args.inputs)
+    if not inputs:
+        print("No HTML files matched.", file=sys.stderr)
+        return None, 0
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    workers = max(1, min(args.jobs or os.cpu_count() or 1, len(inputs)))
+    return output_paths(inputs, args.output_dir, suffix), workers
+
+def cmd_convert(args):
+    if not use_font_dir(args.font_dir): return 2
+    jobs, workers = prepare_batch(args, '.pdf')
+    if not jobs: return 2
+    print(f"Rendering {len(jobs)} report(s) with {workers} worker(s), parser {resolve_engine()}...")
+
+    if args.profile:
+        os.environ['BLUEBERRY_PROFILE'] = os.path.abspath(args.profile)
+    on_result = None if args.quiet else print_result
+    if args.stages:
+        enable_stage_log()
+        on_result = with_stage_log(on_result)
+
+    start = time.perf_counter()
+    results = run_batch(jobs, workers, on_result=on_result, cache_dir=args.cache_dir,
+                        stages=args.stages, trace_memory=args.trace_memory)
+    print_summary(results, time.perf_counter() - start, workers)
+    return 0 if all(r['ok'] for r in results) else 1
+
+def cmd_extract(args):
+    jobs, workers = prepare_batch(args, '.json')
+    if not jobs: return 2
+    print(f"Extracting {len(jobs)} report(s) with {workers} worker(s), parser {resolve_engine()}...")
+
+    start = time.perf_counter()
+    results = run_batch(jobs, workers, on_result=None if args.quiet else print_result, task=extract_file)
+    print_summary(results, time.perf_counter() - start, workers, verb='Extracted', out_label='JSON')
+    return 0 if all(r['ok'] for r in results) else 1
+
+def cmd_export(args):
+    from .export import extract_trades_file, trades_frame, write_frame
+    args.output_dir = None
+    jobs, workers = prepare_batch(args, '.html')
+    if not jobs: return 2
+    print(f"Exporting trades from {len(jobs)} report(s) with {workers} worker(s), parser {resolve_engine()}...")
+
+    start = time.perf_counter()
+    results = run_batch([(src, None) for src, _ in jobs], workers,
+                        on_result=None if args.quiet else print_result, task=extract_trades_file)
+    # Rows are gathered in input order, whatever order the workers finished in.
+    order = {src: i for i, (src, _) in enumerate(jobs)}
+    rows = [row for r in sorted(results, key=lambda r: order[r['src']]) for row in r['rows']]
+    df = trades_frame(rows)
+    size = write_frame(df, args.output)
+    print_summary(results, time.perf_counter() - start, workers, verb='Read', out_label=None)
+    print(f"  wrote {len(df)} row(s), {len(df.columns)} column(s) to {args.output} ({size / 1024:.1f} KB)")
+    return 0 if all(r['ok'] for r in results) else 1
+
+def cmd_bundle(args):
+    from .bundle import read_report_file, render_bundle
+    if not use_font_dir(args.font_dir): return 2
+    args.output_dir = None
+    jobs, workers = prepare_batch(args, '.html')
+    if not jobs: return 2
+    print(f"Binding {len(jobs)} report(s) into {args.output}, parsing with {workers} worker(s)...")
+
+    start = time.perf_counter()
+    results = run_batch([(src, None) for src, _ in jobs], workers,
+                        on_result=None if args.quiet else print_result, task=read_report_file)
+    # Reports are bound in input order, whatever order the workers finished in.
+    order = {src: i for i, (src, _) in enumerate(jobs)}
+    reports = [r['report'] for r in sorted(results, key=lambda r: order[r['src']]) if r['ok']]
+    if reports:
+        pdf = render_bundle(reports, index=not args.no_index)
+        with open(args.output, 'wb') as f: f.write(pdf.output())
+    print_summary(results, time.perf_counter() - start, workers, verb='Bound', out_label=None)
+    if reports:
+        print(f"  wrote {pdf.page_no()} page(s), {os.path.getsize(args.output) / 1024:.1f} KB to {args.output}")
+    return 0 if reports and all(r['ok'] for r in results) else 1
+
+def cmd_serve(args):
+    from .server import serve
+    if not use_font_dir(args.font_dir) or not use_rules(args.rules) or not use_budget(args): return 2
+    if not use_parser(args.parser): return 2
+    return serve(args.host, args.port, args.jobs or None, args.queue, args.timeout, args.cache_dir, args.quiet)
+
+def add_batch_arguments(cmd, output_kind):
+    cmd.add_argument('inputs', nargs='+', help='HTML files, directories or glob patterns.')
+    cmd.add_argument('-o', '--output-dir', help=f'Write {output_kind} files here instead of next to each input.')
+    cmd.add_argument('-j', '--jobs', type=int, default=0,
+                     help='Worker processes (default: CPU count).')
+    cmd.add_argument('--parser', choices=['auto'] + list(ENGINES),
+                     help='HTML parser engine (default: fastest installed, or $BLUEBERRY_PARSER).')
+    cmd.add_argument('-q', '--quiet', action='store_true', help='Only print the summary.')
+    add_rules_argument(cmd)
+    add_budget_arguments(cmd)
+
+def add_rules_argument(cmd):
+    cmd.add_argument('--rules', metavar='FILE',
+                     help='Extraction rules JSON (default: $BLUEBERRY_RULES, else the bundled rules.json).')
+
+def add_budget_arguments(cmd):
+    group = cmd.add_argument_group('per-document limits')
+    group.add_argument('--max-input-mb', type=float, metavar='MB',
+                       help='Reject larger HTML inputs (default: $BLUEBERRY_MAX_INPUT_MB, else 32).')
+    group.add_argument('--max-nodes', type=int, metavar='N',
+                       help='Reject documents with more tags (default: $BLUEBERRY_MAX_NODES, else 500000).')
+    group.add_argument('--max-seconds', type=float, metavar='S',
+                       help='Stop a document after this long and keep a partial PDF '
+                            '(default: $BLUEBERRY_MAX_SECONDS, else 60).')
+    group.add_argument('--max-memory-mb', type=float, metavar='MB',
+                       help='Stop a document once the process has grown this much while on it '
+                            '(default: $BLUEBERRY_MAX_MEMORY_MB, else 1024).')
+    group.add_argument('--stream-mb', type=float, metavar='MB',
+                       help='Parse inputs of this size or more in chunks, card by card, instead of whole '
+                            '(default: $BLUEBERRY_STREAM_MB, else 2).')
+
+def add_stage_arguments(cmd):
+    cmd.add_argument('--stages', action='store_true',
+                     help='Time each render stage and log it as JSON lines on stderr.')
+    cmd.add_argument('--trace-memory', action='store_true',
+                     help='With --stages, also record the tracemalloc peak per stage (slower).')
+    cmd.add_argument('--profile', metavar='DIR',
+                     help='Dump a cProfile .prof file per rendered report into DIR.')
+
+def add_font_argument(cmd):
+    cmd.add_argument('--font-dir', metavar='PATH',
+                     help='TrueType font directory or .ttf file for non-Latin text such as Arabic '
+                          '(default: $BLUEBERRY_FONT_DIR, else the built-in Latin fonts).')
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m blueberry',
+                                     description='BlueberryAI report tools (headless).')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    conv = sub.add_parser('convert', help='Render HTML reports to PDF in batch.')
+    add_batch_arguments(conv, 'PDF')
+    conv.add_argument('--cache-dir', help='Reuse PDFs for unchanged reports from this on-disk cache.')
+    add_stage_arguments(conv)
+    add_font_argument(conv)
+    conv.set_defaults(func=cmd_convert)
+
+    ext = sub.add_parser('extract', help='Extract the structured report data to JSON (no PDF rendering).')
+    add_batch_arguments(ext, 'JSON')
+    ext.set_defaults(func=cmd_extract)
+
+    exp = sub.add_parser('export', help='Collect trade parameters from many reports into one CSV/Parquet file.')
+    exp.add_argument('inputs', nargs='+', help='HTML files, directories or glob patterns.')
+    exp.add_argument('-o', '--output', required=True,
+                     help='Output file; .parquet/.pq writes Parquet (needs pyarrow), anything else CSV.')
+    exp.add_argument('-j', '--jobs', type=int, default=0, help='Worker processes (default: CPU count).')
+    exp.add_argument('--parser', choices=['auto'] + list(ENGINES),
+                     help='HTML parser engine (default: fastest installed, or $BLUEBERRY_PARSER).')
+    exp.add_argument('-q', '--quiet', action='store_true', help='Only print the summary.')
+    add_rules_argument(exp)
+    add_budget_arguments(exp)
+    exp.set_defaults(func=cmd_export)
+
+    bnd = sub.add_parser('bundle', help='Render many reports into one PDF with bookmarks and a ticker index.')
+    bnd.add_argument('inputs', nargs='+', help='HTML files, directories or glob patterns, bound in this order.')
+    bnd.add_argument('-o', '--output', required=True, help='The combined PDF to write.')
+    bnd.add_argument('-j', '--jobs', type=int, default=0, help='Worker processes for parsing (default: CPU count).')
+    bnd.add_argument('--parser', choices=['auto'] + list(ENGINES),
+                     help='HTML parser engine (default: fastest installed, or $BLUEBERRY_PARSER).')
+    bnd.add_argument('--no-index', action='store_true', help='Leave out the ticker index at the end.')
+    bnd.add_argument('-q', '--quiet', action='store_true', help='Only print the summary.')
+    add_font_argument(bnd)
+    add_rules_argument(bnd)
+    add_budget_arguments(bnd)
+    bnd.set_defaults(func=cmd_bundle)
+
+    srv = sub.add_parser('serve', help='Run a local HTTP render service (POST /render, GET /metrics).')
+    srv.add_argument('--host', default='127.0.0.1', help='Interface to bind (default: 127.0.0.1).')
+    srv.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765).')
+    srv.add_argument('-j', '--jobs', type=int, default=0, help='Worker processes (default: CPU count).')
+    srv.add_argument('--queue', type=int, default=16,
+                     help='Requests allowed to wait for a worker before answering 429 (default: 16).')
+    srv.add_argument('--timeout', type=float, default=30.0, help='Per-request render time limit in seconds.')
+    srv.add_argument('--cache-dir', help='Keep rendered PDFs in this on-disk cache as well as in memory.')
+    srv.add_argument('--parser', choices=['auto'] + list(ENGINES),
+                     help='HTML parser engine (default: fastest installed, or $BLUEBERRY_PARSER).')
+    srv.add_argument('-q', '--quiet', action='store_true', help='Do not log each request.')
+    add_font_argument(srv)
+    add_rules_argument(srv)
+    add_budget_arguments(srv)
+    srv.set_defaults(func=cmd_serve)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
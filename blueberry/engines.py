@@ -0,0 +1,69 @@
+import importlib.util
+import os
+
+# --- PARSER ENGINES ---
+# BeautifulSoup tree builders in order of preference (fastest first). Every engine
+# produces a bs4 tree, so the extraction code and the DocumentIndex work unchanged.
+ENGINES = {
+    'lxml': 'lxml',
+    'html.parser': None,
+}
+DEFAULT_ENGINE = 'html.parser'
+
+# Tags that end an open <p> when they start right inside it. lxml (libxml2) does this,
+# as browsers do, while html.parser nests the block in the paragraph, so
+# "<p>Entry: 5<div>Target: 6</div></p>" read as one Entry of "5 Target: 6". The
+# html.parser builder below follows lxml here. Known differences that remain on
+# malformed markup: a legacy entity without its semicolon ("&nbsp6") is decoded by lxml
+# and kept as text by html.parser, and only lxml ends an open <li>, <dt>, <dd> or table
+# cell at the next one (that changes the tree, not the extracted text).
+#
+# bs4 has no public way to swap html.parser's parser class: the builder below passes
+# feed() its _parser_class keyword and subclasses BeautifulSoupHTMLParser, so
+# requirements.txt pins bs4 to the minor release this was checked with and
+# tests/test_engines.py fails if the hook goes away.
+P_CLOSERS = frozenset('address blockquote caption center col colgroup dd dir div dl dt fieldset form '
+                      'frameset h1 h2 h3 h4 h5 h6 hr li listing menu ol p pre table tbody td tfoot th '
+                      'title tr ul xmp'.split())
+
+def available_engines():
+    return [name for name, module in ENGINES.items()
+            if module is None or importlib.util.find_spec(module) is not None]
+
+def resolve_engine(name=None):
+    name = name or os.environ.get('BLUEBERRY_PARSER') or 'auto'
+    available = available_engines()
+    if name == 'auto':
+        return available[0] if available else DEFAULT_ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Unknown parser engine {name!r}; choose from auto, {', '.join(ENGINES)}")
+    if name not in available:
+        raise ValueError(f"Parser engine {name!r} is not installed; available: {', '.join(available)}")
+    return name
+
+_html_parser_builder = None
+
+def html_parser_builder():
+    global _html_parser_builder
+    if _html_parser_builder is None:
+        from bs4.builder import HTMLParserTreeBuilder
+        from bs4.builder._htmlparser import BeautifulSoupHTMLParser
+
+        class ParagraphClosingParser(BeautifulSoupHTMLParser):
+            def handle_starttag(self, tag, attrs, handle_empty_element=True):
+                if tag in P_CLOSERS and self.soup.currentTag.name == 'p':
+                    self.handle_endtag('p')
+                super().handle_starttag(tag, attrs, handle_empty_element)
+
+        class ParagraphClosingBuilder(HTMLParserTreeBuilder):
+            def feed(self, markup):
+                super().feed(markup, _parser_class=ParagraphClosingParser)
+
+        _html_parser_builder = ParagraphClosingBuilder
+    return _html_parser_builder
+
+def make_soup(html_content, engine=None):
+    from bs4 import BeautifulSoup
+    engine = resolve_engine(engine)
+    if engine == 'html.parser': return BeautifulSoup(html_content, builder=html_parser_builder())
+    return BeautifulSoup(html_content, engine)
@@ -0,0 +1,223 @@
+import math
+import os
+import re
+import time
+
+from .stream import extract_report_file
+
+# --- COLUMNAR TRADE EXPORT ---
+# Trade parameters are display strings ("12.50-13.00", "5%", "1:2.5") under whatever
+# label the report used. For analysis across many reports, each card and watchlist item
+# becomes one row of raw strings; all rows are collected first and the numbers are then
+# parsed column by column (one regex pass per column over the whole dataset, not one
+# per cell), with the derived columns computed on the arrays.
+
+RAW_COLUMNS = ('source', 'subtitle', 'section', 'ticker', 'name', 'mode', 'setup', 'confidence',
+               'entry_raw', 'target_raw', 'stop_raw', 'rr_raw', 'current_raw')
+
+# Parameter labels vary between reports ("Entry Zone", "Target 1", "Stop Loss"); the
+# first label containing one of these words fills the column. Only ratio-style labels
+# go to R:R: "Risk: 5%" or "Risk Amount" is not a reward multiple.
+PARAM_FIELDS = (('entry', 'entry_raw'), ('target', 'target_raw'), ('stop', 'stop_raw'),
+                ('r:r', 'rr_raw'), ('r/r', 'rr_raw'), ('risk/reward', 'rr_raw'), ('risk:reward', 'rr_raw'),
+                ('risk-reward', 'rr_raw'), ('risk reward', 'rr_raw'), ('current', 'current_raw'))
+
+# A number, optionally a range ("12.5-13.0", "12.5 - 13", "12.5 to 13"), optionally a
+# percentage. Thousands separators are removed before matching; a number glued to
+# letters ("T1 14.5") is part of a label, not a value. Both patterns stay within what
+# RE2 (pyarrow) and re accept alike.
+NUMBER_PATTERN = (r'(?:^|[^A-Za-z\d.])(?P<lo>[-+]?\d+(?:\.\d+)?)\s*(?:(?:-|' '\u2013|\u2014' r'|to)\s*'
+                  r'(?P<hi>\d+(?:\.\d+)?))?\s*(?P<pct>%)?')
+RATIO_PATTERN = r'(?P<a>\d+(?:\.\d+)?)\s*:\s*(?P<b>\d+(?:\.\d+)?)'
+
+def param_values(params):
+    values = {}
+    for label, value in params.items():
+        key = label.lower()
+        for word, column in PARAM_FIELDS:
+            if word in key and column not in values:
+                values[column] = value
+                break
+    return values
+
+def trade_rows(report, source=''):
+    rows = []
+    for c in report.cards:
+        v = param_values(c.params)
+        rows.append((source, report.subtitle, 'card', c.ticker, c.name, c.mode, c.setup, c.confidence,
+                     v.get('entry_raw'), v.get('target_raw'), v.get('stop_raw'), v.get('rr_raw'),
+                     v.get('current_raw')))
+    for item in report.watchlist or ():
+        v = param_values(item.params)
+        rows.append((source, report.subtitle, 'watchlist', item.ticker, item.name, 'watch', '', '',
+                     v.get('entry_raw'), v.get('target_raw'), v.get('stop_raw'), v.get('rr_raw'),
+                     v.get('current_raw')))
+    return rows
+
+# --- VECTORIZED PARSING ---
+# Columns are Arrow string arrays and the regexes run in pyarrow's compute kernels, so
+# a column of any length is a handful of calls; only the arithmetic is done in numpy.
+# Each column is parsed over its distinct values (R:R strings, percentages and round
+# prices repeat across cards and reports), and values that are already a plain number
+# are cast directly; only the rest go through the regex.
+PLAIN_NUMBER = r'^[-+]?\d+(?:\.\d+)?$'
+# Each compute call costs a fixed few hundred microseconds, which a one-report export
+# of a few dozen rows never earns back; columns shorter than this are parsed with the
+# same patterns in re, one distinct value at a time.
+SMALL_COLUMN = 5000
+_NUMBER = re.compile(NUMBER_PATTERN)
+_RATIO = re.compile(RATIO_PATTERN)
+
+def _strings(values):
+    import pyarrow as pa
+    if isinstance(values, (pa.Array, pa.ChunkedArray)): return values
+    return pa.array(values, type=pa.string(), from_pandas=True)
+
+def _floats(text):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    text = pc.if_else(pc.equal(text, ''), pa.scalar(None, pa.string()), text)
+    return pc.cast(text, pa.float64()).to_numpy(zero_copy_only=False)
+
+def _distinct(values):
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    encoded = pc.dictionary_encode(_strings(values))
+    if isinstance(encoded, pa.ChunkedArray): encoded = encoded.combine_chunks()
+    # Missing values point one past the dictionary, at the NaN/False filler row.
+    codes = pc.fill_null(encoded.indices, len(encoded.dictionary)).to_numpy(zero_copy_only=False)
+    return encoded.dictionary, codes.astype(np.intp)
+
+def _small(values):
+    return isinstance(values, (list, tuple)) and len(values) < SMALL_COLUMN
+
+def _number(text):
+    m = _NUMBER.search(text.replace(',', '')) if text else None
+    if not m: return math.nan, math.nan, False
+    lo = float(m['lo'])
+    return lo, float(m['hi']) if m['hi'] else lo, m['pct'] == '%'
+
+def _ratio(text):
+    m = _RATIO.search(text) if text else None
+    if not m: return _number(text)[0]
+    a = float(m['a'])
+    return float(m['b']) / a if a > 0 else math.nan
+
+# fn over each distinct value of a short column, spread back over the rows.
+def _per_value(fn, values):
+    seen = {}
+    return [seen[v] if v in seen else seen.setdefault(v, fn(v)) for v in values]
+
+# Returns (low, high, is_percent) arrays for a column of strings; high equals low for
+# a single number, and all three are NaN/False where no number was found.
+def parse_numbers(values):
+    import numpy as np
+    import pyarrow.compute as pc
+    if _small(values):
+        parsed = _per_value(_number, values)
+        lo, hi, pct = zip(*parsed) if parsed else ((), (), ())
+        return np.array(lo, dtype=float), np.array(hi, dtype=float), np.array(pct, dtype=bool)
+    dictionary, codes = _distinct(values)
+    text = pc.replace_substring(dictionary, ',', '')
+    n = len(text)
+    lo = np.full(n + 1, np.nan)
+    hi = np.full(n + 1, np.nan)
+    pct = np.zeros(n + 1, dtype=bool)
+    plain = pc.match_substring_regex(text, PLAIN_NUMBER).to_numpy(zero_copy_only=False)
+    if plain.any():
+        lo[:n][plain] = hi[:n][plain] = _floats(pc.filter(text, plain))
+    rest = np.flatnonzero(~plain)
+    if len(rest):
+        m = pc.extract_regex(pc.take(text, rest), NUMBER_PATTERN)
+        lo[rest] = _floats(pc.struct_field(m, 'lo'))
+        hi[rest] = _floats(pc.struct_field(m, 'hi'))
+        pct[rest] = pc.fill_null(pc.equal(pc.struct_field(m, 'pct'), '%'), False).to_numpy(zero_copy_only=False)
+    hi = np.where(np.isnan(hi), lo, hi)
+    return lo[codes], hi[codes], pct[codes]
+
+# "1:2.5" -> 2.5; a bare number is taken as the reward multiple itself.
+def parse_ratios(values):
+    import numpy as np
+    import pyarrow.compute as pc
+    if _small(values): return np.array(_per_value(_ratio, values), dtype=float)
+    dictionary, codes = _distinct(values)
+    m = pc.extract_regex(dictionary, RATIO_PATTERN)
+    a = np.append(_floats(pc.struct_field(m, 'a')), np.nan)
+    b = np.append(_floats(pc.struct_field(m, 'b')), np.nan)
+    bare = np.append(parse_numbers(dictionary)[0], np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(np.isnan(a), bare, np.where(a > 0, b / a, np.nan))
+    return ratio[codes]
+
+def trades_frame(rows):
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+    raw = dict(zip(RAW_COLUMNS, zip(*rows))) if rows else {name: () for name in RAW_COLUMNS}
+    arrays = {name: _strings(list(c)) for name, c in raw.items()}
+    df = pa.table(arrays).to_pandas(types_mapper=pd.ArrowDtype)
+    # Parsed from the Python strings when short (see SMALL_COLUMN), as Arrow arrays otherwise.
+    columns = raw if len(rows) < SMALL_COLUMN else arrays
+    # Report dates repeat for every row of a report; each distinct subtitle is parsed once
+    # (to_datetime's own cache does not apply to format='mixed' on short columns).
+    codes, subtitles = pd.factorize(df['subtitle'].str.replace(r'^[A-Za-z]+,\s*', '', regex=True))
+    dates = pd.to_datetime(pd.Series(subtitles, dtype=object), errors='coerce', format='mixed', dayfirst=True)
+    report_date = pd.Series(dates.array.take(codes, allow_fill=True), index=df.index, name='subtitle')
+
+    entry_lo, entry_hi, _ = parse_numbers(columns['entry_raw'])
+    entry = (entry_lo + entry_hi) / 2
+    # Sell-side ideas profit when price falls: their stop sits above the entry.
+    side = np.where(df['mode'].to_numpy() == 'sell', -1.0, 1.0)
+
+    # A target or stop given as a percentage is relative to the entry midpoint.
+    target_lo, target_hi, target_pct = parse_numbers(columns['target_raw'])
+    target = np.where(target_pct, entry * (1 + side * np.abs(target_lo) / 100), target_lo)
+    stop_lo, _, stop_pct = parse_numbers(columns['stop_raw'])
+    stop = np.where(stop_pct, entry * (1 - side * np.abs(stop_lo) / 100), stop_lo)
+    current, _, _ = parse_numbers(columns['current_raw'])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        risk = (entry - stop) * side
+        reward = (target - entry) * side
+        derived = {
+            'report_date': report_date,
+            'entry_low': entry_lo,
+            'entry_high': entry_hi,
+            'entry': entry,
+            'target': target,
+            'target_high': np.where(target_pct, np.nan, target_hi),
+            'stop': stop,
+            'current': current,
+            'rr_stated': parse_ratios(columns['rr_raw']),
+            'rr': np.where(risk > 0, reward / risk, np.nan),
+            'stop_distance_pct': np.where(entry > 0, risk / entry * 100, np.nan),
+            'target_distance_pct': np.where(entry > 0, reward / entry * 100, np.nan),
+        }
+    for name in ('section', 'ticker', 'mode'): df[name] = df[name].astype('category')
+    # One concat instead of a column insert per derived column.
+    return pd.concat([df, pd.DataFrame(derived, index=df.index)], axis=1)
+
+def write_frame(df, dst):
+    if dst.lower().endswith(('.parquet', '.pq')):
+        try:
+            df.to_parquet(dst, index=False)
+        except ImportError as e:
+            raise RuntimeError("Parquet output needs pyarrow; install it or write .csv instead.") from e
+    else:
+        df.to_csv(dst, index=False)
+    return os.path.getsize(dst)
+
+# Runs inside the batch pool like convert_file/extract_file; the rows travel back with
+# the result instead of being written per report.
+def extract_trades_file(src, dst=None):
+    start = time.perf_counter()
+    try:
+        report, in_bytes = extract_report_file(src)
+        rows = trade_rows(report, source=os.path.basename(src))
+        return {'src': src, 'dst': dst, 'ok': True, 'error': None, 'cached': False,
+                'truncated': report.truncated or None, 'in_bytes': in_bytes, 'out_bytes': 0, 'rows': rows,
+                'seconds': time.perf_counter() - start}
+    except Exception as e:
+        return {'src': src, 'dst': dst, 'ok': False, 'error': f"{type(e).__name__}: {e}", 'cached': False,
+                'in_bytes': 0, 'out_bytes': 0, 'rows': [], 'seconds': time.perf_counter() - start}
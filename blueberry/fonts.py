@@ -0,0 +1,117 @@
+import copy
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+
+# --- UNICODE FONTS ---
+# The core fonts only cover latin-1, so Arabic company names used to be dropped by
+# clean_text. Pointing BLUEBERRY_FONT_DIR at a TrueType family with Arabic coverage
+# (DejaVu Sans has Latin, Arabic and its presentation forms in one family) switches
+# rendering to that family. fpdf embeds only the glyphs a document uses, so a report
+# carries a few KB of font instead of the whole file.
+#
+# Parsing a TTF (cmap, metrics, widths for every glyph) costs tens of milliseconds per
+# style. It is done once per process: the parsed font is kept as a template and each
+# document gets a shallow copy with its own subset map and its own fontTools handle,
+# because fpdf subsets that handle in place when it writes the PDF.
+FONT_DIR_ENV = 'BLUEBERRY_FONT_DIR'
+
+# File names tried per style; the first family whose regular face exists wins. A
+# missing bold or italic face falls back to the regular one.
+FAMILIES = (
+    ('DejaVuSans.ttf', 'DejaVuSans-Bold.ttf', 'DejaVuSans-Oblique.ttf', 'DejaVuSans-BoldOblique.ttf'),
+    ('NotoSansArabic-Regular.ttf', 'NotoSansArabic-Bold.ttf', None, None),
+    ('NotoNaskhArabic-Regular.ttf', 'NotoNaskhArabic-Bold.ttf', None, None),
+    ('Amiri-Regular.ttf', 'Amiri-Bold.ttf', 'Amiri-Slanted.ttf', 'Amiri-BoldSlanted.ttf'),
+)
+STYLES = ('', 'B', 'I', 'BI')
+
+@dataclass(frozen=True)
+class FontSet:
+    family: str
+    files: tuple  # ((style, path), ...) for '', 'B', 'I', 'BI'
+
+    @classmethod
+    def from_files(cls, regular, bold=None, italic=None, bold_italic=None):
+        paths = (regular, bold or regular, italic or regular, bold_italic or bold or regular)
+        family = 'u' + Path(regular).stem.lower().replace('-', '').replace(' ', '')
+        return cls(family, tuple((s, os.path.abspath(p)) for s, p in zip(STYLES, paths)))
+
+    # Changes whenever a font file does, so cached PDFs rendered with another font are
+    # not served.
+    def fingerprint(self):
+        h = hashlib.sha256(self.family.encode())
+        for style, path in self.files:
+            st = os.stat(path)
+            h.update(f"|{style}|{path}|{st.st_size}|{st.st_mtime_ns}".encode())
+        return h.hexdigest()[:16]
+
+def find_font_set(location):
+    if not location: return None
+    if os.path.isfile(location): return FontSet.from_files(location)
+    if not os.path.isdir(location): return None
+    for names in FAMILIES:
+        paths = [os.path.join(location, n) if n else None for n in names]
+        if os.path.isfile(paths[0]):
+            return FontSet.from_files(*[p if p and os.path.isfile(p) else None for p in paths])
+    return None
+
+_env_fonts = {}
+
+# The font set named by the environment (a directory or a single .ttf), or None for
+# the core fonts. Workers inherit the environment, so this holds in every process.
+def default_font_set():
+    location = os.environ.get(FONT_DIR_ENV) or None
+    if location not in _env_fonts: _env_fonts[location] = find_font_set(location)
+    return _env_fonts[location]
+
+_templates = {}
+_templates_lock = threading.Lock()
+parse_count = 0
+
+def _template(path, fontkey, style):
+    global parse_count
+    st = os.stat(path)
+    key = (path, fontkey, st.st_size, st.st_mtime_ns)
+    with _templates_lock:
+        hit = _templates.get(key)
+        if hit is not None: return hit
+        from fpdf import FPDF
+        from fpdf.fonts import TTFFont
+        with open(path, 'rb') as f: data = f.read()
+        font = TTFFont(FPDF(), Path(path), fontkey, style)
+        # Fonts without a .notdef get one drawn into their handle, which a fresh
+        # handle would not have; parse those per document instead.
+        hit = (font, data) if '.notdef' in font.ttfont.getGlyphOrder() else (None, None)
+        _templates[key] = hit
+        parse_count += 1
+        return hit
+
+def _instance(template, data, pdf):
+    from fontTools import ttLib
+    from fpdf.fonts import SubsetMap
+    font = copy.copy(template)
+    font.i = len(pdf.fonts) + 1
+    font.ttfont = ttLib.TTFont(BytesIO(data), recalcTimestamp=False, lazy=True)
+    font.missing_glyphs = []
+    font.biggest_size_pt = 0
+    font._hbfont = None
+    font.subset = SubsetMap(font)
+    return font
+
+def register_fonts(pdf, font_set):
+    for style, path in font_set.files:
+        fontkey = font_set.family + style
+        if fontkey in pdf.fonts: continue
+        template, data = _template(path, fontkey, style)
+        if template is None:
+            pdf.add_font(font_set.family, style, path)
+        else:
+            pdf.fonts[fontkey] = _instance(template, data, pdf)
+
+def cache_info():
+    with _templates_lock:
+        return {'parsed': parse_count, 'templates': sum(1 for t, _ in _templates.values() if t is not None)}
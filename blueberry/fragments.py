@@ -0,0 +1,395 @@
+import operator
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import fields
+
+from fpdf.enums import PDFResourceType
+
+# --- RENDERED-CARD FRAGMENTS ---
+# Consecutive daily reports carry most cards over unchanged, yet each of them is
+# measured and drawn through fpdf again every day, and drawing is most of a render.
+# The fragment cache keeps, per normalised card content, the card's measured atoms and
+# the operators its drawing wrote to the page, and replays those instead. Only strings,
+# numbers and fpdf's plain graphics-state record are stored, so, like the layout
+# cache, one cache can serve every PDF in the process.
+#
+# Operators carry absolute coordinates and a carried-over card rarely lands at the
+# same height. While a card is recorded, pdf.y is an Offset: a float that logs each
+# operation done with it, so every coordinate written and every page-break test made
+# is kept as a small program over the card's starting y. Replay runs that program
+# from the new start with the same float operations a fresh draw would do, so the page
+# gets the same bytes; when a test comes out differently (the card would now break
+# across pages) the card is drawn afresh instead.
+#
+# Only PDFs on the core fonts replay cards: with an embedded Unicode font the glyph
+# ids written depend on the order that document's subset first met each character.
+#
+# Replay restores fpdf's graphics-state stack and registers fonts in its resource
+# catalog, both fpdf internals that any release may change, so the shared cache is
+# off unless BLUEBERRY_FRAGMENTS=1; tests/test_fragments.py checks a given fpdf
+# release renders the same bytes with it.
+FRAGMENTS_ENV = 'BLUEBERRY_FRAGMENTS'
+MARK = '\ue000'  # outside latin-1, so never part of core-font text
+SIMPLE_TYPES = (int, float, str, bool, type(None))
+# Page geometry and position that a card's operators and page-break tests depend on.
+STATE_ATTRS = ('x', '_lasth', 'l_margin', 'r_margin', 't_margin', 'c_margin', 'k', 'w', 'h',
+               'page_break_trigger', 'auto_page_break', 'content_top')
+_FONT_REF = re.compile(r'/F(\d+) ')
+_MISSING = object()
+
+def _plain(v):
+    return float(v) if isinstance(v, Offset) else v
+
+def _neg(a, _): return -a
+def _abs(a, _): return abs(a)
+
+class Offset(float):
+    __slots__ = ('rec', 'slot')
+
+    def __new__(cls, value, rec, slot):
+        self = float.__new__(cls, value)
+        self.rec = rec
+        self.slot = slot
+        return self
+
+    def __add__(self, other): return self.rec.op(operator.add, self, other)
+    def __radd__(self, other): return self.rec.op(operator.add, other, self)
+    def __sub__(self, other): return self.rec.op(operator.sub, self, other)
+    def __rsub__(self, other): return self.rec.op(operator.sub, other, self)
+    def __mul__(self, other): return self.rec.op(operator.mul, self, other)
+    def __rmul__(self, other): return self.rec.op(operator.mul, other, self)
+    def __truediv__(self, other): return self.rec.op(operator.truediv, self, other)
+    def __rtruediv__(self, other): return self.rec.op(operator.truediv, other, self)
+    def __neg__(self): return self.rec.op(_neg, self, 0)
+    def __pos__(self): return self
+    def __abs__(self): return self.rec.op(_abs, self, 0)
+    def __lt__(self, other): return self.rec.compare(operator.lt, self, other)
+    def __le__(self, other): return self.rec.compare(operator.le, self, other)
+    def __gt__(self, other): return self.rec.compare(operator.gt, self, other)
+    def __ge__(self, other): return self.rec.compare(operator.ge, self, other)
+    def __eq__(self, other): return self.rec.compare(operator.eq, self, other)
+    def __ne__(self, other): return self.rec.compare(operator.ne, self, other)
+    __hash__ = float.__hash__
+
+    def __format__(self, spec):
+        return self.rec.format(self, spec)
+
+# Anything else done with a recorded y (rounding, str(), ...) cannot be replayed from
+# another start; the recording is dropped and the card simply drawn every time.
+def _untracked(name):
+    method = getattr(float, name)
+    def untracked(self, *args):
+        if self.rec.active: self.rec.lost = True
+        return method(float(self), *args)
+    return untracked
+
+for _name in ('__floordiv__', '__rfloordiv__', '__mod__', '__rmod__', '__divmod__', '__rdivmod__', '__pow__',
+              '__rpow__', '__round__', '__trunc__', '__floor__', '__ceil__', '__int__', '__str__', '__repr__'):
+    setattr(Offset, _name, _untracked(_name))
+
+# A recording keeps every value it saw in one list: the starting y first, constants
+# where they were used, and the result of each operation, which `ops` lists as
+# (index, fn, index of a, index of b). Replay copies the list, puts the new start in
+# front and runs the operations again.
+def run_ops(values, ops, origin):
+    values = values.copy()
+    values[0] = origin
+    for i, fn, a, b in ops: values[i] = fn(values[a], values[b])
+    return values
+
+class _Recording:
+    def __init__(self, origin):
+        self.active = True
+        self.lost = False
+        self.values = [float(origin)]
+        self.ops = []
+        self.checks = []
+        self.marks = []
+        self.chunks = []
+        self.y = Offset(origin, self, 0)
+
+    # Index and plain value of an operand; constants are appended where they are used.
+    def operand(self, v):
+        values = self.values
+        if type(v) is Offset:
+            if v.rec is self: return v.slot, values[v.slot]
+            v = float(v)
+        values.append(v)
+        return len(values) - 1, v
+
+    def op(self, fn, a, b):
+        if not self.active: return fn(_plain(a), _plain(b))
+        values = self.values
+        # Inlined operand(): this runs for every coordinate fpdf works out.
+        if type(a) is Offset and a.rec is self:
+            ia = a.slot
+            a = values[ia]
+        else:
+            ia, a = self.operand(a)
+        if type(b) is Offset and b.rec is self:
+            ib = b.slot
+            b = values[ib]
+        else:
+            ib, b = self.operand(b)
+        value = fn(a, b)
+        if type(value) is not float:
+            if value is not NotImplemented: self.lost = True
+            return value
+        i = len(values)
+        values.append(value)
+        self.ops.append((i, fn, ia, ib))
+        return Offset(value, self, i)
+
+    def compare(self, fn, a, b):
+        if not self.active: return fn(_plain(a), _plain(b))
+        ia, a = self.operand(a)
+        ib, b = self.operand(b)
+        result = fn(a, b)
+        if result is not NotImplemented: self.checks.append((fn, ia, ib, result))
+        return result
+
+    def format(self, v, spec):
+        text = format(float(v), spec)
+        if not self.active: return text
+        self.marks.append((v.slot, spec, text))
+        return f"{MARK}{len(self.marks) - 1}{MARK}"
+
+    # Keeps only what replay needs: the operations leading to a written coordinate, a
+    # check or a PDF attribute, renumbered densely, with repeated constants merged.
+    def compact(self, attrs):
+        live = {0}
+        for chunk in self.chunks:
+            if type(chunk) is tuple: live.update(p[0] for p in chunk if type(p) is tuple)
+        for _, a, b, _ in self.checks: live.update((a, b))
+        live.update(slot for _, slot, _ in attrs if slot is not None)
+        kept = []
+        for op in reversed(self.ops):
+            if op[0] in live:
+                kept.append(op)
+                live.update(op[2:])
+        kept.reverse()
+        produced = {op[0] for op in kept}
+        index, values, consts = {}, [], {}
+        for slot in sorted(live):
+            v = self.values[slot]
+            if slot and slot not in produced:
+                key = (type(v), repr(v))
+                if key in consts:
+                    index[slot] = consts[key]
+                    continue
+                consts[key] = len(values)
+            index[slot] = len(values)
+            values.append(v)
+        ops = tuple((index[i], fn, index[a], index[b]) for i, fn, a, b in kept)
+        checks = tuple(dict.fromkeys((fn, index[a], index[b], result) for fn, a, b, result in self.checks))
+        chunks = tuple(c if type(c) is str else tuple(p if type(p) is str else (index[p[0]], p[1]) for p in c)
+                       for c in self.chunks)
+        attrs = tuple((name, None if slot is None else index[slot], value) for name, slot, value in attrs)
+        return values, ops, checks, chunks, attrs
+
+    # Takes a chunk on its way to the page and returns the text actually written; the
+    # chunk is kept as literal text plus (value, format spec) holes.
+    def take(self, s):
+        if isinstance(s, bytes): s = s.decode('latin-1')
+        elif not isinstance(s, str): s = str(s)
+        if MARK not in s:
+            self.chunks.append(s)
+            return s
+        template, text = [], []
+        for i, part in enumerate(s.split(MARK)):
+            if i % 2:
+                slot, spec, real = self.marks[int(part)]
+                template.append((slot, spec))
+                text.append(real)
+            elif part:
+                template.append(part)
+                text.append(part)
+        self.chunks.append(tuple(template))
+        return ''.join(text)
+
+class Fragment:
+    __slots__ = ('values', 'ops', 'checks', 'chunks', 'fonts', 'state', 'font_key', 'attrs', 'seconds')
+
+    def __init__(self, values, ops, checks, chunks, fonts, state, font_key, attrs, seconds):
+        self.values = values
+        self.ops = ops
+        self.checks = checks
+        self.chunks = chunks
+        self.fonts = fonts  # ((fontkey, number), ...) the operators refer to
+        self.state = state  # graphics state after the card, current_font cleared
+        self.font_key = font_key
+        self.attrs = attrs  # (name, value index or None, value) set on the PDF afterwards
+        self.seconds = seconds
+
+    # Writes the card at the PDF's current y; False (and nothing written) if it cannot
+    # be replayed there.
+    def replay(self, pdf):
+        fonts = pdf.fonts
+        for key, i in self.fonts:
+            font = fonts.get(key)
+            if font is None or font.i != i: return False
+        values = run_ops(self.values, self.ops, pdf.y)
+        for fn, a, b, result in self.checks:
+            if fn(values[a], values[b]) != result: return False
+
+        out = pdf._out
+        for chunk in self.chunks:
+            if type(chunk) is str: out(chunk)
+            else: out(''.join(p if type(p) is str else format(values[p[0]], p[1]) for p in chunk))
+        for _, i in self.fonts:
+            pdf._resource_catalog.add(PDFResourceType.FONT, i, pdf.page)
+        state = self.state.copy()
+        state.dash_pattern = dict(state.dash_pattern)
+        state.current_font = fonts[self.font_key] if self.font_key else None
+        pdf._pop_local_stack()
+        pdf._push_local_stack(state)
+        for name, slot, value in self.attrs:
+            setattr(pdf, name, value if slot is None else values[slot])
+        return True
+
+# Everything the operators a card writes depend on besides its content and starting y.
+def entry_state(pdf):
+    gs = pdf._get_current_graphics_state()
+    state = []
+    for f in fields(gs):
+        v = getattr(gs, f.name)
+        if f.name == 'current_font': v = v and (v.fontkey, v.i)
+        elif isinstance(v, dict): v = repr(sorted(v.items()))
+        state.append(v)
+    return tuple(state) + tuple(getattr(pdf, name, None) for name in STATE_ATTRS)
+
+# Draws a card with pdf.y as an Offset; returns its Fragment, or None when the drawing
+# cannot be replayed elsewhere (it changed page, ran out of budget, or left state
+# behind that is not plain data).
+def record(pdf, draw):
+    origin, page = pdf.y, pdf.page
+    before = dict(vars(pdf))
+    rec = _Recording(origin)
+    pdf.y = rec.y
+    pdf.fragment_recording = rec
+    start = time.perf_counter()
+    try:
+        draw()
+    finally:
+        rec.active = False
+        pdf.fragment_recording = None
+        end_y = pdf.y
+        if isinstance(end_y, Offset): pdf.y = float(end_y)
+    seconds = time.perf_counter() - start
+    budget = pdf.budget
+    if rec.lost or pdf.page != page or (budget is not None and budget.exceeded): return None
+
+    attrs = []
+    for name, value in vars(pdf).items():
+        old = before.get(name, _MISSING)
+        if name == 'y':
+            value, old = end_y, _MISSING  # always set: it may not follow the start
+        if value is old: continue
+        if isinstance(value, Offset):
+            if value.rec is not rec: return None
+            attrs.append((name, value.slot, None))
+            if name != 'y': setattr(pdf, name, float(value))
+        elif type(value) not in SIMPLE_TYPES:
+            return None
+        elif type(old) is not type(value) or old != value:
+            attrs.append((name, None, value))
+
+    refs = set()
+    for chunk in rec.chunks:
+        text = chunk if type(chunk) is str else ''.join(p for p in chunk if type(p) is str)
+        refs.update(int(i) for i in _FONT_REF.findall(text))
+    fonts = tuple(sorted((font.fontkey, font.i) for font in pdf.fonts.values() if font.i in refs))
+    if len(fonts) != len(refs): return None
+
+    state = pdf._get_current_graphics_state()
+    font_key = state.current_font.fontkey if state.current_font else None
+    state.current_font = None
+    values, ops, checks, chunks, attrs = rec.compact(attrs)
+    return Fragment(values, ops, checks, chunks, fonts, state, font_key, attrs, seconds)
+
+# A recorded card costs about 25 KB, so the default holds a few days of large reports
+# in roughly 25 MB.
+class FragmentCache:
+    def __init__(self, max_cards=1024):
+        self.max_cards = max_cards
+        self._atoms = OrderedDict()
+        self._drawings = OrderedDict()
+        self._lock = threading.Lock()
+        self.atom_hits = self.atom_misses = 0
+        self.replays = self.recorded = 0
+        self.saved_seconds = 0.0
+        self.evictions = 0
+
+    def _get(self, table, key):
+        with self._lock:
+            value = table.get(key)
+            if value is not None: table.move_to_end(key)
+            return value
+
+    def _put(self, table, key, value):
+        if self.max_cards <= 0: return
+        with self._lock:
+            table[key] = value
+            table.move_to_end(key)
+            while len(table) > self.max_cards:
+                table.popitem(last=False)
+                self.evictions += 1
+
+    def atoms(self, key, measure):
+        atoms = self._get(self._atoms, key)
+        if atoms is not None:
+            self.atom_hits += 1
+            return list(atoms)
+        self.atom_misses += 1
+        atoms = measure()
+        self._put(self._atoms, key, tuple(atoms))
+        return atoms
+
+    # Replays the card drawn for `key` from the same state before, or draws it with
+    # `draw` and keeps the recording. Returns the seconds the replay saved over the
+    # recorded draw, or None when the card was drawn.
+    def draw(self, pdf, key, draw):
+        key = (key, entry_state(pdf))
+        fragment = self._get(self._drawings, key)
+        if fragment is not None:
+            start = time.perf_counter()
+            if fragment.replay(pdf):
+                saved = fragment.seconds - (time.perf_counter() - start)
+                self.replays += 1
+                self.saved_seconds += saved
+                return saved
+        fragment = record(pdf, draw)
+        if fragment is not None:
+            self.recorded += 1
+            self._put(self._drawings, key, fragment)
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._atoms.clear()
+            self._drawings.clear()
+
+    def stats(self):
+        atoms = self.atom_hits + self.atom_misses
+        draws = self.replays + self.recorded
+        return {
+            'atom_hits': self.atom_hits,
+            'atom_misses': self.atom_misses,
+            'atom_hit_rate': self.atom_hits / atoms if atoms else 0.0,
+            'replays': self.replays,
+            'recorded': self.recorded,
+            'replay_rate': self.replays / draws if draws else 0.0,
+            'saved_ms': round(self.saved_seconds * 1000, 1),
+            'atom_entries': len(self._atoms),
+            'fragment_entries': len(self._drawings),
+            'evictions': self.evictions,
+        }
+
+_default_fragment_cache = FragmentCache()
+
+def default_fragment_cache():
+    if os.environ.get(FRAGMENTS_ENV, '').strip() != '1': return None
+    return _default_fragment_cache
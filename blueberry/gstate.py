@@ -0,0 +1,227 @@
+import re
+
+# --- GRAPHICS-STATE DEDUPLICATION ---
+# fpdf already skips a setter whose value matches its own bookkeeping, but what reaches
+# the page is still full of operators that change nothing: a fill colour set by
+# reset_state and replaced before anything is filled, a font selected for a label and
+# swapped before any text, and above all every text cell wrapped in its own q ... Q so
+# it can set its text colour and restore the previous one.
+#
+# StateFilter sits between the PDF and its page buffers and keeps two copies of the
+# fill colour, stroke colour, line width and font: the *logical* state the original
+# operators describe, and the *actual* state of what has been written. Setters only
+# update the logical state. Right before an operator that paints with one of them, the
+# logical value is written if the page does not already have it. A q/Q pair that only
+# protects tracked state is dropped; restoring the logical state at Q is enough.
+# Everything else (positions, text, paths, clipping, transforms) passes through in
+# order.
+#
+# Off by default (PDF(dedupe_state=True) turns it on): re-reading every chunk costs
+# more render time than the roughly 1% of file size it saves (see bench_gstate).
+
+# Setters we track, by the piece of state they set.
+STATE_OPS = {'rg': 'fill', 'g': 'fill', 'k': 'fill', 'RG': 'stroke', 'G': 'stroke', 'K': 'stroke',
+             'w': 'width', 'Tf': 'font'}
+TRACKED = ('fill', 'stroke', 'width', 'font')
+DEFAULTS = {'fill': '0 g', 'stroke': '0 G', 'width': '1 w', 'font': None}
+# Colour-space forms also set the colour, but not in a form we compare.
+OPAQUE_SETS = {'cs': 'fill', 'sc': 'fill', 'scn': 'fill', 'CS': 'stroke', 'SC': 'stroke', 'SCN': 'stroke'}
+# Change state that q/Q would also have to restore, so a scope using them is kept.
+UNTRACKED_SETS = frozenset('cm W W* Tc Tw Tz TL Ts Tr J j M d ri i gs'.split()) | frozenset(OPAQUE_SETS)
+# Neither paint nor set anything we track.
+NEUTRAL_OPS = frozenset('re m l c v y h n W W* cm BT ET Td TD Tm T* Tc Tw Tz TL Ts J j M d ri i '
+                        'BMC BDC EMC MP DP BX EX'.split())
+PAINT_USES = {'f': ('fill',), 'F': ('fill',), 'f*': ('fill',),
+              'S': ('stroke', 'width'), 's': ('stroke', 'width'),
+              'B': ('fill', 'stroke', 'width'), 'B*': ('fill', 'stroke', 'width'),
+              'b': ('fill', 'stroke', 'width'), 'b*': ('fill', 'stroke', 'width')}
+# Path construction; colour and width cannot change between these and the painting op.
+PATH_OPS = frozenset(('m', 'l', 'c', 'v', 'y', 'h', 're'))
+TEXT_SHOW = frozenset(('Tj', 'TJ', "'", '"'))
+TEXT_USES = ('font', 'fill')
+TEXT_STROKE_USES = ('font', 'fill', 'stroke', 'width')
+
+# fpdf writes plain state changes one per line; these two shapes cover all of them.
+_SIMPLE = re.compile(r'(?:(-?[\d.]+(?: -?[\d.]+)*) (rg|g|k|RG|G|K|w)|BT (/\S+ -?[\d.]+ Tf) ET)')
+_TOKEN = re.compile(r'\((?:[^()\\]|\\.)*\)|<<|>>|<[0-9A-Fa-f\s]*>|[\[\]]|/[^\s/\[\]()<>{}%]*'
+                    r'|[^\s/\[\]()<>{}%]+|[()<>{}%]', re.S)
+_STRAY = frozenset('()<>{}%')
+_SETTER_ENDS = frozenset('gGkKwT')
+# Shortcut for what cell() writes most: optional q, optional background rect, one run
+# of text in one colour, optional Q.
+_CELL = re.compile(r'(q )?((?:-?[\d.]+ ){4}re ([fSB]) )?BT (-?[\d.]+ -?[\d.]+ Td) '
+                   r'((?:[\d.]+ ){1,3}(?:rg|g) )?(\((?:[^()\\]|\\.)*\) Tj) ET( Q)?')
+
+def is_operand(tok):
+    c = tok[0]
+    return c in '/-.+(<[]' or c.isdigit()
+
+# Split a chunk into (operands, operator) pairs; None if it holds something we do not
+# parse (inline images, unbalanced strings), which then passes through untouched.
+def parse_ops(text):
+    ops, operands, dict_depth = [], [], 0
+    for tok in _TOKEN.findall(text):
+        if tok in _STRAY or tok == 'BI': return None
+        if tok == '<<': dict_depth += 1
+        elif tok == '>>': dict_depth -= 1
+        if dict_depth or tok == '>>' or is_operand(tok):
+            operands.append(tok)
+        else:
+            ops.append((operands, tok))
+            operands = []
+    return ops if not operands else None
+
+# Indexes of q and Q operators that can be dropped: a pair closed within the chunk with
+# nothing in between that changes state we do not track.
+def droppable_scopes(ops):
+    drop, open_q = set(), []
+    for i, (_, op) in enumerate(ops):
+        if op == 'q':
+            open_q.append([i, False])
+        elif op == 'Q':
+            if not open_q: continue
+            start, keep = open_q.pop()
+            if not keep: drop.update((start, i))
+        elif op in UNTRACKED_SETS or not (op in NEUTRAL_OPS or op in STATE_OPS or op in PAINT_USES
+                                          or op in TEXT_SHOW):
+            for scope in open_q: scope[1] = True
+    return drop
+
+class PageState:
+    __slots__ = ('logical', 'actual', 'stack', 'mode_stroke')
+
+    def __init__(self):
+        self.logical = dict(DEFAULTS)
+        self.actual = dict(DEFAULTS)
+        # (logical, actual) saved at each q; actual is None for a dropped q.
+        self.stack = []
+        self.mode_stroke = False
+
+class StateFilter:
+    def __init__(self):
+        self.pages = {}
+        self.ops_in = 0
+        self.ops_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    # Takes one chunk fpdf wrote (latin-1 text) and returns what to append to `page`
+    # now, possibly nothing.
+    def filter(self, page, text):
+        ps = self.pages.get(page)
+        if ps is None: ps = self.pages[page] = PageState()
+        self.bytes_in += len(text) + 1
+        # The last characters pick the likely shape before any regex runs.
+        last = text[-1:]
+        m = None
+        if last in _SETTER_ENDS and len(text) < 80:
+            m = _SIMPLE.fullmatch(text)
+            if m:
+                if m.group(3):
+                    self.ops_in += 3
+                    ps.logical['font'] = m.group(3)
+                else:
+                    self.ops_in += 1
+                    ps.logical[STATE_OPS[m.group(2)]] = text
+                return ''
+        if last in 'TQ':
+            m = _CELL.fullmatch(text)
+        if m and bool(m.group(1)) == bool(m.group(7)):
+            out = self._cell(ps, m)
+        else:
+            ops = parse_ops(text)
+            if ops is None: return self._passthrough(ps, text)
+            self.ops_in += len(ops)
+            out = ' '.join(self._rewrite(ps, ops))
+        if out: self.bytes_out += len(out) + 1
+        return out
+
+    def _sync(self, ps, kinds, out):
+        logical, actual = ps.logical, ps.actual
+        for kind in kinds:
+            value = logical[kind]
+            if value != actual[kind]:
+                actual[kind] = value
+                if isinstance(value, str):
+                    out.append(value)
+                    self.ops_out += 1
+
+    def _cell(self, ps, m):
+        scoped, rect, paint, td, colour, show = m.group(1, 2, 3, 4, 5, 6)
+        saved = ps.logical['fill']
+        out = []
+        if rect:
+            self._sync(ps, PAINT_USES[paint], out)
+            out.append(rect[:-1])
+        out.append('BT')
+        out.append(td)
+        if colour: ps.logical['fill'] = colour[:-1]
+        self._sync(ps, TEXT_STROKE_USES if ps.mode_stroke else TEXT_USES, out)
+        out.append(show)
+        out.append('ET')
+        if scoped: ps.logical['fill'] = saved
+        self.ops_in += 4 + 2 * bool(rect) + bool(colour) + 2 * bool(scoped)
+        self.ops_out += 4 + 2 * bool(rect)
+        return ' '.join(out)
+
+    def _rewrite(self, ps, ops):
+        out = []
+        drop = droppable_scopes(ops)
+        path_at = None
+        for i, (operands, op) in enumerate(ops):
+            if op in STATE_OPS:
+                ps.logical[STATE_OPS[op]] = ' '.join(operands) + ' ' + op
+                continue
+            if op == 'q':
+                if i in drop:
+                    ps.stack.append((dict(ps.logical), None, ps.mode_stroke))
+                    continue
+                ps.stack.append((dict(ps.logical), dict(ps.actual), ps.mode_stroke))
+            elif op == 'Q':
+                if not ps.stack:
+                    # Closes a q from before this filter saw the page: state is unknown.
+                    ps.logical = {k: object() for k in TRACKED}
+                    ps.actual = dict(ps.logical)
+                else:
+                    ps.logical, actual, ps.mode_stroke = ps.stack.pop()
+                    if i in drop: continue
+                    ps.actual = actual
+            elif op in TEXT_SHOW:
+                self._sync(ps, TEXT_STROKE_USES if ps.mode_stroke else TEXT_USES, out)
+            elif op in PATH_OPS:
+                if path_at is None: path_at = len(out)
+            elif op in PAINT_USES or op == 'n':
+                if op in PAINT_USES:
+                    at = len(out) if path_at is None else path_at
+                    pre = []
+                    self._sync(ps, PAINT_USES[op], pre)
+                    out[at:at] = pre
+                path_at = None
+            elif op == 'Tr':
+                ps.mode_stroke = operands[-1:] not in (['0'], ['3'], ['7'])
+            elif op in OPAQUE_SETS:
+                kind = OPAQUE_SETS[op]
+                ps.logical[kind] = ps.actual[kind] = object()
+            elif op not in NEUTRAL_OPS:
+                # gs, XObjects, shadings, anything unknown: bring everything up to date
+                # first; afterwards we no longer know what the page holds.
+                self._sync(ps, TRACKED, out)
+                if op == 'gs':
+                    for kind in TRACKED: ps.logical[kind] = ps.actual[kind] = object()
+            out.extend(operands)
+            out.append(op)
+            self.ops_out += 1
+        return out
+
+    def _passthrough(self, ps, text):
+        out = []
+        self._sync(ps, TRACKED, out)
+        for kind in TRACKED: ps.logical[kind] = ps.actual[kind] = object()
+        ps.mode_stroke = True
+        if out: text = ' '.join(out) + '\n' + text
+        self.bytes_out += len(text) + 1
+        return text
+
+    def stats(self):
+        return {'ops_in': self.ops_in, 'ops_out': self.ops_out, 'ops_removed': self.ops_in - self.ops_out,
+                'content_bytes_in': self.bytes_in, 'content_bytes': self.bytes_out}
@@ -0,0 +1,135 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from heapq import merge
+
+from bs4 import NavigableString, Tag
+
+from .text import safe_get_text
+
+HEADING_TAGS = ('h2', 'h3')
+
+# --- DOCUMENT INDEX ---
+# One pre-order walk records every tag's document position and subtree span, keyed
+# by name, class and id, plus the first string matching each anchor pattern. Lookups
+# that used to re-scan the tree (soup.find / find_all / find_next) become bisects
+# over these sorted position lists.
+class DocumentIndex:
+    def __init__(self, root, anchors=None):
+        self.root = root
+        self.tags = []
+        self._pos = {}
+        self._end = []
+        self._by_name = defaultdict(list)
+        self._by_class = defaultdict(list)
+        self._by_id = defaultdict(list)
+        self._heading_text = {}
+        self.anchors = {}
+
+        pending = dict(anchors or {})
+        stack = []
+        for node in root.descendants:
+            if isinstance(node, Tag):
+                pos = len(self.tags)
+                parent = node.parent
+                while stack and stack[-1][0] is not parent:
+                    self._end[stack.pop()[1]] = pos - 1
+                stack.append((node, pos))
+                self.tags.append(node)
+                self._end.append(pos)
+                self._pos[id(node)] = pos
+                self._by_name[node.name].append(pos)
+                for cls in node.get('class') or ():
+                    self._by_class[cls].append(pos)
+                node_id = node.get('id')
+                if node_id is not None:
+                    self._by_id[node_id].append(pos)
+            elif pending and isinstance(node, NavigableString):
+                for name, pattern in list(pending.items()):
+                    if pattern.search(node):
+                        self.anchors[name] = node
+                        del pending[name]
+        last = len(self.tags) - 1
+        while stack:
+            self._end[stack.pop()[1]] = last
+
+    def __len__(self):
+        return len(self.tags)
+
+    def _span(self, within):
+        if within is None or within is self.root:
+            return -1, len(self.tags) - 1
+        pos = self._pos[id(within)]
+        return pos, self._end[pos]
+
+    # Position of `tag` in document order and of its last descendant (inclusive).
+    def span(self, tag):
+        return self._span(tag)
+
+    def end(self, pos):
+        return self._end[pos]
+
+    def _lists(self, table, keys):
+        if isinstance(keys, str): keys = (keys,)
+        return [table[k] for k in keys if k in table]
+
+    def _first(self, lists, within):
+        start, end = self._span(within)
+        best = None
+        for positions in lists:
+            i = bisect_right(positions, start)
+            if i < len(positions) and positions[i] <= end and (best is None or positions[i] < best):
+                best = positions[i]
+        return self.tags[best] if best is not None else None
+
+    def _all(self, lists, within):
+        start, end = self._span(within)
+        slices = []
+        for positions in lists:
+            slices.append(positions[bisect_right(positions, start):bisect_right(positions, end)])
+        if len(slices) == 1:
+            return [self.tags[p] for p in slices[0]]
+        out = []
+        last = None
+        for p in merge(*slices):
+            if p != last: out.append(self.tags[p])
+            last = p
+        return out
+
+    # --- lookups (descendants of `within`, or the whole document) ---
+    def find(self, name=None, class_=None, within=None):
+        if class_ is not None and name is not None:
+            return next(iter(self.find_all(name, class_, within)), None)
+        if class_ is not None:
+            return self._first(self._lists(self._by_class, class_), within)
+        return self._first(self._lists(self._by_name, name), within)
+
+    def find_all(self, name=None, class_=None, within=None):
+        if class_ is not None:
+            found = self._all(self._lists(self._by_class, class_), within)
+            return [t for t in found if t.name == name] if name is not None else found
+        return self._all(self._lists(self._by_name, name), within)
+
+    def find_id(self, value):
+        positions = self._by_id.get(value)
+        return self.tags[positions[0]] if positions else None
+
+    def find_next(self, element, class_):
+        lists = self._lists(self._by_class, class_)
+        pos = self._pos[id(element)]
+        best = None
+        for positions in lists:
+            i = bisect_left(positions, pos + 1)
+            if i < len(positions) and (best is None or positions[i] < best):
+                best = positions[i]
+        return self.tags[best] if best is not None else None
+
+    def heading_text(self, tag):
+        key = id(tag)
+        if key not in self._heading_text:
+            self._heading_text[key] = safe_get_text(tag)
+        return self._heading_text[key]
+
+    def heading(self, contains, names=HEADING_TAGS):
+        for tag in self.find_all(name=names):
+            if contains in self.heading_text(tag): return tag
+        return None
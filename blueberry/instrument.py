@@ -0,0 +1,156 @@
+import cProfile
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger('blueberry.stages')
+
+# --- STAGE INSTRUMENTATION ---
+# Each stage of a render records wall time, pages added, free-form counts (cards,
+# items, bytes) and, when memory tracking is on, the tracemalloc peak reached while it
+# ran. Stages run sequentially; the same stage name appears once per phase
+# ('extract' / 'render'), plus 'parse' (or 'stream', see stream.py) before and
+# 'output' after.
+# `on_event(event, rec)` is called with 'count' whenever a count is added and with
+# 'stage' when a stage finishes, passing that stage's record; progress reporting
+# hangs off it.
+class StageRecorder:
+    def __init__(self, memory=False, label=None, on_event=None):
+        self.memory = memory
+        self.label = label
+        self.on_event = on_event
+        self.records = []
+        self.pdf = None
+        self._current = None
+        self._started_tracing = False
+
+    # tracemalloc slows allocation-heavy code severalfold, so it is only switched on
+    # when asked for, and only stopped again if this recorder started it.
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name, phase='render'):
+        rec = {'phase': phase, 'stage': name, 'ms': 0.0, 'peak_kb': None, 'pages': 0, 'counts': {}}
+        tracing = self.memory and tracemalloc.is_tracing()
+        if tracing:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        pages = self.pdf.page_no() if self.pdf is not None else 0
+        self._current = rec
+        start = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            rec['ms'] = round((time.perf_counter() - start) * 1000, 3)
+            if tracing: rec['peak_kb'] = round(max(tracemalloc.get_traced_memory()[1] - base, 0) / 1024, 1)
+            if self.pdf is not None: rec['pages'] = self.pdf.page_no() - pages
+            self._current = None
+            self.records.append(rec)
+            if self.on_event: self.on_event('stage', rec)
+
+    def count(self, key, n=1):
+        if self._current is not None:
+            counts = self._current['counts']
+            counts[key] = counts.get(key, 0) + n
+            if self.on_event: self.on_event('count', self._current)
+
+    def total_ms(self):
+        return sum(r['ms'] for r in self.records)
+
+    def totals_by_stage(self):
+        totals = {}
+        for r in self.records:
+            totals[r['stage']] = totals.get(r['stage'], 0.0) + r['ms']
+        return totals
+
+    def to_dict(self):
+        peaks = [r['peak_kb'] for r in self.records if r['peak_kb'] is not None]
+        return {
+            'label': self.label,
+            'total_ms': self.total_ms(),
+            'peak_kb': max(peaks) if peaks else None,
+            'pages': sum(r['pages'] for r in self.records),
+            'fragments': self.fragment_summary(),
+            'stages': self.records,
+        }
+
+    def count_total(self, key):
+        return sum(r['counts'].get(key, 0) for r in self.records)
+
+    # Cards replayed from the fragment cache (see fragments.py) against cards drawn,
+    # and the drawing time the replays saved; None when no card went through it.
+    def fragment_summary(self):
+        reused, drawn = self.count_total('fragments_reused'), self.count_total('fragments_drawn')
+        if not reused + drawn: return None
+        return {'reused': reused, 'drawn': drawn, 'reuse_ratio': round(reused / (reused + drawn), 3),
+                'saved_ms': round(self.count_total('fragment_saved_ms'), 1)}
+
+    # One JSON object per stage plus a summary line, so logs can be grepped or
+    # loaded straight into a dataframe.
+    def log(self, log=None, level=logging.INFO):
+        log = log or logger
+        if not log.isEnabledFor(level): return
+        for r in self.records:
+            log.log(level, json.dumps(dict(r, event='stage', label=self.label)))
+        summary = self.to_dict()
+        del summary['stages']
+        log.log(level, json.dumps(dict(summary, event='render')))
+
+# Stage lines are plain JSON on their own handler so they stay parseable whatever the
+# host application's log format is.
+def enable_stage_log(stream=None):
+    if logger.handlers: return
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+class _NullRecorder:
+    pdf = None
+    memory = False
+
+    @contextmanager
+    def stage(self, name, phase='render'):
+        yield None
+
+    def count(self, key, n=1):
+        pass
+
+NULL_RECORDER = _NullRecorder()
+
+# --- OPT-IN PROFILING ---
+# Set BLUEBERRY_PROFILE to a directory (or pass one) to dump a cProfile .prof file per
+# render; inspect with `python -m pstats` or snakeviz.
+def profile_dir():
+    return os.environ.get('BLUEBERRY_PROFILE') or None
+
+@contextmanager
+def profiled(name='render', directory=None):
+    directory = directory or profile_dir()
+    if not directory:
+        yield None
+        return
+    os.makedirs(directory, exist_ok=True)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        path = os.path.join(directory, f"{name}-{os.getpid()}-{time.time_ns()}.prof")
+        profiler.dump_stats(path)
+        logger.info(json.dumps({'event': 'profile', 'path': path}))
@@ -0,0 +1,149 @@
+import abc
+import hashlib
+import tempfile
+import threading
+import time
+
+from .batch import ZipCollector, render_uploads
+from .budget import Budget
+from .cache import cache_key, render_pdf_bytes_cached
+from .instrument import StageRecorder
+
+# --- BACKGROUND RENDER JOBS ---
+# A job renders on a worker thread and publishes state, progress and the finished
+# bytes as plain attributes, so a UI can poll it from any rerun without blocking. Jobs
+# are keyed by a hash of their input: the same upload maps to the same job, and a
+# finished job is simply shown again instead of being re-rendered.
+ZIP_SPOOL_BYTES = 32 * 1024 * 1024
+
+# Rough share of a render spent before the cards (parse + extraction + first page)
+# and after them (notes, disclaimer, pdf.output). Cards fill the span in between.
+_CARDS_START, _CARDS_END = 0.10, 0.90
+_EXTRACT_STAGES = 9
+
+def upload_key(files):
+    h = hashlib.sha256()
+    for name, bytes_data in files:
+        h.update(name.encode('utf-8', 'replace'))
+        h.update(b'\0')
+        h.update(cache_key(bytes_data).encode())
+    return h.hexdigest()
+
+class RenderJob(abc.ABC):
+    def __init__(self, key, name):
+        self.key = key
+        self.name = name
+        self.state = 'queued'
+        self.progress = 0.0
+        self.message = "Queued"
+        self.error = None
+        self.data = None
+        self.cached = False
+        self.truncated = None  # why a finished PDF is partial (budget.py)
+        self.seconds = None
+        self.finished = threading.Event()
+
+    @property
+    def done(self):
+        return self.state in ('done', 'failed')
+
+    def submit(self, executor, *args):
+        executor.submit(self._run, *args)
+        return self
+
+    def _run(self, *args):
+        start = time.perf_counter()
+        self.state = 'running'
+        self.message = "Starting"
+        try:
+            self.data = self.work(*args)
+            self.state = 'done'
+            self.progress = 1.0
+            self.message = "Done"
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.state = 'failed'
+            self.message = "Failed"
+        finally:
+            self.seconds = time.perf_counter() - start
+            self.finished.set()
+
+    @abc.abstractmethod
+    def work(self, *args):
+        pass
+
+# One report to one PDF. Progress follows the stage recorder: extraction stages,
+# then one step per card rendered, then output.
+class PDFJob(RenderJob):
+    def __init__(self, name, bytes_data, trace_memory=False):
+        super().__init__(upload_key([(name, bytes_data)]), name)
+        self.bytes_data = bytes_data
+        self.trace_memory = trace_memory
+        self.recorder = None
+        self._extracted = 0
+        self._total_cards = 0
+        self._cards_done = 0
+
+    def _on_event(self, event, rec):
+        if rec['phase'] == 'extract':
+            if event == 'stage':
+                self._extracted += 1
+                self._total_cards += rec['counts'].get('cards', 0) + rec['counts'].get('items', 0)
+                self.progress = _CARDS_START * self._extracted / _EXTRACT_STAGES
+                self.message = f"Parsed {rec['stage']}"
+            return
+        # Other counts (plan misses, fragment reuse) share these stages; only the
+        # 'cards' count says how many cards are drawn.
+        if rec['stage'] in ('cards', 'watchlist'):
+            done = self._cards_done + rec['counts'].get('cards', 0)
+            if event == 'stage':
+                self._cards_done = done
+                return
+            share = done / self._total_cards if self._total_cards else 1.0
+            self.progress = _CARDS_START + (_CARDS_END - _CARDS_START) * min(share, 1.0)
+            self.message = f"Rendered {done}/{self._total_cards} cards"
+        elif event == 'stage' and rec['stage'] == 'disclaimer':
+            self.progress = _CARDS_END
+            self.message = "Writing PDF"
+
+    def work(self, cache):
+        recorder = StageRecorder(self.trace_memory, self.name, self._on_event).start()
+        budget = Budget()
+        try:
+            data, self.cached = render_pdf_bytes_cached(self.bytes_data, cache, recorder, budget)
+        finally:
+            recorder.stop()
+        self.truncated = budget.exceeded
+        self.recorder = recorder
+        self.bytes_data = None
+        return data
+
+# Several reports to one ZIP, rendered on a process pool; per-file results are kept
+# (without their PDF bytes, which go straight into the archive) for display. `data`
+# is the spooled archive itself, never read into memory here; seek(0) before reading.
+class ZipJob(RenderJob):
+    def __init__(self, files):
+        super().__init__(upload_key(files), f"{len(files)} reports")
+        self.files = files
+        self.names = [name for name, _ in files]
+        self.results = []
+        self.rendered = 0
+        self.errors = []
+
+    def work(self, cache, mp_context=None):
+        archive = ZipCollector(tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_BYTES))
+        total = len(self.files)
+        for res in render_uploads(self.files, cache=cache, mp_context=mp_context):
+            archive.add(res)
+            self.results.append(res)
+            self.progress = len(self.results) / total
+            self.message = f"{len(self.results)}/{total} reports done"
+        self.files = None
+        fileobj = archive.close()
+        self.rendered = archive.files
+        self.errors = archive.errors
+        if not archive.files:
+            fileobj.close()
+            return None
+        fileobj.seek(0)
+        return fileobj
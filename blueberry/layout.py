@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from fpdf.enums import MethodReturnValue
+
+# --- LAYOUT MEASUREMENT CACHE ---
+# Line-break and string-width results keyed by font, size, width and text. Only plain
+# strings are stored (never fpdf objects), so one cache can be shared by every PDF in
+# the process: repeated labels, disclaimers and carried-over cards hit across reports.
+class LayoutCache:
+    def __init__(self, max_lines=8192, max_widths=16384):
+        self.max_lines = max_lines
+        self.max_widths = max_widths
+        self._lines = OrderedDict()
+        self._widths = OrderedDict()
+        self._lock = threading.Lock()
+        self.line_hits = self.line_misses = 0
+        self.width_hits = self.width_misses = 0
+        self.evictions = 0
+        self._journal = None
+
+    def _get(self, table, key):
+        with self._lock:
+            value = table.get(key)
+            if value is not None: table.move_to_end(key)
+            return value
+
+    def _put(self, table, key, value, limit):
+        if limit <= 0: return
+        with self._lock:
+            table[key] = value
+            table.move_to_end(key)
+            while len(table) > limit:
+                table.popitem(last=False)
+                self.evictions += 1
+
+    def split_lines(self, pdf, w, text):
+        key = (pdf.font_family, pdf.font_style, pdf.font_size_pt, pdf.c_margin, w, text)
+        lines = self._get(self._lines, key)
+        if lines is not None:
+            self.line_hits += 1
+        else:
+            self.line_misses += 1
+            lines = tuple(pdf.multi_cell(w, None, text, dry_run=True, output=MethodReturnValue.LINES))
+            self._put(self._lines, key, lines, self.max_lines)
+        if self._journal is not None: self._journal.append((key, lines))
+        return lines
+
+    def string_width(self, pdf, text):
+        key = (pdf.font_family, pdf.font_style, pdf.font_size_pt, text)
+        width = self._get(self._widths, key)
+        if width is not None:
+            self.width_hits += 1
+            return width
+        self.width_misses += 1
+        width = pdf.get_string_width(text)
+        self._put(self._widths, key, width, self.max_widths)
+        return width
+
+    # Records every line-break lookup made inside the block, so results computed in
+    # one process (a measuring worker) can be seeded into another's cache.
+    @contextmanager
+    def journal(self):
+        entries = []
+        self._journal = entries
+        try:
+            yield entries
+        finally:
+            self._journal = None
+
+    def seed(self, entries):
+        for key, lines in entries:
+            self._put(self._lines, key, lines, self.max_lines)
+
+    def clear(self):
+        with self._lock:
+            self._lines.clear()
+            self._widths.clear()
+
+    def stats(self):
+        lines = self.line_hits + self.line_misses
+        widths = self.width_hits + self.width_misses
+        return {
+            'line_hits': self.line_hits,
+            'line_misses': self.line_misses,
+            'line_hit_rate': self.line_hits / lines if lines else 0.0,
+            'width_hits': self.width_hits,
+            'width_misses': self.width_misses,
+            'width_hit_rate': self.width_hits / widths if widths else 0.0,
+            'line_entries': len(self._lines),
+            'width_entries': len(self._widths),
+            'evictions': self.evictions,
+        }
+
+_default_layout_cache = LayoutCache()
+
+def default_layout_cache():
+    return _default_layout_cache
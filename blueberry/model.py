@@ -0,0 +1,92 @@
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+# --- REPORT MODEL ---
+# Raw (uncleaned) text as extracted from the HTML; the renderer applies clean_text,
+# so the JSON export keeps characters the PDF core fonts cannot draw.
+
+@dataclass(slots=True)
+class Alert:
+    title: str
+    text: str
+
+@dataclass(slots=True)
+class IndexMetric:
+    label: str
+    value: str
+
+@dataclass(slots=True)
+class AssessmentBlock:
+    kind: str  # 'heading' or 'text'
+    text: str
+
+@dataclass(slots=True)
+class Card:
+    ticker: str
+    name: str
+    setup: str
+    details: list = field(default_factory=list)
+    params: dict = field(default_factory=dict)
+    rationale: str = ""
+    confidence: str = ""
+    mode: str = 'buy'  # 'open', 'buy' or 'sell'
+
+@dataclass(slots=True)
+class WatchlistItem:
+    ticker: str
+    name: str
+    details: list = field(default_factory=list)
+    params: dict = field(default_factory=dict)
+
+@dataclass(slots=True)
+class Disclaimer:
+    title: str
+    text: str
+
+# A section that is None was not found in the HTML; an empty list means the section
+# heading was found without items (the PDF still prints the section header).
+# truncated says why extraction stopped early (see budget.py); empty when complete.
+@dataclass(slots=True)
+class Report:
+    subtitle: str = "Market Report"
+    alert: Optional[Alert] = None
+    index: Optional[list] = None
+    assessment: Optional[list] = None
+    cards: list = field(default_factory=list)
+    watchlist: Optional[list] = None
+    notes: list = field(default_factory=list)
+    disclaimer: Optional[Disclaimer] = None
+    truncated: str = ""
+
+    def cards_by_mode(self, mode):
+        return [c for c in self.cards if c.mode == mode]
+
+    def to_dict(self):
+        return asdict(self)
+
+    def to_json(self, **kwargs):
+        kwargs.setdefault('ensure_ascii', False)
+        return json.dumps(self.to_dict(), **kwargs)
+
+    @classmethod
+    def from_dict(cls, data):
+        def opt(kind, value):
+            return kind(**value) if value is not None else None
+        def opt_list(kind, values):
+            return [kind(**v) for v in values] if values is not None else None
+        return cls(
+            subtitle=data.get('subtitle', "Market Report"),
+            alert=opt(Alert, data.get('alert')),
+            index=opt_list(IndexMetric, data.get('index')),
+            assessment=opt_list(AssessmentBlock, data.get('assessment')),
+            cards=[Card(**c) for c in data.get('cards', [])],
+            watchlist=opt_list(WatchlistItem, data.get('watchlist')),
+            notes=list(data.get('notes', [])),
+            disclaimer=opt(Disclaimer, data.get('disclaimer')),
+            truncated=data.get('truncated', ""),
+        )
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
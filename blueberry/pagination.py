@@ -0,0 +1,106 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .layout import default_layout_cache
+
+# --- TWO-PASS LAYOUT ---
+# Pass 1 measures every block as a list of (height, kind) atoms (see PDF.measure_*).
+# Pass 2 walks those atoms with the same rules fpdf and check_page_break apply while
+# drawing, so it knows the page and y of every block before anything is drawn: which
+# blocks to move to a fresh page, and the page numbers a table of contents needs.
+class Block:
+    __slots__ = ('stage', 'atoms', 'height', 'draw', 'keep', 'new_page', 'keep_with_next',
+                 'title', 'count', 'card', 'break_before', 'page', 'y')
+
+    def __init__(self, stage, atoms, draw, keep=True, new_page=False, keep_with_next=False, title=None):
+        self.stage = stage
+        self.atoms = atoms
+        self.height = sum(h for h, _ in atoms)
+        self.draw = draw
+        self.keep = keep
+        self.new_page = new_page
+        self.keep_with_next = keep_with_next
+        self.title = title
+        self.count = None
+        self.card = None  # (card or watchlist item, mode) for card blocks
+        self.break_before = False
+        self.page = self.y = None
+
+    # Height that has to fit for this block to start on the current page: all of it
+    # when it is kept together, otherwise up to its first drawn row.
+    def lead(self, usable):
+        if self.keep and self.height <= usable: return self.height
+        lead = 0
+        for h, kind in self.atoms:
+            lead += h
+            if kind != 'gap': break
+        return lead
+
+def paginate(blocks, top, trigger, page=1, y=None):
+    y = top if y is None else y
+    usable = trigger - top
+    for i, block in enumerate(blocks):
+        if block.new_page:
+            page, y = page + 1, top
+        else:
+            need = block.height if block.keep and block.height <= usable else 0
+            if block.keep_with_next and i + 1 < len(blocks) and not blocks[i + 1].new_page:
+                need = max(need, block.height + blocks[i + 1].lead(usable))
+            if need and y + need > trigger and y > top:
+                block.break_before = True
+                page, y = page + 1, top
+        block.page, block.y = page, y
+        for h, kind in block.atoms:
+            if kind == 'cell' and y + h > trigger:
+                page, y = page + 1, top
+            elif kind == 'keep' and y + h > trigger and y > top:
+                page, y = page + 1, top
+            y += h
+    return page
+
+# --- PARALLEL MEASUREMENT ---
+# Card measurement is independent of position, so it can be fanned out: each worker
+# measures a chunk on its own scratch PDF and ships back the atoms plus the line
+# breaks it computed, which seed the caller's layout cache so drawing does not wrap
+# the same text again.
+_pool = None
+_pool_workers = 0
+CHUNK_CARDS = 32
+
+def _measure_pool(workers):
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        if _pool: _pool.shutdown(wait=False)
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        _pool_workers = workers
+    return _pool
+
+def scratch_pdf(layout_cache=None, fonts=None, fragments=None):
+    from .pdf import PDF
+    pdf = PDF(layout_cache=layout_cache, dedupe_state=False, fonts=fonts, fragments=fragments)
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    return pdf
+
+def card_atoms(measurer, card):
+    return measurer.measure_card(card.details, card.params, getattr(card, 'rationale', ''),
+                                 getattr(card, 'confidence', ''))
+
+def _measure_chunk(cards, fonts=None):
+    cache = default_layout_cache()
+    measurer = scratch_pdf(cache, fonts)
+    with cache.journal() as entries:
+        atoms = [card_atoms(measurer, c) for c in cards]
+    return atoms, entries
+
+def measure_cards(measurer, cards, workers=None):
+    if not workers or workers <= 1 or len(cards) < CHUNK_CARDS * 2:
+        return [card_atoms(measurer, c) for c in cards]
+    workers = min(workers, os.cpu_count() or 1)
+    chunks = [cards[i:i + CHUNK_CARDS] for i in range(0, len(cards), CHUNK_CARDS)]
+    atoms = []
+    fonts = [measurer.font_set] * len(chunks)
+    for chunk_atoms, entries in _measure_pool(workers).map(_measure_chunk, chunks, fonts):
+        measurer.layout.seed(entries)
+        atoms.extend(chunk_atoms)
+    return atoms
@@ -0,0 +1,406 @@
+import re
+
+from bs4 import NavigableString
+
+from .budget import EXTRACT_SHARE, Budget
+from .engines import make_soup
+from .index import DocumentIndex
+from .instrument import NULL_RECORDER, profiled
+from .model import (Alert, AssessmentBlock, Card, Disclaimer, IndexMetric, Report,
+                    WatchlistItem)
+from .render import render_report
+from .rules import load_rules
+from .text import safe_get_text
+
+# --- 3. PARSER ---
+ANCHORS = {
+    'alert': re.compile("EXTREME CAUTION"),
+    'index': re.compile(r"(Current Level|Level:)"),
+}
+
+def extract_report(html_content, engine=None, recorder=None, rules=None, budget=None):
+    rec = recorder or NULL_RECORDER
+    rules = rules or load_rules()
+    budget = budget or Budget()
+    budget.check_input(html_content)
+    with rec.stage('parse', 'extract'):
+        soup = make_soup(html_content, engine)
+        idx = DocumentIndex(soup, ANCHORS)
+        rec.count('tags', len(idx.tags))
+    budget.check_nodes(len(idx.tags))
+    return extract_document(idx, rec, rules, budget)
+
+# Every section from an indexed document. stream.py, the other caller, passes
+# expand_cards to put the cards it took out of the document back in.
+def extract_document(idx, recorder=None, rules=None, budget=None, expand_cards=None):
+    rec = recorder or NULL_RECORDER
+    rules = rules or load_rules()
+    budget = budget or Budget()
+    report = Report()
+
+    # Out of time or memory between stages: keep what was extracted and say why.
+    def stop():
+        if budget.ok(EXTRACT_SHARE): return False
+        report.truncated = budget.exceeded
+        rec.count('truncated', 1)
+        return True
+
+    # 1. Subtitle Extraction
+    with rec.stage('subtitle', 'extract'):
+        subtitle_tag = find_subtitle(idx)
+        report.subtitle = safe_get_text(subtitle_tag) if subtitle_tag else "Market Report"
+    if stop(): return report
+
+    with rec.stage('alert', 'extract'):
+        report.alert = extract_alert(idx)
+    if stop(): return report
+    with rec.stage('index', 'extract'):
+        idx_card = find_index_card(idx)
+        if idx_card:
+            report.index = extract_index_metrics(idx, idx_card)
+            rec.count('metrics', len(report.index))
+    if stop(): return report
+    with rec.stage('assessment', 'extract'):
+        report.assessment = extract_assessment(idx)
+    if stop(): return report
+    with rec.stage('cards', 'extract'):
+        report.cards = extract_cards(idx, idx_card, rules, budget)
+        if expand_cards: report.cards = expand_cards(report.cards)
+        rec.count('cards', len(report.cards))
+    if stop(): return report
+    with rec.stage('watchlist', 'extract'):
+        report.watchlist = extract_watchlist(idx, rules, budget)
+        rec.count('items', len(report.watchlist or []))
+    if stop(): return report
+    with rec.stage('notes', 'extract'):
+        report.notes = extract_notes(idx)
+        rec.count('notes', len(report.notes))
+    if stop(): return report
+    with rec.stage('disclaimer', 'extract'):
+        report.disclaimer = extract_disclaimer(idx)
+    return report
+
+# 1. SUBTITLE
+def find_subtitle(idx):
+    date_div = idx.find('div', class_='date')
+    if date_div: return date_div
+    header_div = idx.find('div', class_='header')
+    return idx.find('p', within=header_div) if header_div else None
+
+# 2. ALERT BOX
+def find_alert_tag(idx):
+    alert_tag = idx.find(class_='alert-box')
+    if not alert_tag:
+        alert_text = idx.anchors.get('alert')
+        if alert_text and isinstance(alert_text, NavigableString):
+            parent = alert_text.parent
+            if parent.name in ['b', 'strong', 'h3', 'h4', 'span']:
+                alert_tag = parent.parent
+            else:
+                alert_tag = parent
+    return alert_tag if alert_tag and not isinstance(alert_tag, NavigableString) else None
+
+def extract_alert(idx):
+    alert_tag = find_alert_tag(idx)
+    if alert_tag:
+        head = idx.find(['h3', 'h4', 'strong'], within=alert_tag)
+        title = safe_get_text(head) if head else "MARKET ALERT"
+        text = safe_get_text(idx.find('p', within=alert_tag)) or safe_get_text(alert_tag)
+        text = text.replace(title, "").strip()
+        return Alert(title, text)
+    return None
+
+# 3. INDEX STATUS
+def find_index_card(idx):
+    idx_header = idx.heading('Index')
+    idx_anchor = idx.anchors.get('index')
+
+    if idx_header: return idx.find_next(idx_header, class_=['index-card', 'card'])
+    elif idx_anchor: return idx_anchor.find_parent(class_=['index-card', 'card'])
+    return None
+
+def extract_index_metrics(idx, idx_card):
+    rows = idx.find_all(class_='metric-row', within=idx_card)
+    if not rows: rows = idx.find_all(class_='metric', within=idx_card)
+
+    metrics = []
+    for row in rows:
+        label, value = "", ""
+        if idx.find(class_='metric-label', within=row):
+            label = safe_get_text(idx.find(class_='metric-label', within=row))
+            value = safe_get_text(idx.find(class_='metric-value', within=row))
+        else:
+            spans = idx.find_all('span', within=row)
+            if len(spans) > 0: label = safe_get_text(spans[0])
+            if len(spans) > 1: value = safe_get_text(spans[1])
+        metrics.append(IndexMetric(label, value))
+    return metrics
+
+# 4. MARKET ASSESSMENT
+def extract_assessment(idx):
+    assess_header = idx.heading('Market Trend')
+    if not assess_header: return None
+
+    blocks = []
+    content = find_assessment_content(idx, assess_header)
+    if content:
+        for tag in idx.find_all(['h3', 'p'], within=content):
+            blocks.append(AssessmentBlock('heading' if tag.name == 'h3' else 'text', safe_get_text(tag)))
+    return blocks
+
+def find_assessment_content(idx, assess_header):
+    return assess_header.find_next_sibling('div') or idx.find(class_='market-assessment', within=assess_header.parent)
+
+# 5. CARD EXTRACTION
+# Keyword checks come from the extraction rules (rules.py); a card's ancestors are
+# classified once per container for the whole document.
+def extract_cards(idx, idx_card=None, rules=None, budget=None):
+    rules = rules or load_rules()
+    ancestors = rules.ancestors()
+    cards = []
+
+    # Strategy: Find all valid card-like containers
+    for card in idx.find_all(class_=['setup-card', 'card']):
+        if budget and not budget.ok(EXTRACT_SHARE): break # Out of budget: keep the cards so far
+        if card == idx_card: continue # Skip Index Card
+
+        # Inside the Watchlist: skip here, process later
+        if ancestors.walk(card.parent)[0]: continue
+
+        extracted = extract_card(idx, card, rules, ancestors)
+        if extracted: cards.append(extracted)
+    return cards
+
+def extract_card(idx, card, rules=None, ancestors=None):
+    rules = rules or load_rules()
+    ancestors = ancestors or rules.ancestors()
+    ticker_el = idx.find(class_='ticker', within=card)
+    header_h3 = idx.find('h3', within=card)
+
+    if ticker_el:
+        ticker = safe_get_text(ticker_el)
+        name = safe_get_text(idx.find(class_='company-name', within=card))
+    elif header_h3:
+        raw = safe_get_text(header_h3)
+        parts = raw.split('-', 1)
+        ticker = parts[0].strip()
+        name = parts[1].strip() if len(parts)>1 else ""
+    else:
+        return None
+
+    setup = safe_get_text(idx.find(class_='setup-type', within=card)) or "Setup"
+    mode = ancestors.walk(card.parent)[1] or rules.setup_mode(setup)
+
+    table = {}
+    params = idx.find(class_='trade-params', within=card)
+    if params:
+        for b in idx.find_all(class_='param-box', within=params):
+            lbl = safe_get_text(idx.find(class_='param-label', within=b))
+            val = safe_get_text(idx.find(class_='param-value', within=b))
+            if lbl: table[lbl] = val
+    else:
+        for p in idx.find_all('p', within=card):
+            txt = safe_get_text(p)
+            if ':' in txt and len(txt) < rules.param_line_max:
+                key, val = txt.split(':', 1)
+                key = key.strip().lower()
+                val = val.strip()
+                kinds = rules.param_keys.categories(key)
+                if 'param' in kinds:
+                    table[key.title()] = val
+                elif 'setup' in kinds:
+                    setup = val
+
+    details = []
+    tech = idx.find(class_='technical-details', within=card)
+    if tech:
+        details = [safe_get_text(p) for p in idx.find_all('p', within=tech)]
+    else:
+        for p in idx.find_all('p', within=card):
+            txt = safe_get_text(p)
+            if ':' not in txt or len(txt) > rules.param_line_max:
+                details.append(txt)
+
+    rationale = safe_get_text(idx.find(class_='rationale', within=card)).replace("Rationale:", "").strip()
+    conf = safe_get_text(idx.find(class_='confidence', within=card))
+
+    return Card(ticker, name, setup, details, table, rationale, conf, mode)
+
+# 6. WATCHLIST (No Duplicates + Full Format)
+def extract_watchlist(idx, rules=None, budget=None):
+    rules = rules or load_rules()
+    wl_container = find_watchlist_container(idx)
+    if not wl_container: return None
+
+    items = []
+    for header_text, paragraphs in find_watchlist_items(idx, wl_container):
+        if budget and not budget.ok(EXTRACT_SHARE): break
+        if "-" in header_text:
+            parts = header_text.split("-", 1)
+            ticker = parts[0].strip()
+            name = parts[1].strip()
+        else:
+            ticker = header_text
+            name = ""
+
+        details = []
+        table = {}
+        for p in paragraphs:
+            txt = safe_get_text(p)
+            if ':' in txt and len(txt) < rules.watch_param_max:
+                key, val = txt.split(':', 1)
+                table[key.strip()] = val.strip()
+            else:
+                details.append(txt)
+        items.append(WatchlistItem(ticker, name, details, table))
+    return items
+
+def find_watchlist_container(idx):
+    wl_container = idx.find_id('tab-watchlist') or idx.find(class_='watchlist') or idx.find_id('watch')
+    if not wl_container:
+        wl_header = idx.heading('Watchlist')
+        if wl_header: wl_container = wl_header.find_parent('div')
+    return wl_container
+
+WATCH_TITLE_TAGS = ('h3', 'h4', 'strong')
+
+# A watchlist item is the innermost div whose first title tag (h3/h4/strong) is
+# followed by at least one <p> of its own; wrapper divs that merely share that title
+# are ignored. A title tag inside a <p> that carries more text ("<strong>Entry:</strong>
+# 5") is inline emphasis, not a title. Repeated titles are dropped in document order,
+# and each <p> belongs to its nearest enclosing item (a paragraph that only holds
+# the title is not repeated as a detail line). Every tag in the container is
+# visited a fixed number of times (four linear sweeps), so deep LLM wrapper nesting
+# stays linear.
+def find_watchlist_items(idx, container):
+    start, end = idx.span(container)
+    first, count = start + 1, end - start
+    tags = idx.tags[first:end + 1]
+
+    def last_of(i):
+        return idx.end(first + i) - first
+
+    # Sweep 1: which title tags count, the <p> (if any) holding each title, and a
+    # prefix count of <p> tags so "paragraphs inside a span" is O(1).
+    is_title = [False] * count
+    title_para = {}
+    p_before = [0] * (count + 1)
+    open_paras = []
+    for i, tag in enumerate(tags):
+        while open_paras and last_of(open_paras[-1]) < i: open_paras.pop()
+        p_before[i + 1] = p_before[i] + (tag.name == 'p')
+        if tag.name == 'p':
+            open_paras.append(i)
+        elif tag.name in WATCH_TITLE_TAGS:
+            if open_paras:
+                para = open_paras[-1]
+                if idx.heading_text(tags[para]) != idx.heading_text(tag): continue
+                title_para[i] = para
+            is_title[i] = True
+
+    # Sweep 2 (backwards): nearest title at or after each position.
+    next_title = [None] * (count + 1)
+    for i in range(count - 1, -1, -1):
+        next_title[i] = i if is_title[i] else next_title[i + 1]
+
+    # Sweep 3: close divs innermost-first and claim each title for the first
+    # (innermost) div that owns a paragraph besides the one holding the title.
+    claimed, claimed_heads = [], set()
+    def close_div(i):
+        last = last_of(i)
+        h = next_title[i + 1]
+        if h is None or h > last or h in claimed_heads: return
+        paras = p_before[last + 1] - p_before[i + 1]
+        if title_para.get(h, -1) > i: paras -= 1
+        if paras <= 0: return
+        title_text = idx.heading_text(tags[h])
+        if not title_text or len(title_text) < 3: return
+        claimed_heads.add(h)
+        claimed.append((i, last, h, title_text))
+
+    open_divs = []
+    for i, tag in enumerate(tags):
+        while open_divs and last_of(open_divs[-1]) < i: close_div(open_divs.pop())
+        if tag.name == 'div': open_divs.append(i)
+    while open_divs: close_div(open_divs.pop())
+
+    # De-duplicate by title text in document order (nested copies of the same card).
+    claimed.sort()
+    items, seen_titles = [], set()
+    for i, last, h, title_text in claimed:
+        if title_text in seen_titles: continue
+        seen_titles.add(title_text)
+        items.append((i, last, title_para.get(h), title_text, []))
+
+    # Sweep 4: hand each <p> (other than a title's own) to its nearest enclosing item.
+    stack, k = [], 0
+    for i, tag in enumerate(tags):
+        while stack and stack[-1][1] < i: stack.pop()
+        while k < len(items) and items[k][0] == i:
+            stack.append(items[k])
+            k += 1
+        if tag.name == 'p' and stack and stack[-1][2] != i: stack[-1][4].append(tag)
+    return [(title_text, paras) for _, _, _, title_text, paras in items]
+
+# 7. NOTES
+def extract_notes(idx):
+    notes_head = idx.heading('Notes')
+    if not notes_head: return []
+    container = find_notes_container(notes_head)
+    return [safe_get_text(li) for li in idx.find_all('li', within=container)]
+
+def find_notes_container(notes_head):
+    return notes_head.find_next_sibling('div') or notes_head.parent
+
+# 8. DISCLAIMER
+def find_disclaimer(idx):
+    disc = idx.find(class_='disclaimer')
+    if disc and isinstance(disc, NavigableString): disc = disc.parent
+    return disc
+
+def extract_disclaimer(idx):
+    disc = find_disclaimer(idx)
+    if not disc: return None
+    title_tag = idx.find(['h3', 'h4'], within=disc)
+    title = safe_get_text(title_tag) if title_tag else "Important Disclaimer"
+    text = safe_get_text(disc).replace(title, "").strip()
+    return Disclaimer(title, text)
+
+def parse_and_generate_pdf(html_content, engine=None, recorder=None, budget=None):
+    budget = budget or Budget()
+    report = extract_report(html_content, engine, recorder, budget=budget)
+    return render_report(report, recorder=recorder, budget=budget)
+
+# A small report touching every renderer path: rendering it once loads fpdf and bs4,
+# the core font metrics and the layout cache before the first real request.
+WARMUP_HTML = ('<html><body><div class="date">Warm-up</div>'
+               '<div class="alert-box"><h3>EXTREME CAUTION</h3><p>Warm-up alert.</p></div>'
+               '<div class="setup-card"><span class="ticker">WARM</span><span class="company-name">Warm-up</span>'
+               '<div class="trade-params"><div class="param-box"><div class="param-label">Entry</div>'
+               '<div class="param-value">1.00</div></div></div>'
+               '<div class="technical-details"><p>Warm-up paragraph.</p></div>'
+               '<div class="rationale">Rationale: warm-up.</div></div>'
+               '<div class="disclaimer"><h3>Disclaimer</h3>Warm-up.</div></body></html>')
+
+def warm_up():
+    return render_pdf_bytes(WARMUP_HTML)
+
+def decode_html(bytes_data):
+    try: return bytes_data.decode("utf-8")
+    except UnicodeDecodeError: return bytes_data.decode("latin-1", errors="ignore")
+
+# Pass a Budget to learn afterwards whether the PDF was cut short (budget.exceeded).
+def render_pdf_bytes(html_content, engine=None, recorder=None, budget=None):
+    with profiled('render'):
+        return pdf_bytes(parse_and_generate_pdf(html_content, engine, recorder, budget), recorder)
+
+def pdf_bytes(pdf, recorder=None):
+    rec = recorder or NULL_RECORDER
+    with rec.stage('output'):
+        data = bytes(pdf.output())
+        rec.count('bytes', len(data))
+        if recorder:
+            stats = pdf.stream_stats()
+            for key in ('ops_in', 'ops_removed', 'content_bytes', 'stream_bytes'):
+                if key in stats: rec.count(key, stats[key])
+    return data
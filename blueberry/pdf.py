@@ -0,0 +1,451 @@
+import math
+
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+
+from .fonts import register_fonts
+from .fragments import default_fragment_cache
+from .gstate import StateFilter
+from .layout import default_layout_cache
+from .shaping import has_rtl, visual_order
+from .text import clean_text, clean_unicode
+
+# --- 2. PDF ENGINE ---
+HEADER_TITLE = clean_text('BlueberryAI - EGX30 Market Intelligence')
+HEADER_TAGLINE = clean_text('AI-Generated Technical Analysis | For Informational Purposes Only')
+FOOTER_TEMPLATE = clean_text('BlueBerry AI Trader | Page {}')
+
+# Texts longer than this are wrapped in pieces of about this size, cut at whitespace.
+LONG_TEXT = 8000
+
+def piece_end(text, start, size=LONG_TEXT):
+    end = start + size
+    if end >= len(text): return len(text)
+    cut = max(text.rfind(' ', start, end), text.rfind('\n', start, end))
+    return cut + 1 if cut > start else end
+
+class PDF(FPDF):
+    def __init__(self, subtitle_text="", layout_cache=None, dedupe_state=False, fonts=None, fragments=None):
+        self.gstate = StateFilter() if dedupe_state else None
+        self.fragment_recording = None
+        super().__init__()
+        self.subtitle_text = subtitle_text
+        self.layout = layout_cache or default_layout_cache()
+        self.budget = None  # a budget.Budget, checked while wrapping very long texts
+        self.outline_level = None  # outline level for section headers; None: no outline
+        self.content_top = 0
+        # With a Unicode font set (see fonts.py) every 'Arial' below draws in it instead,
+        # and text keeps the characters the core fonts would have dropped.
+        self.font_set = fonts or None
+        self.unicode_family = None
+        if self.font_set:
+            register_fonts(self, self.font_set)
+            self.unicode_family = self.font_set.family
+        # chr(149) is the bullet in the core fonts' encoding, not in Unicode.
+        font = self.fonts.get(self.unicode_family) if self.unicode_family else None
+        self.bullet = '\u2022' if font is not None and 0x2022 in font.cmap else chr(149) if font is None else '-'
+        # Unchanged cards are replayed from a fragments.FragmentCache (None: the shared
+        # one when $BLUEBERRY_FRAGMENTS=1, False: off); core fonts only, see fragments.py.
+        if fragments is None: fragments = default_fragment_cache()
+        self.fragments = fragments if fragments and not self.font_set else None
+
+    def clean(self, text):
+        return clean_unicode(text) if self.unicode_family else clean_text(text)
+
+    # Every operator fpdf writes to a page goes through here; see gstate.StateFilter.
+    def _out(self, s):
+        if self.fragment_recording is not None: s = self.fragment_recording.take(s)
+        if self.gstate is None or not self.page or self.buffer:
+            return super()._out(s)
+        s = self.gstate.filter(self.page, s.decode('latin1') if isinstance(s, bytes) else str(s))
+        if s: super()._out(s)
+
+    # fpdf maps Arial to Helvetica itself, but warns (walking the stack) on every call;
+    # resolving the alias here gives the same font without that cost per element.
+    def set_font(self, family=None, style="", size=0):
+        if self.unicode_family and family and family.lower() in ('arial', 'helvetica'):
+            family = self.unicode_family
+        elif family and isinstance(style, str):
+            alias = self.font_aliases.get(family.lower())
+            if alias and family.lower() + ''.join(sorted(style.upper())).replace('U', '').replace('S', '') not in self.fonts:
+                family = alias
+        super().set_font(family, style, size)
+
+    # Lines are wrapped in logical order; right-to-left runs are put in visual order
+    # only as each line is drawn.
+    def cell(self, w=None, h=None, text="", *args, **kwargs):
+        if self.unicode_family and text and has_rtl(text): text = visual_order(text)
+        return super().cell(w, h, text, *args, **kwargs)
+
+    # Operator counts and sizes for the finished document (call after output()).
+    def stream_stats(self):
+        stats = self.gstate.stats() if self.gstate else {}
+        stats['stream_bytes'] = sum(p.contents.length if hasattr(p.contents, 'length') else len(p.contents)
+                                    for p in self.pages.values())
+        return stats
+
+    def header(self):
+        self.set_fill_color(30, 60, 114)
+        self.rect(0, 0, 210, 45, 'F')
+        self.set_font('Arial', 'B', 22)
+        self.set_text_color(255, 255, 255)
+        self.set_xy(10, 10)
+        self.cell(0, 10, HEADER_TITLE, 0, 1, 'C')
+        
+        self.set_font('Arial', '', 10)
+        self.set_xy(10, 22)
+        self.cell(0, 5, HEADER_TAGLINE, 0, 1, 'C')
+        
+        self.set_font('Arial', '', 9)
+        self.set_text_color(200, 200, 200)
+        self.cell(0, 8, self.clean(self.subtitle_text), 0, 1, 'C')
+        self.ln(15)
+        self.content_top = self.get_y()
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.set_text_color(128, 128, 128)
+        self.cell(0, 10, FOOTER_TEMPLATE.format(self.page_no()), 0, 0, 'C')
+
+    # --- measured text: wrap once through the layout cache, then draw those lines ---
+    def split_lines(self, w, text):
+        if self.budget is None or len(text) <= LONG_TEXT: return self.layout.split_lines(self, w, text)
+        # Wrapping costs tens of microseconds per character, so a text of a few hundred
+        # thousand characters is wrapped a piece at a time and stops with the budget.
+        # Line breaking is greedy: every line of a piece but the last is final, and the
+        # last is wrapped again at the head of the next piece, so the lines are the same
+        # as for the whole text.
+        lines = []
+        start = 0
+        while self.budget.ok():
+            end = piece_end(text, start)
+            piece_lines = self.layout.split_lines(self, w, text[start:end])
+            last = piece_lines[-1]
+            # Where the last line starts; it ends the piece, give or take whitespace.
+            at = text.rfind(last, start, end) if last else -1
+            if end == len(text) or at <= start:
+                if end < len(text): piece_lines = self.layout.split_lines(self, w, text[start:])
+                lines.extend(piece_lines)
+                break
+            lines.extend(piece_lines[:-1])
+            start = at
+        return tuple(lines)
+
+    def string_width(self, text):
+        return self.layout.string_width(self, text)
+
+    # Same placement as multi_cell(w, h, ...): every line but the last returns to the
+    # block's left edge, the last leaves x at its right edge on the next line.
+    def draw_lines(self, lines, w, h, align='L'):
+        if not lines: lines = ('',)
+        last = len(lines) - 1
+        for i, line in enumerate(lines):
+            self.cell(w, h, line, align=align,
+                      new_x=XPos.RIGHT if i == last else XPos.LEFT, new_y=YPos.NEXT)
+
+    def text_block(self, w, h, text, align='L'):
+        self.draw_lines(self.split_lines(w, text), w, h, align)
+
+    # A span that must not straddle the page break moves to the next page, unless it is
+    # already at the top of one (then it is taller than a page and has to flow).
+    def check_page_break(self, height_needed):
+        if self.get_y() + height_needed > self.page_break_trigger and self.get_y() > self.content_top:
+            self.add_page()
+
+    def reset_state(self):
+        self.set_left_margin(10)
+        self.set_right_margin(10)
+        self.set_x(10)
+        self.set_text_color(0, 0, 0)
+        self.set_font('Arial', '', 9)
+
+    def section_header(self, title, new_page=False):
+        self.reset_state()
+        if new_page:
+            self.add_page()
+        if self.outline_level is not None: self.start_section(title, level=self.outline_level)
+            
+        self.ln(5)
+        self.set_font('Arial', 'B', 14)
+        self.set_text_color(44, 62, 80)
+        self.set_fill_color(240, 240, 240)
+        self.cell(0, 10, f"  {self.clean(title)}", 0, 1, 'L', fill=True)
+        self.ln(3)
+
+    def alert_box(self, title, text):
+        self.reset_state()
+        self.set_font('Arial', '', 10)
+        lines = self.split_lines(180, self.clean(text))
+        h_needed = (len(lines) * 5) + 20 
+        self.check_page_break(h_needed)
+        
+        start_y = self.get_y()
+        self.set_fill_color(255, 235, 238)
+        self.set_draw_color(231, 76, 60)
+        self.set_line_width(0.5)
+        self.rect(10, start_y, 190, h_needed, 'DF')
+        
+        self.set_xy(15, start_y + 5)
+        self.set_font('Arial', 'B', 12)
+        self.set_text_color(192, 57, 43)
+        self.cell(0, 5, self.clean(title), 0, 1)
+        
+        self.set_xy(15, start_y + 12)
+        self.set_font('Arial', '', 10)
+        self.set_text_color(60, 0, 0)
+        self.draw_lines(lines, 180, 5, 'L')
+        self.set_y(start_y + h_needed + 5)
+        self.set_line_width(0.2)
+
+    def draw_parameter_grid(self, params):
+        if not params: return
+        self.ln(2)
+        col_count = 3
+        col_width = 63  
+        row_height = 16 
+        
+        total_items = len(params)
+        rows_needed = math.ceil(total_items / col_count)
+        total_height = (rows_needed * row_height) + 5
+        self.check_page_break(total_height)
+        
+        start_x = 10
+        start_y = self.get_y()
+        items = list(params.items())
+        
+        for i, (key, val) in enumerate(items):
+            col_idx = i % col_count
+            row_idx = i // col_count
+            curr_x = start_x + (col_idx * col_width)
+            curr_y = start_y + (row_idx * row_height)
+            
+            self.set_xy(curr_x, curr_y)
+            self.set_fill_color(250, 250, 250)
+            self.set_draw_color(220, 220, 220)
+            self.set_line_width(0.1)
+            self.rect(curr_x, curr_y, col_width, row_height, 'DF')
+            
+            self.set_xy(curr_x, curr_y + 3)
+            self.set_font('Arial', '', 8)
+            self.set_text_color(100, 100, 100)
+            original_l_margin = self.l_margin
+            self.set_left_margin(curr_x)
+            self.cell(col_width, 4, self.clean(key), 0, 1, 'C')
+            
+            self.set_xy(curr_x, curr_y + 8)
+            self.set_font('Arial', 'B', 10)
+            self.set_text_color(44, 62, 80)
+            
+            val_text = self.clean(str(val))
+            if self.string_width(val_text) > (col_width - 4):
+                self.set_font('Arial', 'B', 9) 
+                self.text_block(col_width, 4, val_text, 'C')
+            else:
+                self.cell(col_width, 5, val_text, 0, 1, 'C')
+                
+            self.set_left_margin(original_l_margin)
+
+        self.set_y(start_y + (rows_needed * row_height) + 5)
+        self.set_x(10)
+
+    def table_row(self, texts, widths, fills, aligns):
+        line_height = 5
+        font_size = 9
+        self.set_font('Arial', '', font_size)
+        
+        cell_lines = []
+        cell_heights = []
+        for i, text in enumerate(texts):
+            w = widths[i]
+            lines = self.split_lines(w - 2, text)
+            h = max(len(lines) * line_height, 8) 
+            cell_lines.append(lines)
+            cell_heights.append(h)
+            
+        row_height = max(cell_heights)
+        self.check_page_break(row_height)
+        
+        y_start = self.get_y()
+        x_start = 10 
+        original_l_margin = self.l_margin
+        
+        for i in range(len(texts)):
+            w = widths[i]
+            self.set_xy(x_start, y_start)
+            if fills[i]:
+                self.set_fill_color(250, 250, 250)
+                self.rect(x_start, y_start, w, row_height, 'FD')
+            else:
+                self.rect(x_start, y_start, w, row_height, 'D')
+                
+            self.set_left_margin(x_start) 
+            self.set_xy(x_start, y_start + 1.5)
+            self.draw_lines(cell_lines[i], w, line_height, aligns[i])
+            x_start += w
+            
+        self.set_left_margin(original_l_margin)
+        self.set_x(10)
+        self.set_y(y_start + row_height)
+
+    # Cards are looked up by their cleaned content (plus what picks the confidence
+    # colour) and replayed when they were drawn before; returns the seconds a replay
+    # saved, or None when the card was drawn.
+    def content_card(self, ticker, name, setup_type, details, table_data, rationale, confidence, mode='buy'):
+        draw = lambda: self.draw_card(ticker, name, setup_type, details, table_data, rationale, confidence, mode)
+        if self.fragments is None: return draw()
+        clean = self.clean
+        tone = confidence and ("HIGH" in confidence.upper(), "MEDIUM" in confidence.upper())
+        key = (mode, clean(ticker), clean(name), clean(setup_type), tuple(clean(line) for line in details),
+               tuple((clean(k), clean(str(v))) for k, v in table_data.items()) if table_data else (),
+               clean(rationale) if rationale else None, clean(confidence) if confidence else None, tone)
+        return self.fragments.draw(self, key, draw)
+
+    def draw_card(self, ticker, name, setup_type, details, table_data, rationale, confidence, mode='buy'):
+        self.reset_state()
+        
+        if mode == 'sell':
+            head_fill, badge_fill = (231, 76, 60), (192, 57, 43)
+        elif mode == 'open':
+            head_fill, badge_fill = (46, 204, 113), (39, 174, 96)
+        elif mode == 'watch':
+            head_fill, badge_fill = (243, 156, 18), (211, 84, 0)
+        else:
+            head_fill, badge_fill = (52, 152, 219), (41, 128, 185)
+
+        self.set_fill_color(*head_fill)
+        self.set_text_color(255, 255, 255)
+        self.set_font('Arial', 'B', 12)
+        self.cell(25, 8, f" {self.clean(ticker)}", 0, 0, 'L', fill=True)
+        
+        self.set_text_color(80, 80, 80)
+        self.set_font('Arial', '', 10)
+        self.cell(100, 8, f"  {self.clean(name)}", 0, 0, 'L')
+        
+        self.set_fill_color(*badge_fill)
+        self.set_text_color(255, 255, 255)
+        self.set_font('Arial', 'B', 8)
+        self.cell(65, 8, self.clean(setup_type), 0, 1, 'C', fill=True)
+        self.ln(2)
+
+        self.set_text_color(0, 0, 0)
+        self.set_font('Arial', '', 9)
+        self.reset_state()
+        for line in details:
+            self.text_block(190, 5, self.clean(line), 'L')
+            self.ln(1)
+
+        if table_data:
+            self.draw_parameter_grid(table_data)
+
+        if rationale:
+            self.reset_state()
+            self.set_fill_color(245, 248, 250)
+            self.set_font('Arial', 'I', 9)
+            
+            lines = self.split_lines(186, f"Rationale: {self.clean(rationale)}")
+            h_needed = (len(lines) * 5) + 4
+            
+            self.rect(10, self.get_y(), 190, h_needed, 'F')
+            self.set_xy(12, self.get_y()+2)
+            self.draw_lines(lines, 186, 5, 'L')
+            self.set_y(self.get_y() + 2)
+        
+        if confidence:
+            self.ln(2)
+            self.set_font('Arial', 'B', 9)
+            if "HIGH" in confidence.upper(): self.set_text_color(39, 174, 96)
+            elif "MEDIUM" in confidence.upper(): self.set_text_color(243, 156, 18)
+            else: self.set_text_color(192, 57, 43)
+            self.cell(0, 5, self.clean(confidence), 0, 1, 'R')
+        
+        self.ln(5)
+        self.line(10, self.get_y(), 200, self.get_y())
+        self.ln(5)
+
+    def disclaimer_box(self, title, text):
+        self.reset_state()
+        self.ln(5)
+        self.set_fill_color(255, 250, 240)
+        self.set_draw_color(243, 156, 18)
+        self.set_line_width(0.5)
+        
+        self.set_font('Arial', '', 8)
+        lines = self.split_lines(180, self.clean(text))
+        h_needed = (len(lines) * 4) + 15
+        
+        start_y = self.get_y()
+        self.rect(10, start_y, 190, h_needed, 'DF')
+        self.set_xy(15, start_y + 4)
+        self.set_font('Arial', 'B', 10)
+        self.set_text_color(160, 100, 0)
+        self.cell(0, 5, self.clean(title), 0, 1)
+        
+        self.set_xy(15, start_y + 10)
+        self.set_font('Arial', '', 8)
+        self.draw_lines(lines, 180, 4, 'L')
+        self.ln(5)
+
+    def toc_box(self, entries):
+        self.section_header("Contents", new_page=False)
+        self.reset_state()
+        for title, page in entries:
+            self.set_x(10)
+            self.cell(170, 6, f"  {self.clean(title)}", 0, 0, 'L')
+            self.cell(20, 6, str(page), 0, 1, 'R')
+        self.ln(3)
+
+    # --- measurement: each block's vertical advance as (height, kind) atoms, matching
+    # the drawing methods above step for step. 'cell' atoms are cell() rows and break
+    # like fpdf's auto page break; 'keep' atoms are spans guarded by check_page_break;
+    # 'gap' atoms are ln()/set_y() moves that never break. Nothing is drawn.
+    def measure_lines(self, w, h, text):
+        return [(h, 'cell')] * max(len(self.split_lines(w, text)), 1)
+
+    def measure_section_header(self):
+        return [(5, 'gap'), (10, 'cell'), (3, 'gap')]
+
+    def measure_alert(self, title, text):
+        self.set_font('Arial', '', 10)
+        h_needed = len(self.split_lines(180, self.clean(text))) * 5 + 20
+        return [(h_needed, 'keep'), (5, 'gap')]
+
+    def measure_parameter_grid(self, params):
+        if not params: return []
+        return [(2, 'gap'), (math.ceil(len(params) / 3) * 16 + 5, 'keep')]
+
+    def measure_table_row(self, texts, widths):
+        self.set_font('Arial', '', 9)
+        heights = [max(len(self.split_lines(w - 2, text)) * 5, 8) for text, w in zip(texts, widths)]
+        return [(max(heights), 'keep')]
+
+    def measure_card(self, details, table_data, rationale, confidence):
+        if self.fragments is None: return self.measure_card_atoms(details, table_data, rationale, confidence)
+        clean = self.clean
+        key = (tuple(clean(line) for line in details), len(table_data) if table_data else 0,
+               clean(rationale) if rationale else None, bool(confidence))
+        return self.fragments.atoms(key, lambda: self.measure_card_atoms(details, table_data, rationale, confidence))
+
+    def measure_card_atoms(self, details, table_data, rationale, confidence):
+        atoms = [(8, 'cell'), (2, 'gap')]
+        self.set_font('Arial', '', 9)
+        for line in details:
+            atoms += self.measure_lines(190, 5, self.clean(line))
+            atoms.append((1, 'gap'))
+        atoms += self.measure_parameter_grid(table_data)
+        if rationale:
+            self.set_font('Arial', 'I', 9)
+            atoms.append((2, 'gap'))
+            atoms += self.measure_lines(186, 5, f"Rationale: {self.clean(rationale)}")
+            atoms.append((2, 'gap'))
+        if confidence:
+            atoms += [(2, 'gap'), (5, 'cell')]
+        atoms += [(5, 'gap'), (5, 'gap')]
+        return atoms
+
+    def measure_disclaimer(self, title, text):
+        self.set_font('Arial', '', 8)
+        return [(5, 'gap'), (len(self.split_lines(180, self.clean(text))) * 4 + 15, 'keep')]
+
+    def measure_toc(self, count):
+        return self.measure_section_header() + [(6, 'cell')] * count + [(3, 'gap')]
@@ -0,0 +1,194 @@
+from .instrument import NULL_RECORDER
+from .pagination import Block, measure_cards, paginate, scratch_pdf
+from .fonts import default_font_set
+from .pdf import PDF
+
+# --- RENDERER ---
+CARD_GROUPS = [
+    ('open', "Open Positions Management"),
+    ('buy', "Top Buy Opportunities"),
+    ('sell', "Reduce/Exit Recommendations"),
+]
+
+RENDER_STAGES = ('alert', 'toc', 'index', 'assessment', 'cards', 'watchlist', 'notes', 'disclaimer')
+
+# Two passes: build and measure every block (on a scratch PDF, so nothing is drawn),
+# paginate, then draw. Blocks that fit on a page are never split, section headers stay
+# with what follows them, and a table of contents gets exact page numbers.
+# fonts: a fonts.FontSet, False for the core fonts, or None for $BLUEBERRY_FONT_DIR.
+# fragments: a fragments.FragmentCache, False to draw every card, or None for the
+# shared one (only with $BLUEBERRY_FRAGMENTS=1).
+# budget: a budget.Budget checked between sections and blocks; when it runs out (or
+# the report itself was cut short) the PDF ends with a notice after the last block.
+def render_report(report, layout_cache=None, recorder=None, toc=False, measure_workers=None, dedupe_state=False,
+                  fonts=None, budget=None, fragments=None):
+    rec = recorder or NULL_RECORDER
+    with rec.stage('subtitle'):
+        if fonts is None: fonts = default_font_set()
+        pdf = PDF(report.subtitle, layout_cache=layout_cache, dedupe_state=dedupe_state, fonts=fonts,
+                  fragments=fragments)
+        pdf.budget = budget
+        if recorder: recorder.pdf = pdf
+        pdf.set_auto_page_break(auto=True, margin=15)
+        pdf.add_page()
+
+    draw_report(pdf, report, rec, toc, measure_workers, budget)
+    return pdf
+
+# Lays out and draws one report from the current position of `pdf`; returns the blocks
+# that were drawn, each with the page it was planned on.
+def draw_report(pdf, report, rec=NULL_RECORDER, toc=False, measure_workers=None, budget=None):
+    with rec.stage('layout'):
+        blocks = build_blocks(pdf, report, toc, measure_workers, budget)
+        rec.count('blocks', len(blocks))
+        paginate(blocks, pdf.content_top, pdf.page_break_trigger, pdf.page_no(), pdf.get_y())
+
+    drawn, stopped = [], False
+    for stage in RENDER_STAGES:
+        with rec.stage(stage):
+            for block in blocks:
+                if block.stage != stage: continue
+                if budget and not budget.ok():
+                    stopped = True
+                    break
+                if block.break_before: pdf.add_page()
+                # The plan is only trusted if drawing lands where it said.
+                if pdf.page_no() != block.page - block.new_page: rec.count('plan_misses')
+                saved = block.draw()
+                drawn.append(block)
+                if block.count: rec.count(block.count)
+                if block.card and pdf.fragments is not None:
+                    rec.count('fragments_drawn' if saved is None else 'fragments_reused')
+                    if saved is not None: rec.count('fragment_saved_ms', round(saved * 1000, 3))
+        if stopped: break
+
+    reason = (budget.exceeded if budget else None) or report.truncated
+    if reason:
+        rec.count('truncated')
+        pdf.alert_box("REPORT TRUNCATED", f"This PDF is incomplete: {reason}. "
+                                          "The rest of the report was not rendered.")
+    return drawn
+
+def build_blocks(pdf, report, toc=False, measure_workers=None, budget=None):
+    m = scratch_pdf(pdf.layout, pdf.font_set, pdf.fragments or False)
+    m.budget = budget
+    go = lambda: budget is None or budget.ok()  # Sections past the budget are left out
+    blocks = []
+    if report.alert:
+        a = report.alert
+        blocks.append(Block('alert', m.measure_alert(a.title, a.text), lambda: pdf.alert_box(a.title, a.text)))
+    toc_at = len(blocks)
+    if report.index is not None and go():
+        blocks += index_blocks(pdf, m, report.index)
+    if report.assessment is not None and go():
+        blocks += assessment_blocks(pdf, m, report.assessment)
+    if go():
+        blocks += card_blocks(pdf, m, report.cards, measure_workers)
+    if report.watchlist is not None and go():
+        blocks += watchlist_blocks(pdf, m, report.watchlist, measure_workers)
+    if report.notes and go():
+        blocks += note_blocks(pdf, m, report.notes)
+    if report.disclaimer and go():
+        d = report.disclaimer
+        blocks.append(Block('disclaimer', m.measure_disclaimer(d.title, d.text),
+                            lambda: pdf.disclaimer_box(d.title, d.text)))
+
+    # The contents block only needs the number of entries to be measured; the entries
+    # themselves are read from the paginated blocks when it is drawn.
+    if toc:
+        titled = [b for b in blocks if b.title]
+        entries = lambda: [(b.title, b.page) for b in titled]
+        blocks.insert(toc_at, Block('toc', m.measure_toc(len(titled)), lambda: pdf.toc_box(entries())))
+    return blocks
+
+def header_block(pdf, m, stage, title, new_page, after=None):
+    def draw():
+        pdf.section_header(title, new_page=new_page)
+        if after: after()
+    return Block(stage, m.measure_section_header(), draw, new_page=new_page, keep_with_next=True, title=title)
+
+def index_blocks(pdf, m, metrics):
+    def style():
+        pdf.set_font('Arial', '', 9)
+        pdf.set_fill_color(250, 250, 250)
+    blocks = [header_block(pdf, m, 'index', "Index Technical Status", False, style)]
+
+    # Two metrics per table row: label | value | label | value
+    for i in range(0, len(metrics), 2):
+        pair = metrics[i:i+2]
+        texts, widths, fills, aligns = [], [], [], []
+        for metric in pair:
+            texts.extend([pdf.clean(metric.label), pdf.clean(metric.value)])
+            widths.extend([35, 60])
+            fills.extend([True, False])
+            aligns.extend(['L', 'L'])
+        blocks.append(Block('index', m.measure_table_row(texts, widths),
+                            lambda t=texts, w=widths, f=fills, a=aligns: pdf.table_row(t, w, f, a)))
+    return blocks
+
+def assessment_blocks(pdf, m, items):
+    blocks = [header_block(pdf, m, 'assessment', "Market Trend Assessment", False,
+                           pdf.reset_state if items else None)]
+    for item in items:
+        text = pdf.clean(item.text)
+        if item.kind == 'heading':
+            blocks.append(Block('assessment', [(3, 'gap'), (6, 'cell')],
+                                lambda t=text: draw_assessment_heading(pdf, t), keep_with_next=True))
+        else:
+            m.set_font('Arial', '', 9)
+            blocks.append(Block('assessment', m.measure_lines(190, 5, text) + [(2, 'gap')],
+                                lambda t=text: draw_assessment_text(pdf, t)))
+    return blocks
+
+def draw_assessment_heading(pdf, text):
+    pdf.set_x(10)
+    pdf.ln(3)
+    pdf.set_font('Arial', 'B', 10)
+    pdf.set_text_color(44, 62, 80)
+    pdf.cell(0, 6, text, 0, 1)
+
+def draw_assessment_text(pdf, text):
+    pdf.set_x(10)
+    pdf.set_font('Arial', '', 9)
+    pdf.set_text_color(0, 0, 0)
+    pdf.text_block(190, 5, text, 'L')
+    pdf.ln(2)
+
+def card_block(pdf, stage, atoms, c, setup, rationale, confidence, mode):
+    block = Block(stage, atoms, lambda: pdf.content_card(c.ticker, c.name, setup, c.details, c.params,
+                                                         rationale, confidence, mode=mode))
+    block.count = 'cards'
+    block.card = (c, mode)
+    return block
+
+def card_blocks(pdf, m, cards, measure_workers=None):
+    blocks = []
+    for mode, title in CARD_GROUPS:
+        group = [c for c in cards if c.mode == mode]
+        if not group: continue
+        blocks.append(header_block(pdf, m, 'cards', title, True))
+        for c, atoms in zip(group, measure_cards(m, group, measure_workers)):
+            blocks.append(card_block(pdf, 'cards', atoms, c, c.setup, c.rationale, c.confidence, mode))
+    return blocks
+
+def watchlist_blocks(pdf, m, items, measure_workers=None):
+    blocks = [header_block(pdf, m, 'watchlist', "Watchlist - Additional Opportunities", True, pdf.reset_state)]
+    for item, atoms in zip(items, measure_cards(m, items, measure_workers)):
+        blocks.append(card_block(pdf, 'watchlist', atoms, item, "Watchlist", "", "", 'watch'))
+    return blocks
+
+def note_blocks(pdf, m, notes):
+    blocks = [header_block(pdf, m, 'notes', "Technical Market Notes", True, pdf.reset_state)]
+    m.set_font('Arial', '', 9)
+    for note in notes:
+        text = pdf.clean(note)
+        block = Block('notes', m.measure_lines(185, 5, text) + [(2, 'gap')], lambda t=text: draw_note(pdf, t))
+        block.count = 'notes'
+        blocks.append(block)
+    return blocks
+
+def draw_note(pdf, text):
+    pdf.set_x(10)
+    pdf.cell(5, 5, pdf.bullet, 0, 0)
+    pdf.text_block(185, 5, text, 'L')
+    pdf.ln(2)
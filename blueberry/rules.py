@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+
+# --- EXTRACTION RULES ---
+# The keyword heuristics of the card parser (which "key: value" lines are trade
+# parameters, which setups and which wrapper ids mean a sell or open position, which
+# containers hold the watchlist) live in rules.json, or in the file named by
+# BLUEBERRY_RULES. Each group of word lists is compiled once into a single regex that
+# reports, in one match call, every category with a word somewhere in the text: one
+# optional lookahead per category, each capturing its first hit.
+RULES_ENV = 'BLUEBERRY_RULES'
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.json')
+
+# Returns the regex and the (group, category) pairs it reports; categories without
+# words get no group.
+def compile_categories(categories):
+    parts, groups = [], []
+    for i, (name, words) in enumerate(categories):
+        words = sorted({w.lower() for w in words if w}, key=len, reverse=True)
+        if not words: continue
+        parts.append(f"(?=(?:.*?(?P<c{i}>{'|'.join(map(re.escape, words))}))?)")
+        groups.append((f'c{i}', name))
+    return (re.compile(''.join(parts), re.S) if parts else None), groups
+
+class Matcher:
+    def __init__(self, categories):
+        self._regex, self._groups = compile_categories(categories)
+        self.categories = lru_cache(maxsize=4096)(self._categories)
+
+    # Names of the categories with a word in `text`, in rule order.
+    def _categories(self, text):
+        if self._regex is None or not text: return ()
+        m = self._regex.match(text.lower())
+        if not m.lastindex: return ()
+        return tuple(name for group, name in self._groups if m.group(group) is not None)
+
+    def first(self, text):
+        found = self.categories(text)
+        return found[0] if found else None
+
+class Rules:
+    def __init__(self, data, source='<dict>'):
+        try:
+            lines = data['param_lines']
+            self.param_line_max = int(lines['max_length'])
+            self.watch_param_max = int(data['watchlist_param_max_length'])
+            self.default_mode = data['default_mode']
+            self.ancestor_depth = int(data['ancestor_depth'])
+            self.param_keys = Matcher([('param', lines['keys']), ('setup', lines['setup_keys'])])
+            self.setup_modes = Matcher([(r['mode'], r['words']) for r in data['setup_modes']])
+            watch = data['watch_ancestors']
+            # Ids and classes are matched separately; a mode rule may list either.
+            self.ancestor_ids = Matcher([('watch', watch.get('id', ()))] +
+                                        [(r['mode'], r.get('id', ())) for r in data['ancestor_modes']])
+            self.ancestor_classes = Matcher([('watch', watch.get('class', ()))] +
+                                            [(r['mode'], r.get('class', ())) for r in data['ancestor_modes']])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid extraction rules in {source}: {type(e).__name__}: {e}") from e
+        self.fingerprint = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:16]
+
+    def setup_mode(self, setup):
+        return self.setup_modes.first(setup) or self.default_mode
+
+    # A card's own mode and whether it sits in the watchlist, from the ids and classes
+    # of its nearest ancestors; memoized per document in an AncestorModes.
+    def ancestors(self):
+        return AncestorModes(self)
+
+class AncestorModes:
+    def __init__(self, rules):
+        self.rules = rules
+        self._own = {}
+        self._walks = {}
+
+    # (watch, mode) from this node's own id/class; mode is the first matching rule.
+    def own(self, node):
+        key = id(node)
+        hit = self._own.get(key)
+        if hit is None:
+            r = self.rules
+            found = r.ancestor_ids.categories(str(node.get('id', '')))
+            classes = r.ancestor_classes.categories(str(node.get('class', '')))
+            mode = next((c for c in found + classes if c != 'watch'), None)
+            hit = self._own[key] = ('watch' in found or 'watch' in classes, mode)
+        return hit
+
+    # Walk `depth` ancestors from `parent` outward: any watch marker counts, and the
+    # farthest ancestor with a mode decides it. Cards share containers, so each walk
+    # is done once per container.
+    def walk(self, parent):
+        key = id(parent)
+        hit = self._walks.get(key)
+        if hit is None:
+            watch, mode = False, None
+            curr = parent
+            for _ in range(self.rules.ancestor_depth):
+                if not curr: break
+                w, m = self.own(curr)
+                watch = watch or w
+                if m: mode = m
+                curr = curr.parent
+            hit = self._walks[key] = (watch, mode)
+        return hit
+
+_loaded = {}
+
+def load_rules(path=None):
+    path = os.path.abspath(path or os.environ.get(RULES_ENV) or DEFAULT_RULES_PATH)
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+    rules = _loaded.get(key)
+    if rules is None:
+        with open(path, encoding='utf-8') as f: data = json.load(f)
+        rules = _loaded[key] = Rules(data, path)
+    return rules
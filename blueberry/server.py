@@ -0,0 +1,314 @@
+import json
+import multiprocessing
+import os
+import signal
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .budget import Budget, BudgetExceeded, Limits
+from .cache import PDFCache, cache_hasher, cache_key
+from .parser import warm_up
+from .stream import CHUNK_BYTES, render_pdf_stream, render_pdf_upload, stream_threshold
+
+# --- LOCAL RENDER SERVICE ---
+# POST /render with an HTML body returns the PDF. Renders run on a pool of worker
+# processes that are started and warmed before the socket opens. At most
+# `workers + queue_size` requests are admitted at once; the rest get 429 straight
+# away instead of piling up. Standard library only, so it runs fully offline.
+MAX_BODY_BYTES = 20 * 1024 * 1024
+LATENCY_WINDOW = 4096
+
+class RenderTimeout(Exception):
+    pass
+
+def _on_alarm(signum, frame):
+    raise RenderTimeout("render exceeded its time limit")
+
+# Worker initializer: install the timeout handler and render a small report once so
+# imports, font metrics and the layout cache are hot before the first real request.
+def _init_worker():
+    signal.signal(signal.SIGALRM, _on_alarm)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    warm_up()
+
+def _ping():
+    return os.getpid()
+
+# Runs in a worker's main thread, so SIGALRM interrupts a runaway render and frees the
+# worker for the next request instead of leaving it stuck. The document's time budget
+# is capped at the timeout, so a slow report normally comes back as a partial PDF
+# well before the alarm; the alarm is the backstop for work between checkpoints.
+# Returns (pdf_bytes, why it was truncated or None).
+def render_in_worker(bytes_data, timeout):
+    return _render_with_alarm(timeout, lambda budget: render_pdf_upload(bytes_data, budget=budget))
+
+# Large bodies arrive as a spooled file and are parsed from it in chunks.
+def render_file_in_worker(path, timeout):
+    def render(budget):
+        with open(path, 'rb') as f: return render_pdf_stream(f, budget=budget)
+    return _render_with_alarm(timeout, render)
+
+def _render_with_alarm(timeout, render):
+    budget = Budget(Limits.from_env().with_seconds(timeout))
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        pdf_bytes = render(budget)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    return pdf_bytes, budget.exceeded
+
+def percentile(sorted_values, q):
+    if not sorted_values: return None
+    k = max(0, min(len(sorted_values) - 1, round(q * len(sorted_values) + 0.5) - 1))
+    return sorted_values[k]
+
+class RenderService:
+    def __init__(self, workers=None, queue_size=16, timeout=30.0, cache=None, max_body=MAX_BODY_BYTES):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.queue_size = max(0, queue_size)
+        self.timeout = timeout
+        self.cache = cache
+        self.max_body = max_body
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._pool = None
+        self.inflight = 0
+        self.counters = {'requests': 0, 'ok': 0, 'cached': 0, 'rejected': 0, 'timeouts': 0,
+                         'truncated': 0, 'over_limit': 0, 'errors': 0, 'restarts': 0, 'bytes_in': 0, 'bytes_out': 0}
+        self.started = None
+
+    def _new_pool(self):
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                   mp_context=multiprocessing.get_context('spawn'))
+        # One task per worker at once makes the executor start every process now.
+        pids = {f.result() for f in [pool.submit(_ping) for _ in range(self.workers * 2)]}
+        return pool, pids
+
+    def start(self):
+        self._pool, pids = self._new_pool()
+        self.started = time.time()
+        return pids
+
+    # A worker that dies breaks the whole executor: every later submit would fail. The
+    # first request to see it swaps in a freshly warmed pool; the others find it done.
+    def _restart(self, broken):
+        with self._pool_lock:
+            if self._pool is not broken: return
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._pool, _ = self._new_pool()
+        self._count(restarts=1)
+
+    def close(self):
+        if self._pool: self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _count(self, **changes):
+        with self._lock:
+            for key, n in changes.items(): self.counters[key] += n
+
+    # Returns (status, content_type, body, extra_headers).
+    def render(self, bytes_data):
+        self._count(requests=1, bytes_in=len(bytes_data))
+        start = time.perf_counter()
+        key = cache_key(bytes_data) if self.cache else None
+        hit = self._cached(start, key)
+        if hit: return hit
+        if not self._admit(): return self._reject()
+        return self._run(start, key, render_in_worker, bytes_data)
+
+    # Bodies from the streaming threshold up never sit in memory whole: they are
+    # written to a temporary file (and hashed for the cache) as they arrive, and the
+    # worker parses the file in chunks. The slot is taken before the body is read, so a
+    # full queue answers 429 without first spooling up to max_body bytes to disk.
+    def render_stream(self, rfile, length):
+        self._count(requests=1, bytes_in=length)
+        start = time.perf_counter()
+        if not self._admit(): return self._reject()
+        fd, path = tempfile.mkstemp(suffix='.html')
+        cleanup = lambda: os.remove(path)
+        try:
+            h = cache_hasher()
+            with os.fdopen(fd, 'wb') as f:
+                remaining = length
+                while remaining:
+                    chunk = rfile.read(min(CHUNK_BYTES, remaining))
+                    if not chunk: break
+                    h.update(chunk)
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            key = h.hexdigest() if self.cache else None
+            hit = self._cached(start, key)
+        except BaseException:
+            self._release(cleanup)
+            raise
+        if hit:
+            self._release(cleanup)
+            return hit
+        return self._run(start, key, render_file_in_worker, path, cleanup)
+
+    def _cached(self, start, key):
+        pdf_bytes = self.cache.get(key) if self.cache else None
+        if pdf_bytes is None: return None
+        self._done(start, cached=1, ok=1, bytes_out=len(pdf_bytes))
+        return 200, 'application/pdf', pdf_bytes, {'X-Cache': 'hit'}
+
+    def _reject(self):
+        self._count(rejected=1)
+        return error(429, "render queue is full", {'Retry-After': '1'})
+
+    # At most `workers + queue_size` requests hold a slot at once.
+    def _admit(self):
+        if not self._slots.acquire(blocking=False): return False
+        with self._lock: self.inflight += 1
+        return True
+
+    # Gives back the slot taken for a request (and removes its spooled body).
+    def _release(self, cleanup=None):
+        with self._lock: self.inflight -= 1
+        self._slots.release()
+        if cleanup: cleanup()
+
+    # Called with a slot held. The slot stays taken until the worker is really done with
+    # the request: a render that timed out here may still be running in its worker
+    # (cancel() cannot stop it), and freeing the slot early would admit more work than
+    # the pool can take.
+    def _run(self, start, key, task, arg, cleanup=None):
+        pool = self._pool
+        try:
+            fut = pool.submit(task, arg, self.timeout)
+        except BrokenProcessPool:
+            self._release(cleanup)
+            self._restart(pool)
+            self._done(start, errors=1)
+            return error(503, "worker pool is unavailable")
+        except BaseException:
+            self._release(cleanup)
+            raise
+        fut.add_done_callback(lambda _: self._release(cleanup))
+        try:
+            # Queue wait counts against the client too; the worker's own alarm
+            # covers the render itself, this covers everything around it.
+            pdf_bytes, truncated = fut.result(timeout=self.timeout * 2 + 5)
+        except BudgetExceeded as e:
+            self._done(start, over_limit=1)
+            return error(413 if e.limit == 'input' else 422, str(e))
+        except (RenderTimeout, FutureTimeout):
+            fut.cancel()
+            self._done(start, timeouts=1)
+            return error(504, f"render timed out after {self.timeout:g}s")
+        except BrokenProcessPool:
+            self._restart(pool)
+            self._done(start, errors=1)
+            return error(503, "worker pool is unavailable")
+        except Exception as e:
+            self._done(start, errors=1)
+            return error(422, f"{type(e).__name__}: {e}")
+
+        if truncated:
+            # Partial PDFs are answered but never cached; the header says why.
+            self._done(start, ok=1, truncated=1, bytes_out=len(pdf_bytes))
+            return 200, 'application/pdf', pdf_bytes, {'X-Cache': 'miss', 'X-Truncated': truncated}
+        if self.cache: self.cache.put(key, pdf_bytes)
+        self._done(start, ok=1, bytes_out=len(pdf_bytes))
+        return 200, 'application/pdf', pdf_bytes, {'X-Cache': 'miss'}
+
+    def _done(self, start, **changes):
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            if changes.get('ok'): self._latencies.append(elapsed)
+            for key, n in changes.items(): self.counters[key] += n
+
+    def metrics(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            inflight = self.inflight
+            counters = dict(self.counters)
+        ms = lambda v: round(v * 1000, 2) if v is not None else None
+        return dict(counters, **{
+            'workers': self.workers,
+            'queue_capacity': self.queue_size,
+            'inflight': inflight,
+            'queue_depth': max(0, inflight - self.workers),
+            'uptime_s': round(time.time() - self.started, 1) if self.started else 0,
+            'latency_ms': {
+                'window': len(latencies),
+                'p50': ms(percentile(latencies, 0.50)),
+                'p90': ms(percentile(latencies, 0.90)),
+                'p99': ms(percentile(latencies, 0.99)),
+                'max': ms(latencies[-1] if latencies else None),
+            },
+            'cache': self.cache.stats() if self.cache else None,
+        })
+
+def error(status, message, headers=None):
+    return status, 'application/json', json.dumps({'error': message}).encode('utf-8'), headers or {}
+
+class RenderHandler(BaseHTTPRequestHandler):
+    server_version = 'BlueberryRender/1'
+    service = None
+
+    def _send(self, status, content_type, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in (headers or {}).items(): self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            self._send(200, 'application/json', json.dumps(self.service.metrics(), indent=2).encode('utf-8'))
+        elif self.path == '/healthz':
+            self._send(200, 'text/plain', b'ok')
+        else:
+            self._send(*error(404, "not found"))
+
+    def do_POST(self):
+        if self.path.split('?', 1)[0] != '/render':
+            return self._send(*error(404, "not found"))
+        length = self.headers.get('Content-Length')
+        if length is None or not length.isdigit():
+            return self._send(*error(411, "Content-Length required"))
+        if int(length) > self.service.max_body:
+            self.close_connection = True
+            return self._send(*error(413, f"body exceeds {self.service.max_body} bytes"))
+        if int(length) >= stream_threshold():
+            res = self.service.render_stream(self.rfile, int(length))
+            # Turned away before the body was read; what is left of it cannot be parsed
+            # as the next request.
+            if res[0] == 429: self.close_connection = True
+            return self._send(*res)
+        self._send(*self.service.render(self.rfile.read(int(length))))
+
+    def log_message(self, format, *args):
+        if not self.server.quiet: super().log_message(format, *args)
+
+def make_server(service, host='127.0.0.1', port=8765, quiet=False):
+    handler = type('BoundRenderHandler', (RenderHandler,), {'service': service})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    httpd.quiet = quiet
+    return httpd
+
+def serve(host='127.0.0.1', port=8765, workers=None, queue_size=16, timeout=30.0, cache_dir=None, quiet=False):
+    cache = PDFCache(disk_dir=cache_dir) if cache_dir else PDFCache()
+    service = RenderService(workers, queue_size, timeout, cache)
+    print(f"Starting {service.workers} render worker(s)...", flush=True)
+    service.start()
+    httpd = make_server(service, host, port, quiet)
+    print(f"Serving on http://{host}:{httpd.server_address[1]}  (POST /render, GET /metrics)"
+          f"  queue {service.queue_size}, timeout {timeout:g}s", flush=True)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.close()
+    return 0
@@ -0,0 +1,118 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# --- RIGHT-TO-LEFT TEXT ---
+# Without a shaping engine, fpdf draws every character with its nominal glyph, left to
+# right. Arabic needs two things on top: each letter in the form that matches its
+# neighbours (isolated, initial, medial, final, plus the lam-alef ligatures), and the
+# right-to-left runs of a line drawn in visual order. Forms come from the Unicode
+# presentation-form blocks, which fonts with Arabic coverage carry; the table is built
+# from unicodedata names, so no extra dependency is needed. Reordering uses fpdf's own
+# implementation of the bidi algorithm.
+#
+# Shaping happens when text is cleaned (before it is measured, since forms differ in
+# width); reordering happens per drawn line, after wrapping in logical order.
+
+RTL_CHARS = re.compile('[\u0590-\u08ff\ufb1d-\ufdff\ufe70-\ufefc]')
+_ARABIC = re.compile('[\u0600-\u06ff]')
+_FORMS = ('ISOLATED', 'FINAL', 'INITIAL', 'MEDIAL')
+TATWEEL = '\u0640'
+ZWJ = '\u200d'
+
+def _build_tables():
+    forms, ligatures = {}, {}
+    # Forms-B (the basic alphabet) first, so its forms win over the extended block.
+    for cp in list(range(0xFE70, 0xFEFD)) + list(range(0xFB50, 0xFE00)):
+        name = unicodedata.name(chr(cp), '')
+        for form in _FORMS:
+            suffix = f' {form} FORM'
+            if not name.endswith(suffix): continue
+            base = name[:-len(suffix)]
+            if base.startswith('ARABIC LETTER '):
+                try: letter = unicodedata.lookup(base)
+                except KeyError: break
+                forms.setdefault(letter, {}).setdefault(form, chr(cp))
+            elif base.startswith('ARABIC LIGATURE LAM WITH '):
+                # Only lam-alef is mandatory; lam with alef maksura is an optional one.
+                rest = base[len('ARABIC LIGATURE LAM WITH '):]
+                if rest != 'ALEF' and not rest.startswith('ALEF WITH '): break
+                try: alef = unicodedata.lookup('ARABIC LETTER ' + rest)
+                except KeyError: break
+                ligatures.setdefault(alef, {}).setdefault(form, chr(cp))
+            break
+    return forms, ligatures
+
+FORMS, LAM_ALEF = _build_tables()
+LAM = '\u0644'
+
+# Dual-joining letters have initial and medial forms; the rest only join to the right.
+def joins_forward(ch):
+    if ch in (TATWEEL, ZWJ): return True
+    f = FORMS.get(ch)
+    return bool(f) and 'INITIAL' in f
+
+def joins_back(ch):
+    return ch in (TATWEEL, ZWJ) or ch in FORMS
+
+def is_transparent(ch):
+    return unicodedata.category(ch) == 'Mn'
+
+def _neighbour(text, i, step):
+    i += step
+    while 0 <= i < len(text) and is_transparent(text[i]): i += step
+    return text[i] if 0 <= i < len(text) else ''
+
+def _shape(text):
+    out = []
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        if ch not in FORMS:
+            out.append(ch)
+            i += 1
+            continue
+        prev = _neighbour(text, i, -1)
+        back = bool(prev) and joins_forward(prev)
+        if ch == LAM:
+            j = i + 1
+            while j < n and is_transparent(text[j]): j += 1
+            lig = LAM_ALEF.get(text[j]) if j < n else None
+            if lig:
+                # Marks on the lam stay with the ligature.
+                out.append(lig.get('FINAL' if back else 'ISOLATED') or lig.get('ISOLATED'))
+                out.extend(text[i + 1:j])
+                i = j + 1
+                continue
+        nxt = _neighbour(text, i, 1)
+        forward = joins_forward(ch) and bool(nxt) and joins_back(nxt)
+        form = ('MEDIAL' if back else 'INITIAL') if forward else ('FINAL' if back else 'ISOLATED')
+        f = FORMS[ch]
+        out.append(f.get(form) or f.get('ISOLATED') or ch)
+        i += 1
+    return ''.join(out)
+
+@lru_cache(maxsize=4096)
+def shape_arabic(text):
+    if not _ARABIC.search(text): return text
+    return _shape(text)
+
+# Mirrored in right-to-left runs; fpdf's reordering leaves that step to the shaper.
+MIRRORED = dict(zip('()[]{}<>\u00ab\u00bb', ')(][}{><\u00bb\u00ab'))
+
+# Visual order of one drawn line. The line's direction follows its first strong
+# character, as in the bidi algorithm; leading and trailing spaces stay where they are,
+# since the cells use them as padding in a left-to-right page.
+@lru_cache(maxsize=4096)
+def visual_order(line):
+    if not RTL_CHARS.search(line): return line
+    from fpdf.bidi import BidiParagraph
+    core = line.strip(' ')
+    start = line.index(core[0])
+    chars = BidiParagraph(core).get_reordered_characters()
+    body = ''.join(MIRRORED.get(c.character, c.character) if c.embedding_level % 2 else c.character
+                   for c in chars)
+    return line[:start] + body + line[start + len(core):]
+
+def has_rtl(text):
+    return RTL_CHARS.search(text) is not None
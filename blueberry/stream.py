@@ -0,0 +1,347 @@
+import codecs
+import io
+import os
+
+from bs4 import Tag
+
+from .budget import EXTRACT_SHARE, Budget, BudgetExceeded
+from .engines import resolve_engine
+from .index import DocumentIndex
+from .instrument import NULL_RECORDER, profiled
+from .parser import (ANCHORS, decode_html, extract_card, extract_document, extract_report, find_alert_tag,
+                     find_assessment_content, find_disclaimer, find_index_card, find_notes_container,
+                     find_subtitle, find_watchlist_container, pdf_bytes, render_pdf_bytes)
+from .render import render_report
+from .rules import load_rules
+from .text import safe_get_text
+
+# --- STREAMING EXTRACTION ---
+# Very large uploads are read in chunks, decoded incrementally and fed to lxml, whose
+# parser events drive the same BeautifulSoup tree builder make_soup uses. Events
+# inside an outermost card go to a small soup of their own instead (opened with shells
+# carrying the ids and classes of the card's ancestors, so the rules see the same
+# ancestry); when the card closes it is extracted there and only a tiny placeholder,
+# one per run of consecutive cards, goes into the main tree. What is left -- the skeleton: headers, alert, index,
+# assessment, watchlist, notes, disclaimer and the placeholders -- goes through the
+# normal extraction, and the streamed cards are put back where their placeholders
+# were. Peak memory follows the largest section instead of the whole document.
+#
+# A card is replayed into the main tree instead when another section may look into
+# it: watchlist cards, the card after the Index heading, cards holding an anchor, a
+# section heading or a section class/id, cards inside headings, and the div right
+# after the Market Trend or Notes heading. If a section still ends up reading a
+# container that had cards streamed out of it, or the encoding guess turns out wrong
+# mid-stream, the document is read again the normal way, so the result is always
+# what extract_report would give. The streamed read is recorded as its own 'stream'
+# stage, so a fallback does not add a second 'parse' to the stage totals.
+CHUNK_BYTES = 64 * 1024
+# Inputs from this size up are streamed; below it one whole soup is quicker.
+STREAM_ENV = 'BLUEBERRY_STREAM_MB'
+DEFAULT_STREAM_MB = 2.0
+CARD_CLASSES = ['setup-card', 'card']
+INDEX_CLASSES = ['index-card', 'card']
+SECTION_HEADINGS = ('Index', 'Market Trend', 'Watchlist', 'Notes')
+SIBLING_HEADINGS = ('Market Trend', 'Notes')
+SECTION_CLASSES = ['date', 'header', 'alert-box', 'index-card', 'watchlist', 'disclaimer', 'market-assessment']
+SECTION_IDS = ('tab-watchlist', 'watch')
+HEADINGS = ('h2', 'h3')
+STREAMED = 'data-bb-streamed'  # on every ancestor of a streamed card
+PLACEHOLDER = '\ue000bbcard:'  # a placeholder's ticker; starts with a private-use character
+
+def stream_threshold():
+    return float(os.environ.get(STREAM_ENV) or DEFAULT_STREAM_MB) * 1024 * 1024
+
+class _Fallback(Exception):
+    pass
+
+# UTF-8 until the first undecodable byte; from there, as in decode_html, the document
+# is latin-1. That can only be switched mid-stream while everything so far was ASCII.
+class _Decoder:
+    def __init__(self):
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.latin = False
+        self.ascii = True
+
+    def decode(self, data, final=False):
+        if self.latin: return data.decode('latin-1', errors='ignore')
+        pending = self._utf8.getstate()[0]
+        try:
+            text = self._utf8.decode(data, final)
+        except UnicodeDecodeError:
+            if not self.ascii: raise _Fallback()
+            self.latin = True
+            return (pending + data).decode('latin-1', errors='ignore')
+        self.ascii = self.ascii and text.isascii()
+        return text
+
+def _has_class(attrs, classes):
+    return any(c in classes for c in attrs.get('class', '').split())
+
+def _empty_soup():
+    from bs4 import BeautifulSoup
+    return _reset(BeautifulSoup('', 'lxml'))
+
+# BeautifulSoup lets go of its builder once its own parse is done; initialize_soup
+# hands the builder back, as BeautifulSoup does at the start of a parse.
+def _reset(soup):
+    soup.reset()
+    soup.builder.initialize_soup(soup)
+    return soup
+
+# The lxml parser target: events go to the main soup's tree builder, or while inside
+# an outermost card, to the card's own soup and a list kept for replaying them.
+class _CardStream:
+    def __init__(self, rules, budget):
+        self.rules = rules
+        self.budget = budget
+        self.soup = _empty_soup()
+        self.clusters = []  # extracted cards, one list per placeholder
+        self.cut = False  # ran out of time: the skeleton ends where reading stopped
+        self.tags = 0
+        self.found_headings = set()
+        self.await_index = False
+        self.events = None  # the open card's events
+        self.card_soup = None
+        self.depth = 0
+        self.keep_card = False
+        self.last = None  # placeholder that is the last thing in the main tree, if any
+        self.held = []  # whitespace after it, dropped if the next card joins it
+
+    def run(self, fileobj, chunk_bytes):
+        from lxml import etree
+        parser = etree.HTMLParser(target=self, recover=True)
+        decoder = _Decoder()
+        size = estimate = 0
+        limits = self.budget.limits
+        first = True
+        try:
+            while not self.cut:
+                data = fileobj.read(chunk_bytes)
+                text = decoder.decode(data, final=not data)
+                if first and text:
+                    if text[0] == '\ufeff': text = text[1:]  # as BeautifulSoup does
+                    first = False
+                size += len(data)  # bytes, like Budget.check_input
+                estimate += text.count('<') - text.count('</')
+                if size / (1024 * 1024) > limits.max_input_mb:
+                    raise BudgetExceeded('input', f"input is over the {limits.max_input_mb:g} MB limit")
+                if estimate > limits.max_nodes * 2:
+                    raise BudgetExceeded('nodes', f"input has over {estimate} tags, over the {limits.max_nodes} limit")
+                if text: parser.feed(text)
+                self.budget.check_nodes(self.tags)
+                if not data: break
+            parser.close()
+        except (LookupError, etree.ParserError):
+            raise _Fallback()
+        self.flush()
+        soup = self.soup
+        soup.endData()
+        while soup.currentTag is not None and soup.currentTag.name != soup.ROOT_TAG_NAME: soup.popTag()
+        return soup
+
+    # --- target interface ---
+    def start(self, name, attrs, nsmap={}):
+        self.tags += 1
+        attrs = dict(attrs)
+        if self.events is not None:
+            self.depth += 1
+            if self.await_index and _has_class(attrs, INDEX_CLASSES): self.keep_card, self.await_index = True, False
+            self.record('start', (name, attrs, nsmap))
+        elif not self.cut and _has_class(attrs, CARD_CLASSES):
+            self.open_card(name, attrs, nsmap)
+        else:
+            self.forward('start', (name, attrs, nsmap))
+
+    def end(self, name):
+        if self.events is None: return self.forward('end', (name,))
+        self.depth -= 1
+        self.record('end', (name,))
+        if self.depth == 0: self.close_card()
+
+    def data(self, data):
+        if self.events is None and self.last is not None and not data.strip(): self.held.append(data)
+        else: self.dispatch('data', (data,))
+
+    def comment(self, text):
+        self.dispatch('comment', (text,))
+
+    def pi(self, target, data):
+        self.dispatch('pi', (target, data))
+
+    def doctype(self, name, pubid, system):
+        self.dispatch('doctype', (name, pubid, system))
+
+    def close(self):
+        self.soup.builder.close()
+
+    # --- routing ---
+    def dispatch(self, method, args):
+        if self.events is None: self.forward(method, args)
+        else: self.record(method, args)
+
+    def record(self, method, args):
+        self.events.append((method, args))
+        getattr(self.card_soup.builder, method)(*args)
+
+    def forward(self, method, args):
+        self.flush()
+        self.last = None
+        builder = self.soup.builder
+        if method == 'end':
+            tag = self.soup.currentTag
+            builder.end(*args)
+            if tag.name in HEADINGS: self.heading_end(tag)
+            return
+        if method == 'start' and self.await_index and _has_class(args[1], INDEX_CLASSES): self.await_index = False
+        getattr(builder, method)(*args)
+
+    def flush(self):
+        for data in self.held: self.soup.builder.data(data)
+        self.held = []
+
+    # Sections look up the first heading with a given text, so only the first counts.
+    def heading_end(self, tag):
+        text = safe_get_text(tag)
+        for key in SECTION_HEADINGS:
+            if key not in text or key in self.found_headings: continue
+            self.found_headings.add(key)
+            if tag.find_parent(HEADINGS): raise _Fallback()
+            if key == 'Index':
+                # The index card is the first card-like element after the heading,
+                # which may sit inside it (kept there, as cards inside headings are).
+                self.await_index = tag.find(class_=INDEX_CLASSES) is None
+
+    def open_card(self, name, attrs, nsmap):
+        parent = self.soup.currentTag
+        self.keep_card = self.await_index or any(t.name in HEADINGS for t in self.soup.tagStack)
+        self.await_index = False
+        if name == 'div' and not self.keep_card:
+            for sib in reversed(parent.contents):
+                if not isinstance(sib, Tag): continue
+                if sib.name == 'div': break
+                if sib.name in HEADINGS and any(key in safe_get_text(sib) for key in SIBLING_HEADINGS):
+                    self.keep_card = True
+        self.events, self.depth = [], 1
+        if self.card_soup is None: self.card_soup = _empty_soup()
+        shells = self.soup.tagStack[:0:-1][:self.rules.ancestor_depth]
+        for tag in reversed(shells):
+            shell = {key: ' '.join(tag[key]) if key == 'class' else tag[key]
+                     for key in ('id', 'class') if tag.has_attr(key)}
+            self.card_soup.builder.start('div', shell, {})
+        self.record('start', (name, attrs, nsmap))
+
+    def close_card(self):
+        events, card_soup = self.events, self.card_soup
+        self.events = None
+        card_soup.endData()
+        cards = None if self.keep_card else self.extract(card_soup)
+        _reset(card_soup)  # one card soup serves every card in turn
+        if cards is None:
+            for method, args in events: self.forward(method, args)
+            return
+        # Cards that follow each other share a placeholder; what separated them was
+        # only whitespace, in a container no section reads from (see section_tags).
+        if self.last is not None:
+            self.held = []
+            self.clusters[self.last].extend(cards)
+            if not self.budget.ok(EXTRACT_SHARE): self.cut = True
+            return
+        # Same name and class as the card, so lookups by class match it as before.
+        name, attrs, nsmap = events[0][1]
+        builder = self.soup.builder
+        builder.start(name, {'class': attrs['class']}, nsmap)
+        builder.start('h3', {}, nsmap)
+        builder.data(f"{PLACEHOLDER}{len(self.clusters)}")
+        builder.end('h3')
+        builder.end(name)
+        self.last = len(self.clusters)
+        self.clusters.append(cards)
+        for tag in reversed(self.soup.tagStack[1:]):
+            if tag.has_attr(STREAMED): break
+            tag[STREAMED] = ''
+        if not self.budget.ok(EXTRACT_SHARE): self.cut = True
+
+    # The card's cards, or None when it has to stay in the main tree.
+    def extract(self, card_soup):
+        idx = DocumentIndex(card_soup, ANCHORS)
+        if idx.anchors or any(idx.heading(key) for key in SECTION_HEADINGS): return None
+        if idx.find(class_=SECTION_CLASSES) or any(idx.find_id(key) for key in SECTION_IDS): return None
+        ancestors = self.rules.ancestors()
+        found = idx.find_all(class_=CARD_CLASSES)
+        if ancestors.walk(found[0].parent)[0]: return None
+        cards = []
+        for card in found:
+            if ancestors.walk(card.parent)[0]: continue
+            extracted = extract_card(idx, card, self.rules, ancestors)
+            if extracted: cards.append(extracted)
+        return cards
+
+# Every tag a section reads from in the skeleton; none may have lost cards to the stream.
+def section_tags(idx):
+    tags = [find_subtitle(idx), find_alert_tag(idx), find_index_card(idx), find_watchlist_container(idx),
+            find_disclaimer(idx)]
+    head = idx.heading('Market Trend')
+    if head: tags.append(find_assessment_content(idx, head))
+    head = idx.heading('Notes')
+    if head: tags.append(find_notes_container(head))
+    return [t for t in tags if t is not None]
+
+def extract_report_stream(fileobj, engine=None, recorder=None, rules=None, budget=None, chunk_bytes=CHUNK_BYTES):
+    rec = recorder or NULL_RECORDER
+    rules = rules or load_rules()
+    budget = budget or Budget()
+    origin = fileobj.tell()
+    # Only lxml parses incrementally; html.parser reads the whole document.
+    if resolve_engine(engine) == 'lxml':
+        try:
+            return _extract_streaming(fileobj, rec, rules, budget, chunk_bytes)
+        except _Fallback:
+            pass
+    with rec.stage('read', 'extract'):
+        fileobj.seek(origin)
+        html_content = decode_html(fileobj.read())
+    return extract_report(html_content, engine, recorder, rules, budget)
+
+def _extract_streaming(fileobj, rec, rules, budget, chunk_bytes):
+    stream = _CardStream(rules, budget)
+    with rec.stage('stream', 'extract'):
+        soup = stream.run(fileobj, chunk_bytes)
+        idx = DocumentIndex(soup, ANCHORS)
+        rec.count('tags', stream.tags)
+        rec.count('streamed', len(stream.clusters))
+    if any(tag.has_attr(STREAMED) for tag in section_tags(idx)): raise _Fallback()
+
+    def expand(cards):
+        out = []
+        for card in cards:
+            if card.ticker.startswith(PLACEHOLDER): out.extend(stream.clusters[int(card.ticker[len(PLACEHOLDER):])])
+            else: out.append(card)
+        return out
+
+    # Cut short while reading: the skeleton is small, so it is extracted in full and
+    # the report is marked with the reason reading stopped.
+    report = extract_document(idx, rec, rules, None if stream.cut else budget, expand)
+    if stream.cut: report.truncated = report.truncated or budget.exceeded
+    return report
+
+# extract_report for a file on disk, streamed from the size threshold up; returns the
+# report and the file size.
+def extract_report_file(path, recorder=None, budget=None):
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= stream_threshold(): return extract_report_stream(f, recorder=recorder, budget=budget), size
+        return extract_report(decode_html(f.read()), recorder=recorder, budget=budget), size
+
+# render_pdf_bytes for a file object, with the streaming extraction.
+def render_pdf_stream(fileobj, engine=None, recorder=None, budget=None):
+    budget = budget or Budget()
+    with profiled('render'):
+        report = extract_report_stream(fileobj, engine, recorder, budget=budget)
+        return pdf_bytes(render_report(report, recorder=recorder, budget=budget), recorder)
+
+# Uploads that are already in memory: large ones are still streamed, which saves the
+# decoded copy and the full tree.
+def render_pdf_upload(bytes_data, recorder=None, budget=None):
+    if len(bytes_data) < stream_threshold():
+        return render_pdf_bytes(decode_html(bytes_data), recorder=recorder, budget=budget)
+    return render_pdf_stream(io.BytesIO(bytes_data), recorder=recorder, budget=budget)
@@ -0,0 +1,59 @@
+from functools import lru_cache
+
+from .shaping import shape_arabic
+
+# --- 1. CLEANING FUNCTIONS ---
+# Typographic characters the PDF core fonts lack, mapped in one str.translate pass.
+# \n, \t, \r and NBSP need no entry: str.split() already treats them as whitespace.
+_TRANSLATION = str.maketrans({
+    '\u2018': "'", '\u2019': "'", '\u201c': '"', '\u201d': '"',
+    '\u2013': '-', '\u2014': '-', '\u2026': '...',
+})
+
+# Short strings (headers, labels, tickers, parameter values) repeat across cards,
+# pages and reports; long paragraphs rarely do and would only bloat the memo.
+MEMO_MAX_LEN = 256
+_SENTINEL = '\0'
+
+def _clean(text):
+    text = ' '.join(text.translate(_TRANSLATION).split())
+    if text.isascii(): return text
+    return text.encode('latin-1', 'ignore').decode('latin-1')
+
+_clean_memo = lru_cache(maxsize=8192)(_clean)
+
+def clean_text(text):
+    if not text: return ""
+    if len(text) <= MEMO_MAX_LEN: return _clean_memo(text)
+    return _clean(text)
+
+# Batch form: one translate and one latin-1 round trip over all strings at once.
+# Whitespace is collapsed per string before non-latin-1 characters are dropped,
+# exactly as clean_text does.
+def clean_texts(texts):
+    texts = [t or "" for t in texts]
+    if not texts: return []
+    joined = _SENTINEL.join(texts)
+    if joined.count(_SENTINEL) != len(texts) - 1:
+        return [clean_text(t) for t in texts]
+    parts = joined.translate(_TRANSLATION).split(_SENTINEL)
+    joined = _SENTINEL.join(' '.join(p.split()) for p in parts)
+    if not joined.isascii():
+        joined = joined.encode('latin-1', 'ignore').decode('latin-1')
+    return joined.split(_SENTINEL)
+
+# For documents drawn in a Unicode font (see fonts.py): same whitespace and typographic
+# substitutions, but nothing is dropped, and Arabic letters take their joined forms.
+def _clean_unicode(text):
+    return shape_arabic(' '.join(text.translate(_TRANSLATION).split()))
+
+_clean_unicode_memo = lru_cache(maxsize=8192)(_clean_unicode)
+
+def clean_unicode(text):
+    if not text: return ""
+    if len(text) <= MEMO_MAX_LEN: return _clean_unicode_memo(text)
+    return _clean_unicode(text)
+
+def safe_get_text(element):
+    if not element: return ""
+    return element.get_text(" ", strip=True)
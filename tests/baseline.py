@@ -0,0 +1,186 @@
+import re
+
+from bs4 import NavigableString
+
+from blueberry.engines import make_soup
+from blueberry.text import safe_get_text
+
+# --- BASELINE EXTRACTION ---
+# The extraction the original app.py did inline while drawing, kept here as the
+# reference the rewritten parser is checked against: plain soup.find / find_all
+# queries, keywords hard-coded, cards as the old 't'/'n'/'tb' dicts. Only the drawing
+# is gone. Each section comes back in the shape of Report.to_dict().
+
+CARD_FIELDS = {'t': 'ticker', 'n': 'name', 's': 'setup', 'd': 'details', 'tb': 'params', 'r': 'rationale',
+               'c': 'confidence', 'm': 'mode'}
+
+def heading(soup, text):
+    return soup.find(lambda t: t.name in ['h2', 'h3'] and text in safe_get_text(t))
+
+def legacy_subtitle(soup):
+    date_div = soup.find('div', class_='date')
+    if date_div: return safe_get_text(date_div)
+    header_p = soup.find('div', class_='header')
+    return safe_get_text(header_p.find('p')) if (header_p and header_p.find('p')) else "Market Report"
+
+def legacy_alert(soup):
+    alert_tag = soup.find(class_='alert-box')
+    if not alert_tag:
+        alert_text = soup.find(string=re.compile("EXTREME CAUTION"))
+        if alert_text and isinstance(alert_text, NavigableString):
+            parent = alert_text.parent
+            alert_tag = parent.parent if parent.name in ['b', 'strong', 'h3', 'h4', 'span'] else parent
+    if not alert_tag or isinstance(alert_tag, NavigableString): return None
+    head = alert_tag.find(['h3', 'h4', 'strong'])
+    title = safe_get_text(head) if head else "MARKET ALERT"
+    text = safe_get_text(alert_tag.find('p')) or safe_get_text(alert_tag)
+    return {'title': title, 'text': text.replace(title, "").strip()}
+
+def legacy_index_card(soup):
+    idx_header = heading(soup, 'Index')
+    idx_anchor = soup.find(string=re.compile(r"(Current Level|Level:)"))
+    if idx_header: return idx_header.find_next(class_=['index-card', 'card'])
+    if idx_anchor: return idx_anchor.find_parent(class_=['index-card', 'card'])
+    return None
+
+def legacy_index(idx_card):
+    if not idx_card: return None
+    rows = idx_card.find_all(class_='metric-row') or idx_card.find_all(class_='metric')
+    metrics = []
+    for row in rows:
+        label, value = "", ""
+        if row.find(class_='metric-label'):
+            label = safe_get_text(row.find(class_='metric-label'))
+            value = safe_get_text(row.find(class_='metric-value'))
+        else:
+            spans = row.find_all('span')
+            if len(spans) > 0: label = safe_get_text(spans[0])
+            if len(spans) > 1: value = safe_get_text(spans[1])
+        metrics.append({'label': label, 'value': value})
+    return metrics
+
+def legacy_assessment(soup):
+    assess_header = heading(soup, 'Market Trend')
+    if not assess_header: return None
+    content = assess_header.find_next_sibling('div') or assess_header.parent.find(class_='market-assessment')
+    if not content: return []
+    return [{'kind': 'heading' if tag.name == 'h3' else 'text', 'text': safe_get_text(tag)}
+            for tag in content.find_all(['h3', 'p'])]
+
+def legacy_cards(soup, idx_card):
+    cards_data = []
+    for card in soup.find_all(class_=['setup-card', 'card']):
+        if card == idx_card: continue
+        is_watch = False
+        curr = card.parent
+        for _ in range(4):
+            if not curr: break
+            cid = str(curr.get('id', '')).lower()
+            cclass = str(curr.get('class', '')).lower()
+            if 'watch' in cid or 'watch' in cclass: is_watch = True
+            curr = curr.parent
+        if is_watch: continue
+
+        ticker_el = card.find(class_='ticker')
+        header_h3 = card.find('h3')
+        if ticker_el:
+            ticker = safe_get_text(ticker_el)
+            name = safe_get_text(card.find(class_='company-name'))
+        elif header_h3:
+            parts = safe_get_text(header_h3).split('-', 1)
+            ticker = parts[0].strip()
+            name = parts[1].strip() if len(parts) > 1 else ""
+        else:
+            continue
+
+        setup = safe_get_text(card.find(class_='setup-type')) or "Setup"
+        mode = 'buy'
+        if 'exit' in setup.lower() or 'reduce' in setup.lower() or 'distribution' in setup.lower(): mode = 'sell'
+        curr = card.parent
+        for _ in range(4):
+            if not curr: break
+            cid = str(curr.get('id', '')).lower()
+            if 'open' in cid or 'pos' in cid: mode = 'open'
+            elif 'reduce' in cid or 'sell' in cid: mode = 'sell'
+            curr = curr.parent
+
+        table = {}
+        if card.find(class_='trade-params'):
+            for b in card.find(class_='trade-params').find_all(class_='param-box'):
+                lbl = safe_get_text(b.find(class_='param-label'))
+                val = safe_get_text(b.find(class_='param-value'))
+                if lbl: table[lbl] = val
+        else:
+            for p in card.find_all('p'):
+                txt = safe_get_text(p)
+                if ':' in txt and len(txt) < 120:
+                    key, val = txt.split(':', 1)
+                    key = key.strip().lower()
+                    val = val.strip()
+                    if any(k in key for k in ['entry', 'target', 'stop', 'r:r', 'current', 'action', 'decision',
+                                              'gain', 'loss']):
+                        table[key.title()] = val
+                    elif 'setup' in key:
+                        setup = val
+
+        details = []
+        if card.find(class_='technical-details'):
+            details = [safe_get_text(p) for p in card.find(class_='technical-details').find_all('p')]
+        else:
+            for p in card.find_all('p'):
+                txt = safe_get_text(p)
+                if ':' not in txt or len(txt) > 120:
+                    details.append(txt)
+
+        rationale = safe_get_text(card.find(class_='rationale')).replace("Rationale:", "").strip()
+        conf = safe_get_text(card.find(class_='confidence'))
+        cards_data.append({'t': ticker, 'n': name, 's': setup, 'd': details, 'tb': table, 'r': rationale,
+                           'c': conf, 'm': mode})
+    return cards_data
+
+# Titles only: item boundaries are where the parser deliberately differs (it takes the
+# innermost titled div, the baseline the outermost, paragraphs of every item included).
+def legacy_watchlist_titles(soup):
+    wl_container = soup.find(id='tab-watchlist') or soup.find(class_='watchlist') or soup.find(id='watch')
+    if not wl_container:
+        wl_header = heading(soup, 'Watchlist')
+        if wl_header: wl_container = wl_header.find_parent('div')
+    if not wl_container: return None
+    titles, seen_titles = [], set()
+    for item in wl_container.find_all('div', recursive=True):
+        h = item.find(['h3', 'h4', 'strong'])
+        if not h: continue
+        title_text = safe_get_text(h)
+        if not title_text or len(title_text) < 3 or title_text in seen_titles: continue
+        if len(item.find_all('p')) > 0:
+            seen_titles.add(title_text)
+            titles.append(title_text)
+    return titles
+
+def legacy_notes(soup):
+    notes_head = heading(soup, 'Notes')
+    if not notes_head: return []
+    container = notes_head.find_next_sibling('div') or notes_head.parent
+    return [safe_get_text(li) for li in container.find_all('li')]
+
+def legacy_disclaimer(soup):
+    disc = soup.find(class_='disclaimer')
+    if not disc: return None
+    if isinstance(disc, NavigableString): disc = disc.parent
+    title_tag = disc.find(['h3', 'h4'])
+    title = safe_get_text(title_tag) if title_tag else "Important Disclaimer"
+    return {'title': title, 'text': safe_get_text(disc).replace(title, "").strip()}
+
+# Everything but the watchlist, as Report.to_dict() has it.
+def legacy_report(html_content, engine=None):
+    soup = make_soup(html_content, engine)
+    idx_card = legacy_index_card(soup)
+    return {
+        'subtitle': legacy_subtitle(soup),
+        'alert': legacy_alert(soup),
+        'index': legacy_index(idx_card),
+        'assessment': legacy_assessment(soup),
+        'cards': [{CARD_FIELDS[k]: v for k, v in card.items()} for card in legacy_cards(soup, idx_card)],
+        'notes': legacy_notes(soup),
+        'disclaimer': legacy_disclaimer(soup),
+    }
@@ -0,0 +1,20 @@
+import os
+
+from blueberry import batch
+from blueberry.batch import render_uploads
+
+# Stands in for render_upload: a file named crash*.html kills its worker outright.
+def crashing_task(name, bytes_data):
+    if name.startswith('crash'): os._exit(1)
+    return {'name': name, 'ok': True, 'error': None, 'cached': False, 'pdf': b'%PDF', 'truncated': None,
+            'in_bytes': len(bytes_data), 'out_bytes': 4, 'seconds': 0.0}
+
+def test_worker_crash_fails_only_its_file(monkeypatch):
+    monkeypatch.setattr(batch, 'worker_count', lambda n_files, workers=None: workers)  # a pool even on one CPU
+    files = [(f'r{i}.html', f'<p>{i}</p>'.encode()) for i in range(6)]
+    files.insert(2, ('crash.html', b'<p>crash</p>'))
+    results = {res['name']: res for res in render_uploads(files, workers=3, task=crashing_task)}
+    assert sorted(results) == sorted(name for name, _ in files)
+    assert not results['crash.html']['ok']
+    assert 'BrokenProcessPool' in results['crash.html']['error']
+    assert all(res['ok'] for name, res in results.items() if name != 'crash.html')
@@ -0,0 +1,62 @@
+import io
+
+import pytest
+
+from blueberry.budget import Budget, BudgetExceeded, Limits
+from blueberry.parser import extract_report
+
+KB = 1024 / (1024 * 1024)  # max_input_mb of one kilobyte
+
+def budget(kb=1):
+    return Budget(Limits(max_input_mb=kb * KB))
+
+def document(text):
+    return f"<html><body><p>{text}</p></body></html>"
+
+def utf8(html_content):
+    return len(html_content.encode('utf-8'))
+
+# The limit is in bytes: 400 Arabic letters are 400 characters but 800 bytes.
+@pytest.mark.parametrize('char, count', [('a', 900), ('a', 1000), ('\u0645', 400), ('\u0645', 500),
+                                         ('\u20ac', 300), ('\u20ac', 330), ('\U0001F4C8', 240),
+                                         ('\U0001F4C8', 250), ('caf\u00e9 ', 150)])
+def test_input_limit_counts_utf8_bytes(char, count):
+    html_content = document(char * count)
+    if utf8(html_content) > 1024:
+        with pytest.raises(BudgetExceeded) as e:
+            budget().check_input(html_content)
+        assert e.value.limit == 'input'
+        assert f"{utf8(html_content) / (1024 * 1024):.1f} MB" in str(e.value)
+    else:
+        budget().check_input(html_content)
+
+def test_limit_is_exact():
+    html_content = document('\u0645' * 100)
+    Budget(Limits(max_input_mb=utf8(html_content) / (1024 * 1024))).check_input(html_content)
+    with pytest.raises(BudgetExceeded):
+        Budget(Limits(max_input_mb=(utf8(html_content) - 1) / (1024 * 1024))).check_input(html_content)
+
+def test_lone_surrogates_are_counted():
+    budget().check_input(document('\ud800' * 300))
+    with pytest.raises(BudgetExceeded):
+        budget().check_input(document('\ud800' * 400))
+
+def test_extract_report_checks_bytes():
+    with pytest.raises(BudgetExceeded):
+        extract_report(document('\u0645' * 600), 'html.parser', budget=budget())
+
+# The streaming reader counts the bytes it reads, so both paths accept and reject the
+# same documents.
+@pytest.mark.parametrize('char, count', [('a', 900), ('\u0645', 400), ('\u0645', 600), ('a', 1100)])
+def test_stream_agrees_with_whole_document(char, count):
+    pytest.importorskip('lxml')
+    from blueberry.stream import extract_report_stream
+    html_content = document(char * count)
+    outcomes = []
+    for run in (lambda: extract_report(html_content, 'lxml', budget=budget()),
+                lambda: extract_report_stream(io.BytesIO(html_content.encode()), 'lxml', budget=budget(),
+                                              chunk_bytes=256)):
+        try: run()
+        except BudgetExceeded as e: outcomes.append(e.limit)
+        else: outcomes.append(None)
+    assert outcomes[0] == outcomes[1] == ('input' if utf8(html_content) > 1024 else None)
@@ -0,0 +1,86 @@
+import inspect
+
+import pytest
+
+from benchmarks.synthetic import generate_report
+from blueberry import engines
+from blueberry.engines import available_engines, make_soup, resolve_engine
+from blueberry.parser import extract_report
+
+pytest.importorskip('lxml')
+
+# Slips seen in LLM-written reports; every engine must read them the same way.
+MALFORMED = {
+    'div-in-p': '<div class="card"><h3>AAA - A Co</h3><p>Entry: 5<div>Target: 6</div></p></div>',
+    'unclosed-p': '<div class="card"><h3>AAA - A Co</h3><p>Entry: 5<p>Target: 6<p>Stop: 4</div>',
+    'table-in-p': '<div class="card"><h3>AAA - A Co</h3><p>Entry: 5<table><tr><td>Target: 6</td></tr></table></p></div>',
+    'heading-in-p': '<div class="card"><p><h3>AAA - A Co</h3>Entry: 5</p></div>',
+    'div-in-rationale-p': ('<div class="card"><h3>AAA - A Co</h3>'
+                           '<div class="rationale">Rationale: <p>a<div>b</div></p></div></div>'),
+    'unclosed-div': ('<div class="setup-card"><div class="card-header"><span class="ticker">AAA</span></div>'
+                     '<div class="trade-params"><div class="param-box"><div class="param-label">Entry</div>'
+                     '<div class="param-value">5</div></div></div><div class="rationale">Rationale: x'),
+    'unclosed-span': ('<div class="setup-card"><div class="card-header"><span class="ticker">AAA'
+                      '<span class="company-name">A Co</div><div class="trade-params"><div class="param-box">'
+                      '<div class="param-label">Entry</div><div class="param-value">5</div></div></div></div>'),
+    'stray-end-tags': '<div class="card"><h3>AAA - A Co</h3></span><p>Entry: 5</p></b><p>Target: 6</p></div></div>',
+    'unclosed-li': '<div class="card"><h3>AAA - A Co</h3><ul><li>Entry: 5<li>Target: 6</ul></div>',
+    'misnested-inline': '<div class="card"><h3>AAA - A Co</h3><p><b>Entry: <i>5</b></i></p><p>Target: 6</p></div>',
+    'unquoted-attribute': '<div class=card><h3>AAA - A Co</h3><p>Entry: 5</p></div>',
+    'unclosed-comment': '<div class="card"><h3>AAA - A Co</h3><p>Entry: 5</p><!-- x </div>',
+    'alert-without-end': '<div class="alert-box"><h3>CAUTION</h3><p>Thin</div><div class="card"><h3>AAA - A Co</h3></div>',
+}
+
+def document(body):
+    return f'<html><body><div id="new-setups">{body}</div></body></html>'
+
+def extracted(html_content):
+    return {engine: extract_report(html_content, engine).to_dict() for engine in available_engines()}
+
+@pytest.mark.parametrize('variant', ['mixed', 'setup', 'plain'])
+def test_engines_agree_on_synthetic_reports(variant):
+    results = extracted(generate_report(cards=24, watchlist=6, nesting=2, variant=variant))
+    assert results['lxml'] == results['html.parser']
+
+@pytest.mark.parametrize('name', sorted(MALFORMED))
+def test_engines_agree_on_malformed_markup(name):
+    results = extracted(document(MALFORMED[name]))
+    assert results['lxml'] == results['html.parser']
+
+def test_block_inside_paragraph_ends_it():
+    for engine in available_engines():
+        card = extract_report(document(MALFORMED['div-in-p']), engine).cards[0]
+        assert card.params == {'Entry': '5'}, engine
+
+# engines.html_parser_builder relies on bs4 internals; a bs4 release without them
+# must fail here rather than quietly parse differently.
+def test_html_parser_hook_is_in_place():
+    from bs4.builder import HTMLParserTreeBuilder
+    assert '_parser_class' in inspect.signature(HTMLParserTreeBuilder.feed).parameters, \
+        "bs4 no longer takes feed(_parser_class=...); see engines.html_parser_builder"
+    soup = make_soup('<p>a<div>b</div></p>', 'html.parser')
+    assert soup.div.parent.name != 'p'
+    assert soup.p.get_text() == 'a'
+
+# Documented in engines.py: lxml decodes a legacy entity missing its semicolon.
+def test_entity_without_semicolon_differs():
+    html_content = document('<div class="card"><h3>AAA - A Co</h3><p>Entry: 5&nbsp6</p></div>')
+    assert extract_report(html_content, 'lxml').cards[0].params == {'Entry': '5\xa06'}
+    assert extract_report(html_content, 'html.parser').cards[0].params == {'Entry': '5&nbsp6'}
+
+def test_auto_prefers_lxml(monkeypatch):
+    monkeypatch.delenv('BLUEBERRY_PARSER', raising=False)
+    assert resolve_engine('auto') == 'lxml'
+    assert make_soup('<p>x</p>').builder.NAME == 'lxml'
+
+def test_missing_engine_is_an_error(monkeypatch):
+    monkeypatch.setitem(engines.ENGINES, 'selectolax', 'no_such_module_for_blueberry')
+    with pytest.raises(ValueError, match='not installed'):
+        resolve_engine('selectolax')
+    monkeypatch.setenv('BLUEBERRY_PARSER', 'selectolax')
+    with pytest.raises(ValueError, match='not installed'):
+        resolve_engine()
+
+def test_unknown_engine_is_an_error():
+    with pytest.raises(ValueError, match='Unknown parser engine'):
+        resolve_engine('html5lib-fast')
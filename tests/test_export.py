@@ -0,0 +1,97 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from blueberry.export import SMALL_COLUMN, param_values, parse_numbers, parse_ratios, trades_frame
+
+NAN = math.nan
+
+# (text, low, high, is_percent)
+NUMBERS = [
+    ('12.5', 12.5, 12.5, False),
+    ('12.5-13.0', 12.5, 13.0, False),
+    ('12.5 - 13', 12.5, 13.0, False),
+    ('12.5 to 13', 12.5, 13.0, False),
+    ('12.5\u201313', 12.5, 13.0, False),
+    ('12.5 \u2014 13', 12.5, 13.0, False),
+    ('1,250.50', 1250.5, 1250.5, False),
+    ('1,250-1,300', 1250.0, 1300.0, False),
+    ('EGP 45.20', 45.2, 45.2, False),
+    ('5%', 5.0, 5.0, True),
+    ('-3%', -3.0, -3.0, True),
+    ('+8 %', 8.0, 8.0, True),
+    ('10-15%', 10.0, 15.0, True),
+    ('-2.5', -2.5, -2.5, False),
+    ('Stop -2.5 below', -2.5, -2.5, False),
+    ('T1 14.5', 14.5, 14.5, False),
+    ('T1', NAN, NAN, False),
+    ('', NAN, NAN, False),
+    (None, NAN, NAN, False),
+    ('n/a', NAN, NAN, False),
+]
+
+RATIOS = [('1:2.5', 2.5), ('1 : 3', 3.0), ('2:5', 2.5), ('0:3', NAN), ('2', 2.0), ('2.5x', 2.5),
+          ('', NAN), (None, NAN), ('wide', NAN)]
+
+def same(a, b):
+    return np.array_equal(np.asarray(a, dtype=float), np.asarray(b, dtype=float), equal_nan=True)
+
+# Short lists take the re path, Arrow arrays and long columns the compute kernels; all
+# three must give the same numbers.
+def inputs(values):
+    return {'small': list(values), 'arrow': pa.array(values, type=pa.string()),
+            'long': list(values) * (SMALL_COLUMN // len(values) + 1)}
+
+@pytest.mark.parametrize('path', ['small', 'arrow', 'long'])
+def test_parse_numbers(path):
+    values = inputs([t for t, _, _, _ in NUMBERS])[path]
+    lo, hi, pct = parse_numbers(values)
+    n = len(NUMBERS)
+    assert same(lo[:n], [x[1] for x in NUMBERS])
+    assert same(hi[:n], [x[2] for x in NUMBERS])
+    assert pct[:n].tolist() == [x[3] for x in NUMBERS]
+    assert len(lo) == len(values)
+
+@pytest.mark.parametrize('path', ['small', 'arrow', 'long'])
+def test_parse_ratios(path):
+    values = inputs([t for t, _ in RATIOS])[path]
+    assert same(parse_ratios(values)[:len(RATIOS)], [r for _, r in RATIOS])
+
+def test_empty_columns():
+    lo, hi, pct = parse_numbers([])
+    assert len(lo) == len(hi) == len(pct) == 0
+    assert len(parse_ratios([])) == 0
+
+@pytest.mark.parametrize('label', ['R:R', 'R/R', 'Risk/Reward', 'risk-reward', 'Risk Reward', 'Risk:Reward Ratio'])
+def test_ratio_labels_go_to_rr(label):
+    assert param_values({label: '1:2'}) == {'rr_raw': '1:2'}
+
+@pytest.mark.parametrize('label', ['Risk', 'Risk: 5%', 'Risk Amount', 'Reward', 'Position Risk'])
+def test_other_risk_labels_do_not(label):
+    assert param_values({label: '5%'}) == {}
+
+def test_param_labels():
+    params = {'Entry Zone': '10-11', 'Target 1': '12', 'Target 2': '13', 'Stop Loss': '9',
+              'Current Price': '10.5', 'Action': 'Buy'}
+    assert param_values(params) == {'entry_raw': '10-11', 'target_raw': '12', 'stop_raw': '9',
+                                    'current_raw': '10.5'}
+
+def row(mode, entry, target, stop, rr=None, subtitle='Sunday, 12 October 2026'):
+    return ('r.html', subtitle, 'card', 'TICK', '', mode, '', '', entry, target, stop, rr, None)
+
+def test_small_and_long_frames_agree():
+    rows = [row('buy', '10-12', '15%', '10', '1:2'), row('sell', '20', '18', '3%', '2.5'),
+            row('buy', '', 'T1 14', 'n/a', subtitle=''), row('open', '1,000', '1,100', '950')]
+    long = trades_frame(rows * (SMALL_COLUMN // len(rows) + 1))
+    pd.testing.assert_frame_equal(trades_frame(rows), long.iloc[:len(rows)])
+
+def test_frame_values():
+    df = trades_frame([row('buy', '10-12', '15%', '10', '1:2'), row('sell', '20', '18', '3%')])
+    assert df['entry'].tolist() == [11.0, 20.0]
+    assert df['target'].tolist() == pytest.approx([12.65, 18.0])
+    assert df['stop'].tolist() == pytest.approx([10.0, 20.6])
+    assert same(df['rr_stated'], [2.0, NAN])
+    assert df['report_date'].dt.strftime('%Y-%m-%d').tolist() == ['2026-10-12', '2026-10-12']
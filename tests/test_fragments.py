@@ -0,0 +1,60 @@
+import dataclasses
+import datetime
+
+import pytest
+
+from benchmarks.synthetic import generate_report
+from blueberry import fragments as fragments_mod
+from blueberry.fragments import FragmentCache, default_fragment_cache
+from blueberry.instrument import StageRecorder
+from blueberry.parser import extract_report
+from blueberry.render import render_report
+
+FIXED_DATE = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+def render(report, fragments, toc=False, recorder=None):
+    pdf = render_report(report, fragments=fragments, toc=toc, recorder=recorder)
+    pdf.set_creation_date(FIXED_DATE)
+    return bytes(pdf.output())
+
+# Replay leans on fpdf internals (see fragments.py), so these byte-for-byte
+# comparisons are what clears an fpdf2 release for BLUEBERRY_FRAGMENTS=1.
+
+# The next day's report: some cards revised, a new one up front (every later card
+# moves) and one dropped.
+def next_day(report):
+    cards = list(report.cards)
+    for i in range(0, len(cards), 4):
+        cards[i] = dataclasses.replace(cards[i], rationale=(cards[i].rationale or '') + ' Revised.')
+    cards.insert(0, dataclasses.replace(cards[-1], ticker='NEWCO'))
+    del cards[len(cards) // 2]
+    return dataclasses.replace(report, cards=cards)
+
+@pytest.mark.parametrize('toc', [False, True])
+@pytest.mark.parametrize('words', [0, 40])
+def test_replayed_cards_match_a_fresh_render(toc, words):
+    day1 = extract_report(generate_report(cards=30, watchlist=6, words=words, seed=words))
+    day2 = next_day(day1)
+    cache = FragmentCache()
+    assert render(day1, cache, toc) == render(day1, False, toc)
+    recorder = StageRecorder()
+    assert render(day2, cache, toc, recorder) == render(day2, False, toc)
+    summary = recorder.fragment_summary()
+    assert summary['reused'] > 0 and summary['drawn'] > 0
+
+# Cards long enough to flow over a page break are drawn afresh wherever the break
+# falls differently, and still come out the same.
+def test_cards_across_page_breaks():
+    report = extract_report(generate_report(cards=12, watchlist=2, words=600, seed=3))
+    cache = FragmentCache()
+    fresh = render(report, False)
+    assert render(report, cache) == fresh
+    assert render(next_day(report), cache) == render(next_day(report), False)
+
+def test_shared_cache_is_opt_in(monkeypatch):
+    monkeypatch.delenv(fragments_mod.FRAGMENTS_ENV, raising=False)
+    assert default_fragment_cache() is None
+    monkeypatch.setenv(fragments_mod.FRAGMENTS_ENV, '0')
+    assert default_fragment_cache() is None
+    monkeypatch.setenv(fragments_mod.FRAGMENTS_ENV, '1')
+    assert default_fragment_cache() is not None
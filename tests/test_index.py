@@ -0,0 +1,50 @@
+import pytest
+from baseline import legacy_report, legacy_watchlist_titles
+
+from benchmarks.bench_index import indexed_lookups, legacy_lookups
+from benchmarks.synthetic import generate_report
+from blueberry.engines import available_engines, make_soup
+from blueberry.parser import extract_report
+
+# Sections found the other ways the parser allows: alert and index by their text
+# anchors, metrics as plain spans, the assessment by class, notes in the heading's
+# parent, cards only by their <h3>.
+EDGE = '''<html><body><div class="header"><h1>EGX30</h1><p>Weekly Edition</p></div>
+<div><p><strong>EXTREME CAUTION</strong> Thin volumes into the holiday.</p></div>
+<div class="card"><div class="metric"><span>Current Level:</span><span>31,200</span></div>
+<div class="metric"><span>Support</span><span>30,800</span></div><div class="metric"><span>Alone</span></div></div>
+<div><h3>Market Trend</h3><section class="market-assessment"><h3>Trend</h3><p>Sideways.</p></section></div>
+<div id="positions"><div class="card"><h3>ABUK - Abu Qir</h3><p>Current: 55</p><p>Action: hold</p>
+<p>Why we still hold it</p><div class="confidence">HIGH</div></div></div>
+<div class="card"><h3>COMI</h3><p>Entry: 80</p><p>Setup: Reduce exposure</p><p>Gain: 4%</p></div>
+<div class="watchlist"><div><strong>EFIH - e-finance</strong><p>Trigger: 20</p></div></div>
+<div><h2>Notes</h2><ul><li>One</li><li>Two</li></ul></div>
+<div class="disclaimer">Not advice.</div></body></html>'''
+
+SAMPLES = {
+    'mixed': generate_report(cards=40, watchlist=8),
+    'setup': generate_report(cards=24, watchlist=4, variant='setup'),
+    'plain': generate_report(cards=24, watchlist=4, variant='plain', words=30),
+    'nested': generate_report(cards=12, watchlist=20, nesting=6),
+    'empty': generate_report(cards=0, watchlist=0),
+    'edge': EDGE,
+}
+
+@pytest.mark.parametrize('engine', available_engines())
+@pytest.mark.parametrize('name', sorted(SAMPLES))
+def test_extract_report_matches_baseline(name, engine):
+    html_content = SAMPLES[name]
+    report = extract_report(html_content, engine).to_dict()
+    watchlist = report.pop('watchlist')
+    assert report.pop('truncated') == ""
+    assert report == legacy_report(html_content, engine)
+    titles = legacy_watchlist_titles(make_soup(html_content, engine))
+    assert (None if watchlist is None else [f"{w['ticker']} - {w['name']}" if w['name'] else w['ticker']
+                                             for w in watchlist]) == titles
+
+@pytest.mark.parametrize('name', sorted(SAMPLES))
+def test_index_answers_as_the_soup_does(name):
+    soup = make_soup(SAMPLES[name], 'html.parser')
+    old, new = legacy_lookups(soup), indexed_lookups(soup)
+    assert len(old) == len(new)
+    assert all(a is b for a, b in zip(old, new) if not isinstance(a, bool))
@@ -0,0 +1,45 @@
+import dataclasses
+
+import pytest
+from baseline import CARD_FIELDS, legacy_cards, legacy_index_card
+
+from benchmarks.synthetic import generate_report
+from blueberry.engines import make_soup
+from blueberry.model import Alert, AssessmentBlock, Card, Disclaimer, IndexMetric, Report, WatchlistItem
+from blueberry.parser import extract_report
+
+REPORTS = [generate_report(cards=24, watchlist=6), generate_report(cards=8, watchlist=3, variant='plain'),
+           generate_report(cards=0, watchlist=0)]
+
+def test_instances_have_slots_only():
+    report = extract_report(REPORTS[0])
+    parts = [report, report.alert, report.disclaimer, report.index[0], report.assessment[0], report.cards[0],
+             report.watchlist[0]]
+    assert all(not hasattr(part, '__dict__') for part in parts)
+
+# Card fields are the old card dict's keys spelled out, in the same order.
+def test_card_fields_follow_the_old_dict():
+    assert [f.name for f in dataclasses.fields(Card)] == list(CARD_FIELDS.values())
+
+@pytest.mark.parametrize('html_content', REPORTS)
+def test_cards_carry_the_old_dict_values(html_content):
+    soup = make_soup(html_content)
+    old = legacy_cards(soup, legacy_index_card(soup))
+    new = extract_report(html_content).to_dict()['cards']
+    assert new == [{CARD_FIELDS[k]: v for k, v in card.items()} for card in old]
+
+@pytest.mark.parametrize('html_content', REPORTS)
+def test_json_round_trip(html_content):
+    report = extract_report(html_content)
+    again = Report.from_json(report.to_json())
+    assert again == report
+    assert again.to_json() == report.to_json()
+    assert type(again.alert) is Alert and all(type(c) is Card for c in again.cards)
+    assert all(type(w) is WatchlistItem for w in again.watchlist or [])
+
+# None (section not found) and [] (found, empty) stay apart through JSON.
+def test_round_trip_keeps_missing_and_empty_sections():
+    report = Report(index=[], assessment=None, watchlist=[], notes=[], truncated='time')
+    again = Report.from_json(report.to_json())
+    assert again.index == [] and again.assessment is None and again.watchlist == []
+    assert again.alert is None and again.disclaimer is None and again.truncated == 'time'
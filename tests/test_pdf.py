@@ -0,0 +1,17 @@
+from blueberry import pdf as pdf_mod
+from blueberry.budget import Budget
+from blueberry.pdf import PDF
+
+# A budgeted render wraps long texts a piece at a time; the lines must be the ones an
+# unbudgeted render gets for the whole text.
+def test_long_text_wraps_the_same_in_pieces(monkeypatch):
+    text = " ".join(f"word{i % 97} {'x' * (i % 13)}" + ("\n" if i % 41 == 0 else "") for i in range(3000))
+    text += " " + "y" * 400
+    pdf = PDF()
+    pdf.add_page()
+    pdf.set_font('Arial', '', 9)
+    whole = pdf.layout.split_lines(pdf, 90, text)
+    monkeypatch.setattr(pdf_mod.piece_end, '__defaults__', (1500,))
+    pdf.budget = Budget()
+    assert len(text) > pdf_mod.LONG_TEXT
+    assert pdf.split_lines(90, text) == whole
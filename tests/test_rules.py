@@ -0,0 +1,116 @@
+import itertools
+import random
+
+import pytest
+
+from blueberry.engines import make_soup
+from blueberry.rules import Matcher, load_rules
+
+# The keyword checks of the original app.py card loop, as plain substring tests on the
+# lowercased text.
+def baseline_param_kind(key):
+    key = key.strip().lower()
+    if any(k in key for k in ['entry', 'target', 'stop', 'r:r', 'current', 'action', 'decision', 'gain', 'loss']):
+        return 'param'
+    if 'setup' in key: return 'setup'
+    return None
+
+def baseline_setup_mode(setup):
+    if 'exit' in setup.lower() or 'reduce' in setup.lower() or 'distribution' in setup.lower(): return 'sell'
+    return 'buy'
+
+def baseline_walk(parent, depth=4):
+    is_watch, mode = False, None
+    curr = parent
+    for _ in range(depth):
+        if not curr: break
+        cid = str(curr.get('id', '')).lower()
+        cclass = str(curr.get('class', '')).lower()
+        if 'watch' in cid or 'watch' in cclass: is_watch = True
+        if 'open' in cid or 'pos' in cid: mode = 'open'
+        elif 'reduce' in cid or 'sell' in cid: mode = 'sell'
+        curr = curr.parent
+    return is_watch, mode
+
+# Every category with a word in the text, in rule order: what the combined regex claims.
+def baseline_categories(categories, text):
+    text = text.lower()
+    return tuple(name for name, words in categories if any(w.lower() in text for w in words if w))
+
+WORDS = ['entry', 'target', 'stop', 'r:r', 'current', 'action', 'decision', 'gain', 'loss', 'setup',
+         'exit', 'reduce', 'distribution', 'open', 'pos', 'sell', 'watch']
+FILLER = ['', ' ', 'zone', '1', ':', '-', 'price', 'ENTRY', 'Stop', 'R:R', 'r', 'ex', 'it', 'watc', 'h']
+
+def texts(n=500, seed=7):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        parts = [rng.choice(WORDS + FILLER) for _ in range(rng.randint(0, 5))]
+        text = rng.choice((' ', '', '-')).join(parts)
+        out.append(text.upper() if rng.random() < 0.2 else text.title() if rng.random() < 0.2 else text)
+    return out
+
+# Overlapping words (one inside another, or sharing letters across a boundary), words
+# split by case, non-ASCII case folding, and words after a newline.
+EDGE = ['', 'stop-loss', 'stoploss', 'Stop Loss', 'STOP', 'sToP', 'r:r', 'R:R', 'R : R', 'Risk:Reward',
+        'target gain', 'gain/loss', 'entrystop', 'entr y', 'setup', 'Setup Entry', 'SETUP', 'upset',
+        'exit', 'EXIT', 'Exited', 'reduced', 'Redistribution', 'distributION', 'e x i t', 'excite',
+        'position', 'POS', 'opensell', 'sell-open', 'reposition', 'watch', 'WatchList', 'tab-WATCH',
+        'w\u00e4tch', '\u00c9ntry', 'ENTRY\u0130', 'caf\u00e9 exit', '\u212aey entry', 'stop\n loss',
+        'line\nexit', 'pos\n\nsell']
+
+@pytest.fixture(scope='module')
+def rules():
+    return load_rules()
+
+def param_kind(rules, key):
+    kinds = rules.param_keys.categories(key.strip().lower())
+    return 'param' if 'param' in kinds else 'setup' if 'setup' in kinds else None
+
+@pytest.mark.parametrize('text', EDGE)
+def test_edge_cases_match_baseline(rules, text):
+    assert param_kind(rules, text) == baseline_param_kind(text)
+    assert rules.setup_mode(text) == baseline_setup_mode(text)
+
+def test_random_keys_match_baseline(rules):
+    for text in texts():
+        assert param_kind(rules, text) == baseline_param_kind(text), text
+        assert rules.setup_mode(text) == baseline_setup_mode(text), text
+
+def test_all_keyword_pairs(rules):
+    for a, b in itertools.product(WORDS, repeat=2):
+        for key in (a + b, f"{a} {b}", f"{a.upper()}-{b.title()}"):
+            assert param_kind(rules, key) == baseline_param_kind(key), key
+            assert rules.setup_mode(key) == baseline_setup_mode(key), key
+
+# Random ids and classes on four nested wrappers: each walk gives the baseline's
+# (watch, mode), whichever ancestor carries which marker.
+def test_ancestor_walk_matches_baseline(rules):
+    rng = random.Random(3)
+    names = ['', 'open', 'pos', 'reduce', 'sell', 'watch', 'Open-Positions', 'SELL', 'tab-watch', 'possell',
+             'watchlist-open', 'other']
+    for _ in range(300):
+        attrs = []
+        for _ in range(5):
+            cid, cls = rng.choice(names), ' '.join(rng.sample(names, rng.randint(0, 2)))
+            attrs.append((f' id="{cid}"' if cid else '') + (f' class="{cls}"' if cls else ''))
+        html_content = ''.join(f'<div{a}>' for a in attrs) + '<div class="card">x</div>' + '</div>' * len(attrs)
+        card = make_soup(html_content, 'html.parser').find(class_='card')
+        assert rules.ancestors().walk(card.parent) == baseline_walk(card.parent), html_content
+
+@pytest.mark.parametrize('categories', [
+    [('a', ['reduce']), ('b', ['red', 'duc'])],
+    [('a', ['pos']), ('b', ['position']), ('c', ['sit'])],
+    [('a', ['ab', 'abc', 'abcd']), ('b', ['bcd']), ('c', ['d'])],
+    [('a', ['Entry', 'ENTRY']), ('b', ['entry'])],
+    [('a', []), ('b', ['x', '']), ('c', ['r:r', '.*'])],
+])
+@pytest.mark.parametrize('text', EDGE + ['reduce', 'position', 'abcd', 'xabcdx', 'dcba', 'a.*b', 'R:R entry'])
+def test_combined_regex_reports_every_category(categories, text):
+    matcher = Matcher(categories)
+    assert matcher.categories(text) == baseline_categories(categories, text)
+    assert matcher.first(text) == next(iter(baseline_categories(categories, text)), None)
+
+def test_no_words():
+    assert Matcher([]).categories('entry') == ()
+    assert Matcher([('a', [])]).first('entry') is None
@@ -0,0 +1,39 @@
+import io
+
+import pytest
+
+from benchmarks.synthetic import generate_report
+from blueberry.instrument import StageRecorder
+from blueberry.parser import decode_html, extract_report
+from blueberry.stream import extract_report_stream
+
+pytest.importorskip('lxml')
+
+def streamed(data, recorder=None):
+    return extract_report_stream(io.BytesIO(data), 'lxml', recorder, chunk_bytes=4096)
+
+def stages(recorder):
+    return [r['stage'] for r in recorder.records if r['phase'] == 'extract']
+
+@pytest.mark.parametrize('params', [
+    dict(cards=40, watchlist=8),
+    dict(cards=40, watchlist=8, variant='setup'),
+    dict(cards=40, watchlist=8, variant='plain'),
+    dict(cards=20, watchlist=30, nesting=4, words=60),
+])
+def test_stream_matches_whole_document(params):
+    data = generate_report(**params).encode('utf-8')
+    recorder = StageRecorder()
+    assert streamed(data, recorder).to_json() == extract_report(decode_html(data), 'lxml').to_json()
+    assert 'stream' in stages(recorder) and 'parse' not in stages(recorder)
+    assert recorder.records[0]['counts']['streamed'] > 0
+
+# Non-ASCII UTF-8 and then a byte that is not UTF-8: decode_html reads the whole
+# document as latin-1, which the stream can no longer switch to, so it starts over.
+def test_fallback_matches_and_parses_once():
+    html = generate_report(cards=40, watchlist=8)
+    cut = len(html) // 2
+    data = (html[:cut] + 'café ').encode('utf-8') + b'\xff' + html[cut:].encode('utf-8')
+    recorder = StageRecorder()
+    assert streamed(data, recorder).to_json() == extract_report(decode_html(data), 'lxml').to_json()
+    assert 'read' in stages(recorder) and stages(recorder).count('parse') == 1
@@ -0,0 +1,54 @@
+import re
+
+import pytest
+
+from blueberry import text as text_mod
+from blueberry.text import MEMO_MAX_LEN, clean_text, clean_texts
+
+# clean_text as the original app.py had it.
+def baseline_clean_text(text):
+    if not text: return ""
+    text = text.replace('\n', ' ').replace('\t', ' ').replace('\r', ' ')
+    text = re.sub(r'\s+', ' ', text).strip()
+    replacements = {
+        '\u2018': "'", '\u2019': "'", '\u201c': '"', '\u201d': '"',
+        '\u2013': '-', '\u2014': '-', '\u2026': '...', '\u00a0': ' '
+    }
+    for k, v in replacements.items():
+        text = text.replace(k, v)
+    return text.encode('latin-1', 'ignore').decode('latin-1')
+
+CASES = [
+    '', ' ', 'plain ASCII', '  leading and trailing  ', 'tabs\tand\nnew\r\nlines',
+    # NBSP alone, between words, next to other spaces, and narrow NBSP (not latin-1)
+    '\u00a0', 'EGX\u00a030', 'a \u00a0 b', '\u00a0\u00a0x\u00a0', '10\u202f000',
+    # zero-width space, joiner, non-joiner, BOM and word joiner
+    'zero\u200bwidth', 'a \u200b b', '\u200c\u200dx\ufeff', 'word\u2060joiner',
+    # smart quotes, dashes and ellipsis
+    '\u2018single\u2019 \u201cdouble\u201d', 'range 10\u201312 \u2014 wide', 'wait\u2026', '\u201c \u201d',
+    # latin-1 kept, everything beyond dropped
+    'caf\u00e9 na\u00efve \u00a35 \u00b12\u00b0', 'Arabic \u0645\u0635\u0631 text', 'emoji \U0001F4C8 up', 'euro \u20ac sign',
+    'CJK \u4e2d\u6587', '\x00null', 'form\x0cfeed\x0bvtab', 'seps\x1c\x1d\x1e\x1fend', 'line\u2028para\u2029',
+    'x' * (MEMO_MAX_LEN + 10) + ' \u2014 \u00a0 tail',
+]
+
+@pytest.mark.parametrize('text', CASES)
+def test_clean_text_matches_baseline(text):
+    assert clean_text(text) == baseline_clean_text(text)
+    assert clean_text(text) == baseline_clean_text(text)  # again, from the memo
+
+def test_none_is_empty():
+    assert clean_text(None) == "" and clean_texts([None, 'a']) == ["", 'a']
+
+def test_clean_texts_matches_one_by_one():
+    assert clean_texts(CASES) == [baseline_clean_text(t) for t in CASES]
+    assert clean_texts([]) == []
+    # The batch joins on NUL; input already holding one is cleaned string by string.
+    texts = ['a\0b', '\u2014 c', '']
+    assert clean_texts(texts) == [baseline_clean_text(t) for t in texts]
+
+def test_long_texts_skip_the_memo():
+    text_mod._clean_memo.cache_clear()
+    clean_text('y' * (MEMO_MAX_LEN + 1))
+    clean_text('short')
+    assert text_mod._clean_memo.cache_info().currsize == 1
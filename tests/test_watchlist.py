@@ -0,0 +1,37 @@
+import pytest
+from baseline import legacy_watchlist_titles
+
+from benchmarks.synthetic import generate_report
+from blueberry.engines import make_soup
+from blueberry.index import DocumentIndex
+from blueberry.parser import extract_watchlist
+
+def watchlist(html_content):
+    return extract_watchlist(DocumentIndex(make_soup(html_content, 'html.parser')))
+
+def title(item):
+    return f"{item.ticker} - {item.name}" if item.name else item.ticker
+
+# The cases bench_watchlist times: the linear sweeps find the titles the old
+# find_all('div') scan found, in the same order, at any wrapper depth.
+@pytest.mark.parametrize('items', [1, 20, 100])
+@pytest.mark.parametrize('depth', [0, 1, 5, 20, 50])
+def test_titles_match_the_legacy_scan(depth, items):
+    html_content = generate_report(cards=0, watchlist=items, nesting=depth)
+    assert [title(w) for w in watchlist(html_content)] == legacy_watchlist_titles(make_soup(html_content, 'html.parser'))
+
+def test_each_item_keeps_only_its_own_paragraphs():
+    items = watchlist(generate_report(cards=0, watchlist=3, nesting=4))
+    assert [w.params for w in items] == [{'Trigger': f'above {30 + j}'} for j in range(3)]
+    assert all(len(w.details) == 1 for w in items)
+
+def document(body):
+    return f'<html><body><div id="tab-watchlist">{body}</div></body></html>'
+
+def test_inline_emphasis_is_not_a_title():
+    items = watchlist(document('<div><h4>ABC - A Co</h4><p><strong>Entry:</strong> 5</p></div>'))
+    assert [(title(w), w.params) for w in items] == [('ABC - A Co', {'Entry': '5'})]
+
+def test_title_in_its_own_paragraph_is_not_a_detail():
+    items = watchlist(document('<div><p><strong>ABC - A Co</strong></p><p>Watch the gap.</p></div>'))
+    assert [(title(w), w.details) for w in items] == [('ABC - A Co', ['Watch the gap.'])]